@@ -0,0 +1,393 @@
+"""
+Bedrock invocation layer.
+Adds client-side rate limiting (requests and tokens per minute), retries
+with jittered exponential backoff on throttling, a tunable connection pool
+and ordered failover across model ids and regions.
+"""
+import os
+import json
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Capacity errors: the caller is sending more than the account may. Retried,
+# and reported as BedrockThrottledError (HTTP 429) once retries run out
+THROTTLING_ERRORS = {
+    "ThrottlingException",
+    "TooManyRequestsException"
+}
+
+# Transient failures on the service side. Retried as well, but reported as a
+# plain BedrockError (HTTP 5xx) since backing off is not the caller's fix
+SERVER_ERRORS = {
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "InternalServerException"
+}
+
+# Errors worth retrying on the same model: the request was fine, the service
+# was busy
+RETRYABLE_ERRORS = THROTTLING_ERRORS | SERVER_ERRORS
+
+# Errors that mean this model/region cannot serve the request, so the next
+# failover target is tried immediately
+FAILOVER_ERRORS = {
+    "AccessDeniedException",
+    "ResourceNotFoundException",
+    "ServiceQuotaExceededException"
+}
+
+
+class BedrockError(Exception):
+    """Raised when no model could serve a Bedrock request"""
+    
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class BedrockThrottledError(BedrockError):
+    """Raised when the last target was still throttled after all retries"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+    
+    A rate of 0 disables the bucket. Requests larger than the capacity are
+    clamped to it, so they wait for a full bucket instead of forever.
+    """
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+    
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Take `amount` tokens, waiting for the bucket to refill if needed
+        
+        Returns:
+            False if the tokens were not available within `timeout` seconds
+        """
+        if not self.enabled:
+            return True
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+    
+    def refund(self, amount: float) -> None:
+        """Return tokens that were reserved but not used"""
+        if not self.enabled or amount <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class BedrockInvoker:
+    """
+    Invokes Claude on Bedrock through an ordered list of (model id, region)
+    targets.
+    
+    Each call first takes one request and its estimated tokens from the
+    client-side buckets. Throttling and transient errors are retried on the
+    same target with full-jitter exponential backoff. Once retries run out,
+    or the target reports the model as unavailable, the next target is
+    tried. Validation errors fail immediately.
+    """
+    
+    def __init__(
+        self,
+        targets: List[Tuple[str, str]],
+        client_factory: Callable[[str], Any],
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 4,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        limiter_timeout: float = 30.0
+    ):
+        """
+        Args:
+            targets: (model id, region) pairs in failover order
+            client_factory: Builds a bedrock-runtime client for a region
+            requests_per_minute: Client-side request limit (0 = unlimited)
+            tokens_per_minute: Client-side token limit (0 = unlimited)
+            max_retries: Retries per target on throttling/transient errors
+            base_delay: First backoff ceiling in seconds; doubles per retry
+            max_delay: Upper bound for a single backoff
+            limiter_timeout: Longest wait for the rate limiter before giving up
+        """
+        if not targets:
+            raise ValueError("At least one Bedrock target is required")
+        self.targets = targets
+        self.client_factory = client_factory
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter_timeout = limiter_timeout
+        self._clients: Dict[str, Any] = {}
+        self._clients_lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "attempts": 0, "throttled": 0, "server_errors": 0,
+            "retries": 0, "failovers": 0, "failures": 0
+        }
+        self._stats_lock = threading.Lock()
+    
+    @classmethod
+    def from_env(
+        cls,
+        model_id: str,
+        region: str,
+        pool_size: int,
+        client_factory: Optional[Callable[[str], Any]] = None
+    ) -> "BedrockInvoker":
+        """
+        Build an invoker from the BEDROCK_* environment variables
+        
+        BEDROCK_FALLBACK_MODELS is a comma-separated list of ``model_id`` or
+        ``model_id@region`` entries tried after the primary model.
+        BEDROCK_ENDPOINT_URL sends every call to another endpoint, such as
+        a VPC endpoint or bedrock_emulator.py.
+        
+        Args:
+            model_id: Primary model id
+            region: Primary (and default) region
+            pool_size: Default connection pool size per regional client
+            client_factory: Override how regional clients are built (the
+                local mock passes its own)
+        """
+        targets = [(model_id, region)]
+        for entry in os.getenv("BEDROCK_FALLBACK_MODELS", "").split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            fallback_model, _, fallback_region = entry.partition("@")
+            target = (fallback_model, fallback_region or region)
+            if target not in targets:
+                targets.append(target)
+        
+        if client_factory is None:
+            client_factory = _boto3_client_factory(
+                int(os.getenv("BEDROCK_POOL_SIZE", str(pool_size))),
+                float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "5")),
+                float(os.getenv("BEDROCK_READ_TIMEOUT", "120")),
+                os.getenv("BEDROCK_ENDPOINT_URL") or None
+            )
+        
+        return cls(
+            targets,
+            client_factory,
+            requests_per_minute=float(os.getenv("BEDROCK_RPM", "0")),
+            tokens_per_minute=float(os.getenv("BEDROCK_TPM", "0")),
+            max_retries=int(os.getenv("BEDROCK_MAX_RETRIES", "4")),
+            base_delay=float(os.getenv("BEDROCK_RETRY_BASE_MS", "200")) / 1000,
+            max_delay=float(os.getenv("BEDROCK_RETRY_MAX_MS", "5000")) / 1000,
+            limiter_timeout=float(os.getenv("BEDROCK_LIMITER_TIMEOUT", "30"))
+        )
+    
+    def invoke(
+        self,
+        body: Dict[str, Any],
+        estimated_tokens: int,
+        model_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Call invoke_model and return the decoded response body
+        
+        Args:
+            body: Anthropic Messages request body
+            estimated_tokens: Input tokens plus max_tokens, charged against
+                the tokens-per-minute bucket
+            model_id: Model to try first (defaults to the primary target);
+                the configured targets remain the failover chain
+        
+        Returns:
+            Decoded response body; ``model_id`` and ``region`` record which
+            target served it
+        """
+        def call(client: Any, target_model_id: str) -> Dict[str, Any]:
+            response = client.invoke_model(
+                modelId=target_model_id,
+                body=json.dumps(body),
+                contentType="application/json"
+            )
+            return json.loads(response["body"].read())
+        
+        result, (served_by, region) = self._call_with_failover(call, estimated_tokens, model_id)
+        # Tokens reserved for output that was never generated go back
+        output_tokens = result.get("usage", {}).get("output_tokens")
+        if output_tokens is not None:
+            self.token_bucket.refund(body.get("max_tokens", 0) - output_tokens)
+        return {**result, "model_id": served_by, "region": region}
+    
+    def invoke_stream(
+        self,
+        body: Dict[str, Any],
+        estimated_tokens: int,
+        model_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Call invoke_model_with_response_stream and yield decoded events
+        
+        Retries and failover only apply until the stream is opened; an error
+        after the first event is raised to the caller.
+        """
+        def call(client: Any, target_model_id: str) -> Any:
+            return client.invoke_model_with_response_stream(
+                modelId=target_model_id,
+                body=json.dumps(body),
+                contentType="application/json"
+            )
+        
+        response, _ = self._call_with_failover(call, estimated_tokens, model_id)
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if chunk:
+                yield json.loads(chunk["bytes"])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return call/retry/failover counters"""
+        with self._stats_lock:
+            return dict(self._stats)
+    
+    def _call_with_failover(
+        self,
+        call: Callable[[Any, str], Any],
+        estimated_tokens: int,
+        model_id: Optional[str] = None
+    ) -> Tuple[Any, Tuple[str, str]]:
+        """Run `call` against each target in order until one succeeds"""
+        from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError
+        
+        self._count("calls")
+        admitted = (
+            self.request_bucket.acquire(1, self.limiter_timeout)
+            and self.token_bucket.acquire(estimated_tokens, self.limiter_timeout)
+        )
+        if not admitted:
+            self._count("failures")
+            raise BedrockThrottledError("Client-side Bedrock rate limit exceeded", "ClientRateLimit")
+        
+        last_error: Optional[BedrockError] = None
+        for position, (target_model_id, region) in enumerate(self._targets_for(model_id)):
+            if position > 0:
+                self._count("failovers")
+                print(f"Bedrock failover to {target_model_id} in {region}: {last_error}")
+            client = self._client(region)
+            
+            for attempt in range(self.max_retries + 1):
+                self._count("attempts")
+                try:
+                    return call(client, target_model_id), (target_model_id, region)
+                except ClientError as e:
+                    code = e.response.get("Error", {}).get("Code", "")
+                    message = f"Bedrock API error: {str(e)}"
+                    if code in RETRYABLE_ERRORS:
+                        if code in THROTTLING_ERRORS:
+                            self._count("throttled")
+                            last_error = BedrockThrottledError(message, code)
+                        else:
+                            self._count("server_errors")
+                            last_error = BedrockError(message, code)
+                        if attempt < self.max_retries:
+                            self._count("retries")
+                            time.sleep(self._backoff(attempt))
+                        continue
+                    if code in FAILOVER_ERRORS:
+                        last_error = BedrockError(message, code)
+                        break
+                    self._count("failures")
+                    raise BedrockError(message, code)
+                except (ConnectTimeoutError, EndpointConnectionError) as e:
+                    # The region is unreachable; retrying it will not help
+                    last_error = BedrockError(f"Bedrock connection error: {str(e)}", "ConnectionError")
+                    break
+        
+        self._count("failures")
+        raise last_error
+    
+    def _targets_for(self, model_id: Optional[str]) -> List[Tuple[str, str]]:
+        """Failover chain starting at `model_id` (in the primary region) if it is given"""
+        if model_id is None or model_id == self.targets[0][0]:
+            return self.targets
+        first = (model_id, self.targets[0][1])
+        return [first] + [target for target in self.targets if target != first]
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def _client(self, region: str) -> Any:
+        with self._clients_lock:
+            if region not in self._clients:
+                self._clients[region] = self.client_factory(region)
+            return self._clients[region]
+    
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+def _boto3_client_factory(
+    pool_size: int,
+    connect_timeout: float,
+    read_timeout: float,
+    endpoint_url: Optional[str] = None
+) -> Callable[[str], Any]:
+    """Build bedrock-runtime clients with a sized pool and botocore retries disabled"""
+    def factory(region: str) -> Any:
+        # boto3 is imported here so it stays off the cold-start path for
+        # local/mock runs
+        import boto3
+        from botocore.config import Config
+        credentials = {}
+        if endpoint_url and boto3.Session().get_credentials() is None:
+            # The emulator does not check signatures, but botocore will not
+            # send an unsigned request
+            credentials = {"aws_access_key_id": "emulator", "aws_secret_access_key": "emulator"}
+        return boto3.client(
+            "bedrock-runtime",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            **credentials,
+            config=Config(
+                max_pool_connections=pool_size,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                tcp_keepalive=True,
+                # Retries are handled by BedrockInvoker, so that throttling
+                # backs off and fails over instead of being retried blindly
+                retries={"max_attempts": 1, "mode": "standard"}
+            )
+        )
+    return factory
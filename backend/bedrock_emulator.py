@@ -0,0 +1,382 @@
+"""
+Bedrock runtime emulator for local development and tests.
+An HTTP server implementing InvokeModel and InvokeModelWithResponseStream
+(Anthropic Messages bodies, AWS event-stream framing for streams), so the
+real boto3 client, its serialization, retries and connection pool are
+exercised end to end. Output is deterministic for a given seed and request
+body, and the server can simulate model latency (time to first token plus
+per-token cost, with log-normal jitter), ThrottlingException responses,
+truncated output and prompt-cache usage.
+
+Request counters are served at GET /stats.
+
+Usage:
+    python bedrock_emulator.py --port 8787 --seed 7 --ttft-ms 400 --ms-per-token 15
+    BEDROCK_ENDPOINT_URL=http://localhost:8787 python local_server.py
+"""
+import json
+import time
+import zlib
+import base64
+import random
+import struct
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bedrock_mock import BedrockMock, BedrockRuntimeMock
+
+
+# Characters per token, matching prompt_templates.CHARS_PER_TOKEN
+_CHARS_PER_TOKEN = 4
+
+
+class EmulatorConfig:
+    """Behaviour of the emulated model"""
+    
+    def __init__(
+        self,
+        seed: int = 0,
+        ttft_ms: float = 0.0,
+        ms_per_token: float = 0.0,
+        jitter: float = 0.0,
+        throttle_rate: float = 0.0,
+        throttle_models: Optional[List[str]] = None,
+        malformed_models: Optional[List[str]] = None,
+        chunk_size: int = 16,
+        cache_min_tokens: int = 1024
+    ):
+        """
+        Args:
+            seed: Seeds generated text, latency jitter and throttling
+            ttft_ms: Median time to first token
+            ms_per_token: Median time per output token
+            jitter: Sigma of the log-normal factor applied to every delay
+                (0 = fixed delays; 0.3 gives a realistic tail)
+            throttle_rate: Probability that a request is throttled
+            throttle_models: Model ids that are always throttled
+            malformed_models: Model ids whose output is cut off halfway
+                (stop_reason "max_tokens")
+            chunk_size: Characters per streamed content_block_delta
+            cache_min_tokens: Shortest cache_control block that is cached;
+                shorter ones are billed as plain input, as on Bedrock
+        """
+        self.seed = seed
+        self.ttft_ms = ttft_ms
+        self.ms_per_token = ms_per_token
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.throttle_models = set(throttle_models or [])
+        self.malformed_models = set(malformed_models or [])
+        self.chunk_size = chunk_size
+        self.cache_min_tokens = cache_min_tokens
+
+
+class _Emulator:
+    """Shared server state: generator, throttling sequence and prompt cache"""
+    
+    def __init__(self, config: EmulatorConfig):
+        self.config = config
+        self.mock = BedrockMock(seed=config.seed)
+        # Throttling decisions follow one seeded sequence in arrival order
+        self._throttle_random = random.Random(f"throttle:{config.seed}")
+        self._cached_prefixes: set = set()
+        self._lock = threading.Lock()
+        self.stats = {"invocations": 0, "streams": 0, "throttled": 0}
+    
+    def admit(self, model_id: str, streaming: bool) -> bool:
+        """Count a request; False when it is to be throttled"""
+        with self._lock:
+            self.stats["streams" if streaming else "invocations"] += 1
+            draw = self._throttle_random.random()
+            if model_id in self.config.throttle_models or draw < self.config.throttle_rate:
+                self.stats["throttled"] += 1
+                return False
+        return True
+    
+    def respond(self, model_id: str, request: Dict[str, Any]) -> Tuple[str, str, Dict[str, int], random.Random]:
+        """
+        Generate the response text for a request
+        
+        Returns:
+            The text, its stop reason, the usage block and a random source
+            for latency jitter, all derived from the seed and request
+        """
+        prompt = BedrockRuntimeMock._prompt_text(request)
+        text = self.mock.generate(prompt, stream=True)
+        stop_reason = "end_turn"
+        max_chars = int(request.get("max_tokens", 0)) * _CHARS_PER_TOKEN
+        if model_id in self.config.malformed_models:
+            text, stop_reason = text[:len(text) // 2], "max_tokens"
+        elif max_chars and len(text) > max_chars:
+            text, stop_reason = text[:max_chars], "max_tokens"
+        
+        usage = self._usage(request, prompt, text)
+        rng = random.Random(f"latency:{self.config.seed}:{prompt}")
+        return text, stop_reason, usage, rng
+    
+    def delay(self, median_ms: float, rng: random.Random) -> float:
+        """A latency sample in seconds around `median_ms`"""
+        if median_ms <= 0:
+            return 0.0
+        factor = rng.lognormvariate(0, self.config.jitter) if self.config.jitter else 1.0
+        return median_ms * factor / 1000
+    
+    def _usage(self, request: Dict[str, Any], prompt: str, text: str) -> Dict[str, int]:
+        """
+        Token usage, with system blocks marked cache_control counted as
+        cache writes then reads (blocks below cache_min_tokens are not cached)
+        """
+        cache_write = 0
+        cache_read = 0
+        system = request.get("system", [])
+        for block in system if isinstance(system, list) else []:
+            if "cache_control" not in block:
+                continue
+            block_tokens = _tokens(block.get("text", ""))
+            if block_tokens < self.config.cache_min_tokens:
+                continue
+            key = zlib.crc32(block.get("text", "").encode("utf-8"))
+            with self._lock:
+                if key in self._cached_prefixes:
+                    cache_read += block_tokens
+                else:
+                    self._cached_prefixes.add(key)
+                    cache_write += block_tokens
+        return {
+            "input_tokens": max(1, _tokens(prompt) - cache_write - cache_read),
+            "cache_creation_input_tokens": cache_write,
+            "cache_read_input_tokens": cache_read,
+            "output_tokens": _tokens(text)
+        }
+
+
+def _tokens(text: str) -> int:
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def encode_event(payload: Dict[str, Any]) -> bytes:
+    """
+    Frame one streaming event as an AWS event-stream message
+    
+    The Messages event is base64-encoded into the ``bytes`` member of a
+    ``chunk`` event, as Bedrock sends it.
+    """
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")})
+    return _event_message({":event-type": "chunk", ":content-type": "application/json", ":message-type": "event"}, body)
+
+
+def _event_message(headers: Dict[str, str], body: str) -> bytes:
+    encoded_headers = b""
+    for name, value in headers.items():
+        name_bytes, value_bytes = name.encode("utf-8"), value.encode("utf-8")
+        # Header value type 7 is a UTF-8 string
+        encoded_headers += (
+            struct.pack(">B", len(name_bytes)) + name_bytes
+            + struct.pack(">BH", 7, len(value_bytes)) + value_bytes
+        )
+    payload = body.encode("utf-8")
+    # Prelude (total and header lengths) and its CRC, headers, payload, message CRC
+    prelude = struct.pack(">II", 16 + len(encoded_headers) + len(payload), len(encoded_headers))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + encoded_headers + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    emulator: _Emulator
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+    
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            with self.emulator._lock:
+                data = json.dumps(self.emulator.stats).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._error(404, "UnknownOperationException", f"Unknown operation {self.path}")
+    
+    def do_POST(self) -> None:
+        parts = self.path.split("?")[0].strip("/").split("/")
+        body = self._read_body()
+        if len(parts) != 3 or parts[0] != "model" or parts[2] not in ("invoke", "invoke-with-response-stream"):
+            self._error(404, "UnknownOperationException", f"Unknown operation {self.path}")
+            return
+        model_id = unquote(parts[1])
+        streaming = parts[2] == "invoke-with-response-stream"
+        
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._error(400, "ValidationException", "Malformed input request, please reformat your input and try again.")
+            return
+        if not isinstance(request.get("messages"), list) or not request.get("max_tokens"):
+            self._error(400, "ValidationException", "messages and max_tokens are required")
+            return
+        if not self.emulator.admit(model_id, streaming):
+            self._error(429, "ThrottlingException", "Too many requests, please wait before trying again.")
+            return
+        
+        if streaming:
+            self._stream(model_id, request)
+        else:
+            self._invoke(model_id, request)
+    
+    def _invoke(self, model_id: str, request: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        text, stop_reason, usage, rng = self.emulator.respond(model_id, request)
+        time.sleep(
+            self.emulator.delay(self.emulator.config.ttft_ms, rng)
+            + self.emulator.delay(self.emulator.config.ms_per_token * usage["output_tokens"], rng)
+        )
+        payload = {
+            "id": f"msg_emulated_{zlib.crc32(text.encode('utf-8')):08x}",
+            "type": "message",
+            "role": "assistant",
+            "model": model_id,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": usage
+        }
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Amzn-Bedrock-Input-Token-Count", str(usage["input_tokens"]))
+        self.send_header("X-Amzn-Bedrock-Output-Token-Count", str(usage["output_tokens"]))
+        self.send_header("X-Amzn-Bedrock-Invocation-Latency", str(int((time.perf_counter() - started) * 1000)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _stream(self, model_id: str, request: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        text, stop_reason, usage, rng = self.emulator.respond(model_id, request)
+        config = self.emulator.config
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Amzn-Bedrock-Content-Type", "application/json")
+        self.end_headers()
+        
+        time.sleep(self.emulator.delay(config.ttft_ms, rng))
+        first_byte_ms = int((time.perf_counter() - started) * 1000)
+        for event in self._events(model_id, text, stop_reason, usage):
+            if event["type"] == "content_block_delta":
+                time.sleep(self.emulator.delay(config.ms_per_token * _tokens(event["delta"]["text"]), rng))
+            elif event["type"] == "message_stop":
+                event["amazon-bedrock-invocationMetrics"] = {
+                    "inputTokenCount": usage["input_tokens"],
+                    "outputTokenCount": usage["output_tokens"],
+                    "invocationLatency": int((time.perf_counter() - started) * 1000),
+                    "firstByteLatency": first_byte_ms
+                }
+            self._write_chunk(encode_event(event))
+        self._write_chunk(b"")
+    
+    def _events(self, model_id: str, text: str, stop_reason: str, usage: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        """The Anthropic Messages streaming events for one response"""
+        yield {
+            "type": "message_start",
+            "message": {
+                "id": f"msg_emulated_{zlib.crc32(text.encode('utf-8')):08x}",
+                "type": "message",
+                "role": "assistant",
+                "model": model_id,
+                "content": [],
+                "stop_reason": None,
+                "usage": {**usage, "output_tokens": 1}
+            }
+        }
+        yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        size = self.emulator.config.chunk_size
+        for start in range(0, len(text), size):
+            yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text[start:start + size]}}
+        yield {"type": "content_block_stop", "index": 0}
+        yield {
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": usage["output_tokens"]}
+        }
+        yield {"type": "message_stop"}
+    
+    def _write_chunk(self, data: bytes) -> None:
+        """Write one HTTP/1.1 chunk (an empty one ends the body)"""
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+    
+    def _error(self, status: int, code: str, message: str) -> None:
+        # botocore reads the error code from x-amzn-ErrorType
+        data = json.dumps({"message": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("x-amzn-ErrorType", f"{code}:http://internal.amazon.com/coral/com.amazon.bedrock/")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_bedrock_emulator(
+    config: Optional[EmulatorConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the emulator on a background thread
+    
+    Args:
+        config: Emulated model behaviour (defaults to no latency or errors)
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+    
+    Returns:
+        The running server and its endpoint URL (pass it as endpoint_url /
+        BEDROCK_ENDPOINT_URL)
+    """
+    handler = type("BedrockEmulatorHandler", (_Handler,), {"emulator": _Emulator(config or EmulatorConfig())})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedrock runtime emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ttft-ms", type=float, default=0.0, help="Median time to first token")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Median time per output token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Log-normal sigma of every delay")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-models", nargs="*", default=[])
+    parser.add_argument("--malformed-models", nargs="*", default=[])
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="Shortest cacheable system block")
+    args = parser.parse_args()
+    
+    config = EmulatorConfig(
+        seed=args.seed,
+        ttft_ms=args.ttft_ms,
+        ms_per_token=args.ms_per_token,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        throttle_models=args.throttle_models,
+        malformed_models=args.malformed_models,
+        chunk_size=args.chunk_size,
+        cache_min_tokens=args.cache_min_tokens
+    )
+    handler = type("BedrockEmulatorHandler", (_Handler,), {"emulator": _Emulator(config)})
+    print(f"Bedrock emulator listening on http://{args.host}:{args.port}")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
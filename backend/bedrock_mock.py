@@ -2,23 +2,52 @@
 Mock AWS Bedrock for local development.
 Generates realistic responses without calling AWS.
 """
+import os
 import json
+import time
 import random
+from typing import Any, Dict, Iterator, List, Optional
 
 
 class BedrockMock:
     """Mock Bedrock client for local development"""
     
-    def generate(self, prompt: str) -> str:
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Args:
+            seed: Makes output a function of the seed and the prompt (default
+                MOCK_SEED; unseeded output varies between calls)
+        """
+        if seed is None and os.getenv("MOCK_SEED"):
+            seed = int(os.getenv("MOCK_SEED"))
+        self.seed = seed
+        # Streaming mode splits the response into chunks like Bedrock's
+        # content_block_delta events; an optional delay simulates generation speed.
+        self.stream_chunk_size = int(os.getenv("MOCK_STREAM_CHUNK_SIZE", "16"))
+        self.stream_delay = float(os.getenv("MOCK_STREAM_DELAY_MS", "0")) / 1000
+        # Simulated model latency: time to first token plus a per-output-token
+        # cost (about 4 characters per token)
+        self.first_token_delay = float(os.getenv("MOCK_FIRST_TOKEN_MS", "0")) / 1000
+        self.token_delay = float(os.getenv("MOCK_MS_PER_TOKEN", "0")) / 1000
+    
+    def generate(self, prompt: str, stream: bool = False) -> str:
         """
         Generate a mock response that mimics Claude's output.
         
         Args:
             prompt: The prompt to generate content for
-            
+            stream: Skip the simulated latency (generate_stream() paces
+                its chunks instead)
+        
         Returns:
             JSON string with generated content
         """
+        if "Target language:" in prompt:
+            text = self._translate(prompt)
+            if not stream and (self.first_token_delay or self.token_delay):
+                time.sleep(self.first_token_delay + self.token_delay * len(text) / 4)
+            return text
+        
         # Extract information from prompt
         title = self._extract_from_prompt(prompt, "about:", "\n")
         description = self._extract_from_prompt(prompt, "Description:\n", "\n\n")
@@ -26,9 +55,10 @@ class BedrockMock:
         content_type = self._extract_from_prompt(prompt, "Content Type:", "\n")
         
         # Generate mock content based on prompt
-        hero_section = self._generate_hero(title, description, tone)
-        features = self._generate_features(description)
-        benefits = self._generate_benefits(description)
+        rng = random.Random(f"{self.seed}:{prompt}") if self.seed is not None else random
+        hero_section = self._generate_hero(title, description, tone, rng)
+        features = self._generate_features(description, rng)
+        benefits = self._generate_benefits(description, rng)
         seo_meta = self._generate_seo(title, description)
         cta = self._generate_cta(tone)
         faqs = self._generate_faqs(title, description)
@@ -41,8 +71,32 @@ class BedrockMock:
             "cta": cta,
             "faqs": faqs
         }
+        # Section-specific prompts only list some sections in their schema
+        requested = {name: value for name, value in response.items() if f'"{name}"' in prompt}
         
-        return json.dumps(response, indent=2)
+        text = json.dumps(requested or response, indent=2)
+        if not stream and (self.first_token_delay or self.token_delay):
+            time.sleep(self.first_token_delay + self.token_delay * len(text) / 4)
+        return text
+    
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Generate a mock response as a stream of text chunks.
+        
+        Args:
+            prompt: The prompt to generate content for
+        
+        Yields:
+            Successive pieces of the same JSON string generate() returns
+        """
+        response = self.generate(prompt, stream=True)
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        for start in range(0, len(response), self.stream_chunk_size):
+            delay = self.stream_delay + self.token_delay * self.stream_chunk_size / 4
+            if delay:
+                time.sleep(delay)
+            yield response[start:start + self.stream_chunk_size]
     
     def _extract_from_prompt(self, prompt: str, start: str, end: str) -> str:
         """Extract text between start and end markers"""
@@ -58,20 +112,36 @@ class BedrockMock:
         except:
             return ""
     
-    def _generate_hero(self, title: str, description: str, tone: str) -> str:
+    def _translate(self, prompt: str) -> str:
+        """Answer a translation prompt by tagging every string with the language"""
+        language = self._extract_from_prompt(prompt, "Target language:", "\n")
+        document = json.loads(prompt.split("Content:\n", 1)[1])
+        
+        def translate(value: Any) -> Any:
+            if isinstance(value, str):
+                return f"[{language}] {value}"
+            if isinstance(value, list):
+                return [translate(item) for item in value]
+            if isinstance(value, dict):
+                return {key: translate(item) for key, item in value.items()}
+            return value
+        
+        return json.dumps(translate(document), indent=2, ensure_ascii=False)
+    
+    def _generate_hero(self, title: str, description: str, tone: str, rng: Any = random) -> str:
         """Generate hero section"""
         tone_words = {
-            "professional": "Discover", "Transform", "Elevate",
-            "casual": "Check out", "Get started with", "Try",
-            "friendly": "Welcome to", "Join us for", "Experience",
-            "formal": "We present", "Introducing", "We offer",
-            "conversational": "Hey there!", "Ready to", "Let's explore"
+            "professional": ["Discover", "Transform", "Elevate"],
+            "casual": ["Check out", "Get started with", "Try"],
+            "friendly": ["Welcome to", "Join us for", "Experience"],
+            "formal": ["We present", "Introducing", "We offer"],
+            "conversational": ["Hey there!", "Ready to", "Let's explore"]
         }
         
-        action = tone_words.get(tone, "Discover")
+        action = rng.choice(tone_words.get(tone, ["Discover"]))
         return f"{action} {title}. {description[:100]}... Experience the future of innovation and excellence."
     
-    def _generate_features(self, description: str) -> list:
+    def _generate_features(self, description: str, rng: Any = random) -> list:
         """Generate features list"""
         base_features = [
             "Advanced security and encryption",
@@ -83,9 +153,9 @@ class BedrockMock:
         ]
         
         # Select 4 random features
-        return random.sample(base_features, 4)
+        return rng.sample(base_features, 4)
     
-    def _generate_benefits(self, description: str) -> list:
+    def _generate_benefits(self, description: str, rng: Any = random) -> list:
         """Generate benefits list"""
         base_benefits = [
             "Increase productivity and efficiency",
@@ -97,7 +167,7 @@ class BedrockMock:
         ]
         
         # Select 3 random benefits
-        return random.sample(base_benefits, 3)
+        return rng.sample(base_benefits, 3)
     
     def _generate_seo(self, title: str, description: str) -> dict:
         """Generate SEO metadata"""
@@ -143,3 +213,103 @@ class BedrockMock:
             }
         ]
 
+
+class BedrockRuntimeMock:
+    """
+    Stand-in for a boto3 bedrock-runtime client backed by BedrockMock.
+    
+    Speaks the Anthropic Messages request/response format, so the whole
+    Bedrock invocation path (rate limiting, retries, failover) runs locally.
+    It can simulate throttling: MOCK_THROTTLE_RATE is the probability that
+    a call fails with ThrottlingException, and MOCK_THROTTLE_MODELS lists
+    model ids that are always throttled. Models listed in
+    MOCK_MALFORMED_MODELS answer with truncated JSON. With a seeded mock the
+    sequence of throttled calls repeats exactly.
+    """
+    
+    def __init__(self, region: str = "local", mock: "BedrockMock" = None):
+        self.region = region
+        self.mock = mock or BedrockMock()
+        self.throttle_rate = float(os.getenv("MOCK_THROTTLE_RATE", "0"))
+        self.throttled_models = _model_list("MOCK_THROTTLE_MODELS")
+        self.malformed_models = _model_list("MOCK_MALFORMED_MODELS")
+        self._throttle_rng = random.Random(self.mock.seed) if self.mock.seed is not None else random
+    
+    def invoke_model(self, modelId: str, body: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self._admit(modelId, body, "InvokeModel")
+        text = self.mock.generate(self._prompt_text(request))
+        stop_reason = "end_turn"
+        if modelId in self.malformed_models:
+            text = text[:len(text) // 2]
+            stop_reason = "max_tokens"
+        payload = {
+            "type": "message",
+            "role": "assistant",
+            "model": modelId,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "usage": {"input_tokens": len(body) // 4, "output_tokens": len(text) // 4}
+        }
+        return {"body": _Body(json.dumps(payload).encode("utf-8"))}
+    
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs: Any) -> Dict[str, Any]:
+        request = self._admit(modelId, body, "InvokeModelWithResponseStream")
+        
+        def events() -> Iterator[Dict[str, Any]]:
+            yield self._event({
+                "type": "message_start",
+                "message": {"model": modelId, "usage": {"input_tokens": len(body) // 4, "output_tokens": 1}}
+            })
+            output_chars = 0
+            for piece in self.mock.generate_stream(self._prompt_text(request)):
+                output_chars += len(piece)
+                yield self._event({"type": "content_block_delta", "delta": {"type": "text_delta", "text": piece}})
+            yield self._event({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": output_chars // 4}
+            })
+            yield self._event({"type": "message_stop"})
+        
+        return {"body": events()}
+    
+    def _admit(self, model_id: str, body: str, operation: str) -> Dict[str, Any]:
+        """Decode the request, raising a ThrottlingException when simulating one"""
+        if model_id in self.throttled_models or self._throttle_rng.random() < self.throttle_rate:
+            from botocore.exceptions import ClientError
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Too many requests (mock)"}},
+                operation
+            )
+        return json.loads(body)
+    
+    @staticmethod
+    def _prompt_text(request: Dict[str, Any]) -> str:
+        """Flatten system blocks and user messages back into one prompt string"""
+        system = request.get("system", [])
+        parts: List[str] = [system] if isinstance(system, str) else [b.get("text", "") for b in system]
+        for message in request.get("messages", []):
+            content = message.get("content", "")
+            if isinstance(content, str):
+                parts.append(content)
+            else:
+                parts.extend(block.get("text", "") for block in content)
+        return "\n\n".join(parts)
+    
+    @staticmethod
+    def _event(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"chunk": {"bytes": json.dumps(payload).encode("utf-8")}}
+
+
+def _model_list(name: str) -> set:
+    return {m.strip() for m in os.getenv(name, "").split(",") if m.strip()}
+
+
+class _Body:
+    """Minimal StreamingBody replacement"""
+    
+    def __init__(self, data: bytes):
+        self._data = data
+    
+    def read(self) -> bytes:
+        return self._data
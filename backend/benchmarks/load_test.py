@@ -0,0 +1,371 @@
+"""
+Load test: drive the API at a fixed concurrency with a realistic request mix.
+
+Targets:
+    lambda  calls lambda_function.lambda_handler in-process with API Gateway
+            events (offline, against the Bedrock mock)
+    http    sends requests to a running local_server (--url)
+
+Reports throughput, end-to-end p50/p95/p99 per operation, per-stage
+p50/p95/p99 (estimated from the /metrics histograms) and the memory
+high-water mark of the process serving the requests.
+
+Usage:
+    python benchmarks/load_test.py --requests 500 --concurrency 16
+    python benchmarks/load_test.py --target http --url http://localhost:8000 \\
+        --mix generate=50,cached=30,batch=10,regenerate=10
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_search import _percentiles  # noqa: E402
+
+
+DEFAULT_MIX = "generate=60,cached=20,batch=10,regenerate=10"
+
+CONTENT_TYPES = ("landing_page", "product_page", "blog_post", "about_page", "pricing_page")
+LANGUAGES = ("en", "en", "en", "es", "de", "fr")
+TONES = ("professional", "casual", "friendly", "formal")
+DESCRIPTIONS = (
+    "A secure analytics platform that helps growing teams understand product usage",
+    "Project management software with real-time collaboration and automated reporting",
+    "An AI-powered writing assistant for marketing teams that keeps the brand voice consistent",
+    "Cloud backup for small businesses with end-to-end encryption and one-click restore"
+)
+
+# Requests repeated by the "cached" operation; after their first run they
+# are served from the response cache
+CACHED_POOL_SIZE = 8
+
+API_PATHS = {
+    "generate": "/api/generate",
+    "cached": "/api/generate",
+    "batch": "/api/generate/batch",
+    "regenerate": "/api/regenerate"
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse ``name=weight,...`` into (operation, weight) pairs"""
+    mix = []
+    for entry in spec.split(","):
+        name, _, weight = entry.strip().partition("=")
+        if name not in API_PATHS:
+            raise ValueError(f"Unknown operation '{name}'; expected some of {list(API_PATHS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class RequestFactory:
+    """Builds request bodies for each operation of the mix"""
+    
+    def __init__(self, seed: int, batch_size: int):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.batch_size = batch_size
+        # Filled in by the setup request before the run starts
+        self.regenerate_content: Optional[Dict[str, Any]] = None
+    
+    def body(self, operation: str) -> Dict[str, Any]:
+        with self._lock:
+            self._counter += 1
+            if operation == "cached":
+                return self._generate_body(self._random.randrange(CACHED_POOL_SIZE), cached=True)
+            if operation == "batch":
+                return {"items": [self._generate_body(self._next()) for _ in range(self.batch_size)]}
+            if operation == "regenerate":
+                return {
+                    **self._generate_body(0, cached=True),
+                    "content": self.regenerate_content,
+                    "sections": self._random.choice([["faqs"], ["seo_meta"], ["hero_section", "cta"]])
+                }
+            return self._generate_body(self._next())
+    
+    def _next(self) -> int:
+        self._counter += 1
+        return CACHED_POOL_SIZE + self._counter
+    
+    def _generate_body(self, number: int, cached: bool = False) -> Dict[str, Any]:
+        # Cached requests derive every field from their number, so repeats
+        # hit the same cache key
+        rng = random.Random(number) if cached else self._random
+        return {
+            "title": f"Product {number}",
+            "description": rng.choice(DESCRIPTIONS),
+            "content_type": rng.choice(CONTENT_TYPES),
+            "language": rng.choice(LANGUAGES),
+            "tone": rng.choice(TONES)
+        }
+
+
+class LambdaTarget:
+    """Calls lambda_handler in-process"""
+    
+    name = "lambda"
+    
+    def __init__(self):
+        import lambda_function
+        self.lambda_function = lambda_function
+    
+    def call(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        event = {
+            "httpMethod": "POST",
+            "path": path,
+            "headers": {"Content-Type": "application/json", "Accept-Encoding": "gzip"},
+            "body": json.dumps(body)
+        }
+        response = self.lambda_function.lambda_handler(event, None)
+        if response["statusCode"] != 200 or response.get("isBase64Encoded"):
+            return response["statusCode"], {}
+        return response["statusCode"], json.loads(response["body"])
+    
+    def metrics_text(self) -> str:
+        return self.lambda_function.get_content_generator().metrics.render_prometheus()
+
+
+class HttpTarget:
+    """Sends requests to a running local_server"""
+    
+    name = "http"
+    
+    def __init__(self, url: str, timeout: float):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+    
+    def call(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+    
+    def metrics_text(self) -> str:
+        with urllib.request.urlopen(self.url + "/metrics", timeout=self.timeout) as response:
+            return response.read().decode("utf-8")
+
+
+def parse_histograms(text: str, metric: str, label: str) -> Dict[str, List[Tuple[float, float]]]:
+    """
+    Read cumulative buckets of one histogram from Prometheus text
+    
+    Returns:
+        Label value -> [(upper bound, cumulative count), ...] in bound order
+    """
+    histograms: Dict[str, List[Tuple[float, float]]] = {}
+    prefix = metric + "_bucket{"
+    for line in text.splitlines():
+        if not line.startswith(prefix):
+            continue
+        labels_text, _, value = line[len(prefix):].rpartition("} ")
+        labels = dict(part.split("=", 1) for part in labels_text.split(","))
+        name = labels[label].strip('"')
+        le = labels["le"].strip('"')
+        bound = float("inf") if le == "+Inf" else float(le)
+        histograms.setdefault(name, []).append((bound, float(value)))
+    return histograms
+
+
+def read_gauge(text: str, metric: str) -> Optional[float]:
+    for line in text.splitlines():
+        if line.startswith(metric + " "):
+            return float(line.split()[1])
+    return None
+
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Estimate a quantile from cumulative buckets, interpolating linearly like Prometheus"""
+    total = buckets[-1][1] if buckets else 0
+    if total <= 0:
+        return None
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float("inf"):
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+def stage_percentiles(before: str, after: str) -> Dict[str, Dict[str, Any]]:
+    """Per-stage p50/p95/p99 of the observations made between two scrapes"""
+    start = parse_histograms(before, "content_stage_duration_ms", "stage")
+    end = parse_histograms(after, "content_stage_duration_ms", "stage")
+    stages = {}
+    for stage, buckets in end.items():
+        earlier = dict(start.get(stage, []))
+        delta = [(bound, count - earlier.get(bound, 0)) for bound, count in buckets]
+        stages[stage] = {
+            "count": int(delta[-1][1]),
+            **{
+                f"p{int(q * 100)}_ms": _round(histogram_quantile(q, delta))
+                for q in (0.5, 0.95, 0.99)
+            }
+        }
+    return stages
+
+
+def run_load(
+    target: Any,
+    factory: RequestFactory,
+    mix: List[Tuple[str, float]],
+    requests: int,
+    concurrency: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Send `requests` requests from `concurrency` workers and collect latencies"""
+    rng = random.Random(seed)
+    operations = rng.choices([name for name, _ in mix], weights=[w for _, w in mix], k=requests)
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    
+    def send(operation: str) -> None:
+        body = factory.body(operation)
+        started = time.perf_counter()
+        try:
+            status, _ = target.call(API_PATHS[operation], body)
+        except Exception:
+            status = 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            if status == 200:
+                samples.setdefault(operation, []).append(elapsed_ms)
+            else:
+                errors[operation] = errors.get(operation, 0) + 1
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+        list(pool.map(send, operations))
+    elapsed_s = time.perf_counter() - started
+    
+    completed = sum(len(s) for s in samples.values())
+    every = [ms for s in samples.values() for ms in s]
+    return {
+        "requests": requests,
+        "completed": completed,
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(completed / elapsed_s, 2) if elapsed_s else 0.0,
+        "latency": {
+            "all": {"count": len(every), **_percentiles(every)} if every else {},
+            **{
+                operation: {"count": len(s), **_percentiles(s)}
+                for operation, s in sorted(samples.items())
+            }
+        }
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+def _configure_offline(args: argparse.Namespace) -> None:
+    """Environment for an in-process run against the mocks"""
+    state = tempfile.mkdtemp(prefix="content-load-")
+    os.environ.update({
+        "USE_LOCAL_MOCKS": "true",
+        "MOCK_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "MOCK_MS_PER_TOKEN": str(args.ms_per_token),
+        "VECTOR_DB_TYPE": "numpy",
+        "NUMPY_INDEX_PATH": os.path.join(state, "index"),
+        "RESPONSE_CACHE_PATH": os.path.join(state, "response_cache.db"),
+        "HISTORY_PATH": os.path.join(state, "history.db"),
+        "JOB_STORE_PATH": os.path.join(state, "jobs.db"),
+        "MODEL_ROUTING_LOG": "false",
+        "METRICS_EMF": "false"
+    })
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    run = report["run"]
+    print(
+        f"target={report['target']} requests={run['requests']} completed={run['completed']} "
+        f"errors={sum(run['errors'].values())} elapsed_s={run['elapsed_s']} "
+        f"throughput_rps={run['throughput_rps']}"
+    )
+    print(f"\n{'operation':<12} {'count':>7} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for operation, r in run["latency"].items():
+        if r:
+            print(f"{operation:<12} {r['count']:>7} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    print(f"\n{'stage':<12} {'count':>7} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for stage, r in report["stages"].items():
+        print(f"{stage:<12} {r['count']:>7} {r['p50_ms']!s:>9} {r['p95_ms']!s:>9} {r['p99_ms']!s:>9}")
+    peak = report["max_rss_mb"]
+    print(f"\nmemory high-water mark: {peak if peak is not None else 'n/a'} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=("lambda", "http"), default="lambda")
+    parser.add_argument("--url", default="http://localhost:8000", help="local_server base URL (http target)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout (http target)")
+    parser.add_argument("--first-token-ms", type=float, default=0, help="Simulated model latency (lambda target)")
+    parser.add_argument("--ms-per-token", type=float, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+    
+    mix = parse_mix(args.mix)
+    if args.target == "lambda":
+        _configure_offline(args)
+        target: Any = LambdaTarget()
+    else:
+        target = HttpTarget(args.url, args.timeout)
+    
+    factory = RequestFactory(args.seed, args.batch_size)
+    status, content = target.call(API_PATHS["generate"], {**factory.body("cached"), "formats": []})
+    if status != 200:
+        raise SystemExit(f"Setup request failed with status {status}")
+    factory.regenerate_content = content
+    if args.warmup:
+        run_load(target, factory, mix, args.warmup, args.concurrency, args.seed + 1)
+    
+    before = target.metrics_text()
+    run = run_load(target, factory, mix, args.requests, args.concurrency, args.seed)
+    after = target.metrics_text()
+    
+    peak = read_gauge(after, "content_process_max_rss_bytes")
+    report = {
+        "target": target.name,
+        "concurrency": args.concurrency,
+        "mix": dict(mix),
+        "run": run,
+        "stages": stage_percentiles(before, after),
+        "max_rss_mb": round(peak / 2 ** 20, 1) if peak is not None else None
+    }
+    _print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Microbenchmarks for the CPU-bound pipeline stages, with stored baselines.
+
+Times retrieval (NumPy index plus BM25 fusion, search cache off), prompt
+building, parsing (whole response and streamed) and rendering of each
+format, all offline against the mocks. Results are compared with
+benchmarks/baselines.json; the run fails when a benchmark is slower than
+its baseline by more than the threshold. Baselines are machine-specific:
+record them with --save-baseline on the machine that runs the check.
+
+Usage:
+    python benchmarks/microbench.py
+    python benchmarks/microbench.py --threshold 0.3 --only parse_full render_html
+    python benchmarks/microbench.py --save-baseline
+"""
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+import platform
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Synthetic documents added to the sample knowledge base for retrieval
+CORPUS_SIZE = 2000
+
+TITLE = "Acme Analytics"
+DESCRIPTION = "A secure analytics platform that helps growing teams understand product usage"
+CONTEXT = [
+    "Product analytics shows how customers use each feature and where they drop off.",
+    "Role-based access control and encryption at rest keep customer data secure.",
+    "Dashboards can be shared with the whole team and refresh in real time."
+]
+
+
+def build_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Set up the offline pipeline pieces and return name -> zero-argument callable"""
+    state = tempfile.mkdtemp(prefix="content-microbench-")
+    os.environ.update({
+        "USE_LOCAL_MOCKS": "true",
+        "VECTOR_DB_TYPE": "numpy",
+        "NUMPY_INDEX_PATH": os.path.join(state, "index"),
+        "SEARCH_CACHE_ENABLED": "false",
+        "EMBEDDING_CACHE_SIZE": "0"
+    })
+    from bedrock_mock import BedrockMock
+    from json_stream import SectionStreamParser, parse_sections
+    from prompt_templates import get_template
+    from renderer import render_content
+    from vector_store import VectorStore
+    
+    rng = random.Random(0)
+    words = (
+        "secure fast team data report dashboard customer product launch growth insight "
+        "automation workflow cloud privacy integration pricing support onboarding"
+    ).split()
+    store = VectorStore()
+    store.add_documents([
+        " ".join(rng.choice(words) for _ in range(rng.randint(12, 40))) for _ in range(CORPUS_SIZE)
+    ])
+    queries = [" ".join(rng.choice(words) for _ in range(8)) for _ in range(64)]
+    query_cycle = iter(range(10 ** 12))
+    
+    template = get_template("landing_page")
+    prompt = template.render(
+        title=TITLE,
+        description=DESCRIPTION,
+        tone="professional",
+        language="en",
+        content_type="landing_page",
+        context=CONTEXT,
+        input_token_budget=3000
+    )
+    response_text = BedrockMock().generate(prompt.text)
+    chunks = [response_text[i:i + 16] for i in range(0, len(response_text), 16)]
+    sections = parse_sections(response_text, template.sections).sections
+    
+    def retrieval() -> Any:
+        return store.search(queries[next(query_cycle) % len(queries)], top_k=3, filters={"language": "en"})
+    
+    def prompt_build() -> Any:
+        return template.render(
+            title=TITLE,
+            description=DESCRIPTION,
+            tone="professional",
+            language="en",
+            content_type="landing_page",
+            context=CONTEXT,
+            input_token_budget=3000
+        )
+    
+    def parse_stream() -> Any:
+        parser = SectionStreamParser()
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.result(template.sections)
+    
+    return {
+        "retrieval": retrieval,
+        "prompt_build": prompt_build,
+        "parse_full": lambda: parse_sections(response_text, template.sections),
+        "parse_stream": parse_stream,
+        "render_html": lambda: render_content(sections, TITLE, "en", ["html"]),
+        "render_markdown": lambda: render_content(sections, TITLE, "en", ["markdown"]),
+        "render_jsonld": lambda: render_content(sections, TITLE, "en", ["jsonld"])
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> float:
+    """
+    Microseconds per call in the fastest of `repeat` rounds of an
+    auto-sized loop; slower rounds measure interference, not the code
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def load_baselines(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("benchmarks", {})
+
+
+def save_baselines(path: str, results: Dict[str, float]) -> None:
+    merged = {**load_baselines(path), **results}
+    with open(path, "w") as f:
+        json.dump({
+            "machine": f"{platform.system()} {platform.machine()}",
+            "python": platform.python_version(),
+            "unit": "us_per_op",
+            "benchmarks": {name: round(us, 3) for name, us in sorted(merged.items())}
+        }, f, indent=2)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline (0.25 = 25%%)"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    args = parser.parse_args()
+    
+    benchmarks = build_benchmarks()
+    unknown = set(args.only or []) - set(benchmarks)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks {sorted(unknown)}; expected some of {list(benchmarks)}")
+    names: List[str] = args.only or list(benchmarks)
+    baselines = load_baselines(args.baseline)
+    
+    results: Dict[str, float] = {}
+    regressions = []
+    print(f"{'benchmark':<16} {'us_per_op':>11} {'baseline':>11} {'change':>8}")
+    for name in names:
+        us = measure(benchmarks[name], args.repeat)
+        results[name] = us
+        baseline: Optional[float] = baselines.get(name)
+        change = ""
+        if baseline:
+            ratio = us / baseline - 1
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<16} {us:>11.2f} {baseline if baseline else '-':>11} {change:>8}")
+    
+    if args.save_baseline:
+        save_baselines(args.baseline, results)
+        print(f"\nBaselines written to {args.baseline}")
+    elif regressions:
+        print(f"\nRegressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Wall-clock latency benchmark: single-shot vs parallel per-section generation.
+
+Runs against the local Bedrock mock with simulated model latency (time to
+first token plus a per-output-token cost), so results reflect how output
+length drives latency without calling AWS.
+
+Usage:
+    python benchmarks/section_generation.py --requests 20 --first-token-ms 400 --ms-per-token 15
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_search import _percentiles  # noqa: E402
+
+
+def bench_mode(generator, parallel: bool, requests: int) -> Dict[str, float]:
+    generator.parallel_sections = parallel
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        content = generator.generate(
+            title=f"Product {i}",
+            description="A secure analytics platform for growing teams",
+            content_type="landing_page",
+            use_cache=False
+        )
+        samples.append((time.perf_counter() - started) * 1000)
+        assert "html_content" in content
+    return _percentiles(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--ms-per-token", type=float, default=15)
+    args = parser.parse_args()
+    
+    os.environ.update({
+        "USE_LOCAL_MOCKS": "true",
+        "MOCK_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "MOCK_MS_PER_TOKEN": str(args.ms_per_token),
+        "VECTOR_DB_TYPE": "numpy",
+        "NUMPY_INDEX_PATH": tempfile.mkdtemp(),
+        "RESPONSE_CACHE_ENABLED": "false",
+        "MODEL_ROUTING_LOG": "false"
+    })
+    from vector_store import VectorStore
+    from content_generator import ContentGenerator
+    
+    generator = ContentGenerator(VectorStore())
+    
+    print(f"{'mode':<10} {'p50_ms':>9} {'p95_ms':>9} {'mean_ms':>9}")
+    for mode, parallel in (("single", False), ("sections", True)):
+        r = bench_mode(generator, parallel, args.requests)
+        print(f"{mode:<10} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['mean_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
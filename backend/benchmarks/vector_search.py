@@ -0,0 +1,111 @@
+"""
+Search latency benchmark: built-in NumPy index vs ChromaDB.
+
+Usage:
+    python benchmarks/vector_search.py --sizes 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy_index import NumpyVectorIndex  # noqa: E402
+from vector_store import _load_chromadb  # noqa: E402
+
+
+def _random_vectors(count: int, dimension: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "p99_ms": round(ordered[int(0.99 * (len(ordered) - 1))], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3)
+    }
+
+
+def bench_numpy(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> Dict[str, float]:
+    index = NumpyVectorIndex(vectors.shape[1])
+    started = time.perf_counter()
+    # Adding in one block keeps the build comparable to a bulk load
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+    index.add(ids, vectors, [""] * len(vectors))
+    build_s = time.perf_counter() - started
+    
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search([query], top_k)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"build_s": round(build_s, 2), **_percentiles(samples)}
+
+
+def bench_chroma(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> Dict[str, float]:
+    chromadb = _load_chromadb()
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        
+        started = time.perf_counter()
+        batch_size = 5000
+        for start in range(0, len(vectors), batch_size):
+            chunk = vectors[start:start + batch_size]
+            collection.add(
+                ids=[f"doc_{start + i}" for i in range(len(chunk))],
+                embeddings=chunk.tolist()
+            )
+        build_s = time.perf_counter() - started
+        
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            collection.query(query_embeddings=[query.tolist()], n_results=top_k)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {"build_s": round(build_s, 2), **_percentiles(samples)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument(
+        "--chroma-max-docs",
+        type=int,
+        default=100000,
+        help="Skip ChromaDB above this size (index build time grows quickly)"
+    )
+    args = parser.parse_args()
+    
+    has_chroma = _load_chromadb() is not None
+    queries = _random_vectors(args.queries, args.dimension, seed=1)
+    
+    print(f"{'backend':<8} {'docs':>9} {'build_s':>9} {'p50_ms':>9} {'p95_ms':>9} {'mean_ms':>9}")
+    for size in args.sizes:
+        vectors = _random_vectors(size, args.dimension, seed=0)
+        results = {"numpy": bench_numpy(vectors, queries, args.top_k)}
+        if has_chroma and size <= args.chroma_max_docs:
+            results["chroma"] = bench_chroma(vectors, queries, args.top_k)
+        
+        for backend, r in results.items():
+            print(
+                f"{backend:<8} {size:>9} {r['build_s']:>9} "
+                f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['mean_ms']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,38 @@ Supports both AWS Bedrock and local mock for development.
 """
 import os
 import json
-from typing import Dict, List, Any, Optional
-import boto3
-from botocore.exceptions import ClientError
+import copy
+import time
+import uuid
+import hashlib
+import functools
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterator, AsyncIterator, Sequence, Tuple
 
 from vector_store import VectorStore
-from bedrock_mock import BedrockMock
+from bedrock_mock import BedrockMock, BedrockRuntimeMock
+from bedrock_client import BedrockInvoker
+from json_stream import ParsedSections, ParseStats, SectionStreamParser, parse_sections
+from response_cache import ResponseCache, SingleFlight, make_cache_key
+from prompt_templates import (
+    SECTION_GROUPS,
+    TEMPLATE_VERSION,
+    PromptTemplate,
+    RenderedPrompt,
+    estimate_tokens,
+    get_template,
+    render_translation
+)
+from model_router import ModelRouter, RoutingDecision
+from renderer import render_content, resolve_formats, strip_rendered
+from history import DEFAULT_USER, GenerationHistory, utc_timestamp
+from metrics import Metrics
+
+
+class FallbackContent(dict):
+    """Placeholder content returned when the model response cannot be parsed"""
 
 
 class ContentGenerator:
@@ -19,15 +45,59 @@ class ContentGenerator:
         self.vector_store = vector_store
         self.use_local_mocks = os.getenv("USE_LOCAL_MOCKS", "true").lower() == "true"
         self.region = os.getenv("AWS_REGION", "us-east-1")
+        # Upper bound on generations running at once through agenerate()
+        self.max_concurrency = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "32"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Estimated input tokens per prompt; retrieved context is trimmed to fit
+        self.input_token_budget = int(os.getenv("PROMPT_INPUT_TOKEN_BUDGET", "3000"))
+        # Mark the static template prefix for Bedrock prompt caching. Bedrock
+        # ignores the marker on a prefix below the model's minimum (1024
+        # tokens, 2048 for Haiku), so shorter prefixes are sent unmarked.
+        self.prompt_caching = os.getenv("BEDROCK_PROMPT_CACHING", "true").lower() == "true"
+        self.prompt_cache_min_tokens = int(os.getenv("BEDROCK_PROMPT_CACHE_MIN_TOKENS", "1024"))
+        # Generate section groups with concurrent smaller prompts instead of
+        # one prompt for the whole page (non-streaming requests only)
+        self.parallel_sections = os.getenv("PARALLEL_SECTIONS", "false").lower() == "true"
+        # Keep the valid sections of a broken response and regenerate only
+        # the missing ones, instead of retrying the whole generation
+        self.json_salvage = os.getenv("JSON_SALVAGE_ENABLED", "true").lower() == "true"
+        self._parse_stats = ParseStats()
+        self.metrics = Metrics.from_env()
+        # Identical generate() calls in flight at the same time share one
+        # generation, with or without the response cache
+        self.coalescing = SingleFlight() if os.getenv("REQUEST_COALESCING", "true").lower() == "true" else None
+        # Token usage of the last model call made on each thread
+        self._usage = threading.local()
         
         if not self.use_local_mocks:
-            self.bedrock_runtime = boto3.client(
-                'bedrock-runtime',
-                region_name=self.region
-            )
             self.model_id = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20241022-v2:0")
+            client_factory = None
         else:
             self.bedrock_mock = BedrockMock()
+            self.model_id = "local-mock"
+            # The mock speaks the bedrock-runtime API, so local runs exercise
+            # the same rate limiting, retry and failover path as AWS. With
+            # BEDROCK_ENDPOINT_URL (e.g. bedrock_emulator.py) the real boto3
+            # client is used instead.
+            client_factory = None
+            if not os.getenv("BEDROCK_ENDPOINT_URL"):
+                client_factory = lambda region: BedrockRuntimeMock(region, self.bedrock_mock)
+        
+        # boto3 clients are created on first use, which keeps boto3 off the
+        # cold-start path for local/mock runs
+        self.bedrock = BedrockInvoker.from_env(
+            self.model_id,
+            self.region,
+            pool_size=self.max_concurrency,
+            client_factory=client_factory
+        )
+        
+        # Picks Haiku or Sonnet per request; self.model_id is the quality model
+        self.router = ModelRouter.from_env(self.model_id, self.use_local_mocks)
+        
+        self.response_cache = ResponseCache.from_env(self.use_local_mocks, self.region)
+        self.history = GenerationHistory.from_env(self.use_local_mocks, self.region)
     
     def generate(
         self,
@@ -35,7 +105,11 @@ class ContentGenerator:
         description: str,
         tone: str = "professional",
         language: str = "en",
-        content_type: str = "landing_page"
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate comprehensive content for a page.
@@ -46,235 +120,1317 @@ class ContentGenerator:
             tone: Content tone (professional, casual, etc.)
             language: Language code
             content_type: Type of content to generate
+            use_cache: Serve from the response cache when possible; when
+                False the cache is bypassed and refreshed with the new result
+            tier: Latency/quality tier for model routing ("fast",
+                "balanced" or "quality"); None uses the default tier
+            formats: Renderings to add ("html", "markdown", "jsonld");
+                None uses the default formats, [] returns sections only
+            user_id: Owner of the generation in the history
+        
+        Returns:
+            Dictionary with generated content sections and renderings
+        
+        Raises:
+            ValueError: If a format is unknown
+        """
+        started = time.perf_counter()
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": language,
+            "content_type": content_type
+        }
+        formats = resolve_formats(formats)
+        route = self.router.route(params, tier)
+        cache_key, cached = self._cache_lookup(params, use_cache, route.model_id)
+        if cached is not None:
+            self._record_generation("generate", params, route, cached, started, 0.0, user_id, cached=True)
+            return self._render(cached, title, language, formats)
+        
+        def run() -> Tuple[Dict[str, Any], float]:
+            # Retrieve relevant context from vector store
+            search_started = time.perf_counter()
+            relevant_context = self.vector_store.search(
+                description, top_k=3, filters=self._context_filters(params)
+            )
+            retrieval_ms = (time.perf_counter() - search_started) * 1000
+            self.metrics.observe("retrieval", retrieval_ms)
             
+            content = self._generate_from_context(context=relevant_context, route=route, **params)
+            self._cache_store(cache_key, content)
+            return content, retrieval_ms
+        
+        if use_cache:
+            flight_key = cache_key or make_cache_key(params, route.model_id, TEMPLATE_VERSION)
+            (content, retrieval_ms), coalesced = self._coalesce(flight_key, run)
+        else:
+            # A bypass asks for new content, so it never joins (or lets
+            # others join) a generation that started before it
+            (content, retrieval_ms), coalesced = run(), False
+        if coalesced:
+            retrieval_ms = 0.0
+        self._record_generation(
+            "generate", params, route, content, started, retrieval_ms, user_id, coalesced=coalesced
+        )
+        return self._render(content, title, language, formats)
+    
+    async def agenerate(
+        self,
+        title: str,
+        description: str,
+        tone: str = "professional",
+        language: str = "en",
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate() for use inside an event loop.
+        
+        Cache lookups, retrieval and the model call are blocking I/O, so the
+        generation runs on a dedicated thread pool; at most
+        ``max_concurrency`` generations are in flight at once and the rest
+        wait without blocking the loop.
+        
+        Args:
+            title: Page title
+            description: Product/service description
+            tone: Content tone (professional, casual, etc.)
+            language: Language code
+            content_type: Type of content to generate
+            use_cache: Serve from the response cache when possible
+            tier: Latency/quality tier for model routing
+            formats: Renderings to add (see generate())
+            user_id: Owner of the generation in the history
+        
         Returns:
-            Dictionary with generated content sections
+            Dictionary with generated content sections and renderings
         """
-        # Retrieve relevant context from vector store
-        relevant_context = self.vector_store.search(description, top_k=3)
+        async with self._get_semaphore():
+            return await self._run_blocking(functools.partial(
+                self.generate,
+                title=title,
+                description=description,
+                tone=tone,
+                language=language,
+                content_type=content_type,
+                use_cache=use_cache,
+                tier=tier,
+                formats=formats,
+                user_id=user_id
+            ))
+    
+    def generate_stream(
+        self,
+        title: str,
+        description: str,
+        tone: str = "professional",
+        language: str = "en",
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate content, yielding each section as soon as the model finishes it.
         
-        # Build prompt
-        prompt = self._build_prompt(
-            title=title,
-            description=description,
-            tone=tone,
-            language=language,
-            content_type=content_type,
-            context=relevant_context
+        Args:
+            title: Page title
+            description: Product/service description
+            tone: Content tone (professional, casual, etc.)
+            language: Language code
+            content_type: Type of content to generate
+            use_cache: Serve from the response cache when possible
+            tier: Latency/quality tier for model routing
+            formats: Renderings to add to the complete event (see generate())
+            user_id: Owner of the generation in the history
+        
+        Yields:
+            ``{"event": "section", "section": name, "data": value}`` for every
+            completed section, then ``{"event": "complete", "data": content}``
+            with the full result (including the requested renderings). Every event carries
+            ``elapsed_ms`` since the request started.
+        """
+        started = time.perf_counter()
+        
+        def event(**fields: Any) -> Dict[str, Any]:
+            fields["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return fields
+        
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": language,
+            "content_type": content_type
+        }
+        formats = resolve_formats(formats)
+        # Sections are sent as soon as they are parsed, so a streamed request
+        # is never escalated to a larger model
+        route = self.router.route(params, tier)
+        cache_key, cached = self._cache_lookup(params, use_cache, route.model_id)
+        if cached is not None:
+            for name, value in cached.items():
+                yield event(event="section", section=name, data=value)
+            self._record_generation("stream", params, route, cached, started, 0.0, user_id, cached=True)
+            yield event(event="complete", data=self._render(cached, title, language, formats))
+            return
+        
+        search_started = time.perf_counter()
+        relevant_context = self.vector_store.search(
+            description, top_k=3, filters=self._context_filters(params)
         )
+        retrieval_ms = (time.perf_counter() - search_started) * 1000
+        self.metrics.observe("retrieval", retrieval_ms)
+        
+        prompt = self._build_prompt(context=relevant_context, **params)
         
-        # Call Bedrock
-        if self.use_local_mocks:
-            response_text = self.bedrock_mock.generate(prompt)
+        parser = SectionStreamParser()
+        chunks = []
+        model_started = time.perf_counter()
+        for chunk in self._invoke_model_stream(prompt, route.model_id):
+            chunks.append(chunk)
+            for name, value in parser.feed(chunk):
+                yield event(event="section", section=name, data=value)
+        
+        response_text = "".join(chunks)
+        model_ms = (time.perf_counter() - model_started) * 1000
+        # Includes the incremental section parsing done while streaming
+        self.metrics.observe("model", model_ms)
+        self.router.record(route, route.model_id, model_ms, *self._tokens_used(prompt, response_text))
+        
+        template = get_template(content_type)
+        with self.metrics.timer("parse"):
+            parsed = parser.result(template.sections)
+        self._parse_stats.record(parsed)
+        content = self._complete_sections(parsed, template, route, relevant_context, params)
+        if content is None:
+            content = self._create_fallback_content(title, description, response_text, parsed.sections)
         else:
-            response_text = self._call_bedrock(prompt)
+            # Sections that were missing or invalid in the stream
+            for name in parsed.missing:
+                yield event(event="section", section=name, data=content[name])
+        self._cache_store(cache_key, content)
+        self._record_generation("stream", params, route, content, started, retrieval_ms, user_id)
+        yield event(event="complete", data=self._render(content, title, language, formats))
+    
+    async def agenerate_stream(
+        self,
+        title: str,
+        description: str,
+        tone: str = "professional",
+        language: str = "en",
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of generate_stream() for use inside an event loop.
         
-        # Parse and structure response
-        content = self._parse_response(response_text, title, description)
+        The blocking stream is consumed on the generator's thread pool and
+        its events are handed back to the loop as they arrive. If the caller
+        stops early (e.g. the client disconnects), the producer is told to
+        stop and the concurrency slot is held until it has exited, so an
+        abandoned stream does not keep drawing from Bedrock unaccounted.
+        """
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stop = threading.Event()
         
-        return content
+        def produce() -> None:
+            stream = self.generate_stream(
+                title=title,
+                description=description,
+                tone=tone,
+                language=language,
+                content_type=content_type,
+                use_cache=use_cache,
+                tier=tier,
+                formats=formats,
+                user_id=user_id
+            )
+            try:
+                for event in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                stream.close()
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+        
+        try:
+            producer = loop.run_in_executor(self._get_executor(), produce)
+        except BaseException:
+            semaphore.release()
+            raise
+        # The slot belongs to the producer thread, not to this coroutine
+        producer.add_done_callback(lambda _: semaphore.release())
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
     
-    def _build_prompt(
+    def generate_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_parallel: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate content for many requests at once.
+        
+        Cached items are answered immediately. Retrieval for the remaining
+        items is done up front in one batched search, then the model calls
+        run on a bounded thread pool. A failing item does not affect the
+        others.
+        
+        Args:
+            items: Request dicts with the same fields as generate(), plus
+                optional ``bypass_cache``, ``tier``, ``formats`` and ``user_id`` fields
+            max_parallel: Maximum generations in flight (defaults to
+                BATCH_MAX_PARALLEL, never more than max_concurrency)
+        
+        Returns:
+            One result per item, in input order: ``{"index", "status":
+            "success", "content"}`` or ``{"index", "status": "error", "error"}``
+        """
+        started = time.perf_counter()
+        params, routes, cache_keys, results = self._prepare_batch(items)
+        search_started = time.perf_counter()
+        contexts = self.vector_store.search_many(
+            [p["description"] for p in params.values()],
+            top_k=3,
+            filters=[self._context_filters(p) for p in params.values()]
+        )
+        retrieval_ms = (time.perf_counter() - search_started) * 1000
+        self.metrics.observe("retrieval", retrieval_ms)
+        
+        with ThreadPoolExecutor(
+            max_workers=self._batch_parallelism(max_parallel),
+            thread_name_prefix="content-batch"
+        ) as pool:
+            futures = {
+                index: pool.submit(
+                    self._generate_from_context, context=context, route=routes[index], **item
+                )
+                for (index, item), context in zip(params.items(), contexts)
+            }
+            for index, future in futures.items():
+                try:
+                    content = future.result()
+                    self._cache_store(cache_keys.get(index), content)
+                    self._record_generation(
+                        "batch", params[index], routes[index], content, started, retrieval_ms,
+                        items[index].get("user_id")
+                    )
+                    results[index] = self._batch_success(index, content, items[index])
+                except Exception as e:
+                    results[index] = self._batch_error(index, str(e))
+        
+        return results
+    
+    async def agenerate_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_parallel: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of generate_batch() for use inside an event loop"""
+        started = time.perf_counter()
+        params, routes, cache_keys, results = await self._run_blocking(self._prepare_batch, items)
+        search_started = time.perf_counter()
+        contexts = await self._run_blocking(
+            self.vector_store.search_many,
+            [p["description"] for p in params.values()],
+            3,
+            [self._context_filters(p) for p in params.values()]
+        )
+        retrieval_ms = (time.perf_counter() - search_started) * 1000
+        self.metrics.observe("retrieval", retrieval_ms)
+        
+        limiter = asyncio.Semaphore(self._batch_parallelism(max_parallel))
+        
+        async def run(index: int, item: Dict[str, Any], context: List[str]) -> None:
+            async with limiter:
+                try:
+                    content = await self._run_blocking(
+                        functools.partial(
+                            self._generate_from_context, context=context, route=routes[index], **item
+                        )
+                    )
+                    await self._run_blocking(self._cache_store, cache_keys.get(index), content)
+                    self._record_generation(
+                        "batch", item, routes[index], content, started, retrieval_ms,
+                        items[index].get("user_id")
+                    )
+                    results[index] = self._batch_success(index, content, items[index])
+                except Exception as e:
+                    results[index] = self._batch_error(index, str(e))
+        
+        await asyncio.gather(*[
+            run(index, item, context)
+            for (index, item), context in zip(params.items(), contexts)
+        ])
+        return results
+    
+    def regenerate_sections(
         self,
+        content: Dict[str, Any],
+        sections: List[str],
         title: str,
         description: str,
-        tone: str,
+        tone: str = "professional",
+        language: str = "en",
+        content_type: str = "landing_page",
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Regenerate selected sections of previously generated content.
+        
+        Only the requested sections are asked for, in one reduced prompt
+        that also shows the model the rejected versions; every other section
+        is kept as is and the requested renderings are rebuilt.
+        
+        Args:
+            content: Content dict returned by generate()
+            sections: Names of the sections to regenerate
+            title: Page title
+            description: Product/service description
+            tone: Content tone (professional, casual, etc.)
+            language: Language code
+            content_type: Type of content to generate
+            tier: Latency/quality tier for model routing
+            formats: Renderings to add (see generate())
+            user_id: Owner of the generation in the history
+        
+        Returns:
+            The updated content dict
+        
+        Raises:
+            ValueError: If a section name or format is unknown
+            RuntimeError: If the model output is unusable
+        """
+        formats = resolve_formats(formats)
+        template = get_template(content_type)
+        unknown = [name for name in sections if name not in template.sections]
+        if unknown or not sections:
+            raise ValueError(
+                f"Unknown sections {unknown}; expected some of {list(template.sections)}"
+            )
+        
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": language,
+            "content_type": content_type
+        }
+        route = self.router.route(params, tier)
+        names = tuple(name for name in template.sections if name in sections)
+        previous = {name: content[name] for name in names if name in content}
+        notes = None
+        if previous:
+            notes = (
+                "The editor rejected the previous version of these sections; "
+                "write new ones that differ from it:\n" + json.dumps(previous, ensure_ascii=False)
+            )
+        
+        search_started = time.perf_counter()
+        relevant_context = self.vector_store.search(
+            description, top_k=3, filters=self._context_filters(params)
+        )
+        retrieval_ms = (time.perf_counter() - search_started) * 1000
+        self.metrics.observe("retrieval", retrieval_ms)
+        model_started = time.perf_counter()
+        data, _, input_tokens, output_tokens = self._generate_section_group(
+            template.for_sections(names),
+            route,
+            context=relevant_context,
+            notes=notes,
+            **params
+        )
+        self.router.record(
+            route, route.model_id, (time.perf_counter() - model_started) * 1000, input_tokens, output_tokens
+        )
+        if data is None:
+            raise RuntimeError(f"Model returned unusable output for sections {list(names)}")
+        
+        updated = {**strip_rendered(content), **data}
+        self._record_generation("regenerate", params, route, updated, search_started, retrieval_ms, user_id)
+        return self._render(updated, title, language, formats)
+    
+    async def aregenerate_sections(
+        self,
+        content: Dict[str, Any],
+        sections: List[str],
+        title: str,
+        description: str,
+        tone: str = "professional",
+        language: str = "en",
+        content_type: str = "landing_page",
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async variant of regenerate_sections() for use inside an event loop"""
+        async with self._get_semaphore():
+            return await self._run_blocking(functools.partial(
+                self.regenerate_sections,
+                content,
+                sections,
+                title=title,
+                description=description,
+                tone=tone,
+                language=language,
+                content_type=content_type,
+                tier=tier,
+                formats=formats,
+                user_id=user_id
+            ))
+    
+    def generate_multilingual(
+        self,
+        title: str,
+        description: str,
+        languages: Sequence[str],
+        tone: str = "professional",
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate one page in several languages.
+        
+        The first language is generated like generate() (one retrieval, the
+        full prompt, response cache and coalescing). The other languages are
+        then translated from it concurrently with compact translation-only
+        prompts that carry no retrieved context, and are cached per source
+        content. A failed translation does not affect the other languages.
+        
+        Args:
+            title: Page title
+            description: Product/service description
+            languages: Language codes; the first is the source language
+            tone: Content tone (professional, casual, etc.)
+            content_type: Type of content to generate
+            use_cache: Serve from the response cache when possible
+            tier: Latency/quality tier for model routing
+            formats: Renderings to add to every language (see generate())
+            user_id: Owner of the generations in the history
+        
+        Returns:
+            ``{"source_language", "languages": {code: content}, "errors":
+            {code: message}}``; each language's renderings use its own
+            ``lang`` attribute
+        
+        Raises:
+            ValueError: If no language is given or a format is unknown
+        """
+        languages = list(dict.fromkeys(code.strip() for code in languages if code and code.strip()))
+        if not languages:
+            raise ValueError("languages must contain at least one language code")
+        formats = resolve_formats(formats)
+        source_language = languages[0]
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": source_language,
+            "content_type": content_type
+        }
+        source = self.generate(
+            use_cache=use_cache, tier=tier, formats=[], user_id=user_id, **params
+        )
+        results = {source_language: self._render(source, title, source_language, formats)}
+        errors: Dict[str, str] = {}
+        targets = languages[1:]
+        if not targets:
+            return {"source_language": source_language, "languages": results, "errors": errors}
+        if isinstance(source, FallbackContent):
+            # Translating placeholder content would only spend model calls
+            for language in targets:
+                errors[language] = f"No usable {source_language} content to translate"
+            return {"source_language": source_language, "languages": results, "errors": errors}
+        
+        with ThreadPoolExecutor(
+            max_workers=min(len(targets), self.max_concurrency),
+            thread_name_prefix="content-translate"
+        ) as pool:
+            futures = {
+                language: pool.submit(self._translate, source, language, params, use_cache, tier, user_id)
+                for language in targets
+            }
+            for language, future in futures.items():
+                try:
+                    results[language] = self._render(future.result(), title, language, formats)
+                except Exception as e:
+                    errors[language] = str(e)
+        return {"source_language": source_language, "languages": results, "errors": errors}
+    
+    async def agenerate_multilingual(
+        self,
+        title: str,
+        description: str,
+        languages: Sequence[str],
+        tone: str = "professional",
+        content_type: str = "landing_page",
+        use_cache: bool = True,
+        tier: Optional[str] = None,
+        formats: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async variant of generate_multilingual() for use inside an event loop"""
+        async with self._get_semaphore():
+            return await self._run_blocking(functools.partial(
+                self.generate_multilingual,
+                title=title,
+                description=description,
+                languages=languages,
+                tone=tone,
+                content_type=content_type,
+                use_cache=use_cache,
+                tier=tier,
+                formats=formats,
+                user_id=user_id
+            ))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return response and search cache counters"""
+        search = self.vector_store.search_cache_stats()
+        coalescing = self.coalescing.stats() if self.coalescing is not None else None
+        if self.response_cache is None:
+            return {"enabled": False, "search": search, "coalescing": coalescing}
+        return {"enabled": True, **self.response_cache.stats(), "search": search, "coalescing": coalescing}
+    
+    def routing_stats(self) -> Dict[str, Any]:
+        """Return model routing counters and estimated savings"""
+        return self.router.stats()
+    
+    def parse_stats(self) -> Dict[str, Any]:
+        """Return response parsing success rates and salvage savings"""
+        return {"salvage_enabled": self.json_salvage, **self._parse_stats.stats()}
+    
+    def list_history(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of a user's generation summaries, newest first
+        
+        Returns:
+            ``{"items": [...], "next_cursor": str or None}``; pass
+            ``next_cursor`` back to get the following page
+        
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        if self.history is None:
+            return {"items": [], "next_cursor": None}
+        return self.history.list(user_id or DEFAULT_USER, limit, cursor, content_type)
+    
+    def get_history(self, generation_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Full record of one of the user's generations, or None"""
+        if self.history is None:
+            return None
+        entry = self.history.get(generation_id)
+        if entry is None or entry.get("user_id") != (user_id or DEFAULT_USER):
+            return None
+        return entry
+    
+    def _record_generation(
+        self,
+        operation: str,
+        params: Dict[str, Any],
+        route: RoutingDecision,
+        content: Dict[str, Any],
+        started: float,
+        retrieval_ms: float,
+        user_id: Optional[str],
+        cached: bool = False,
+        coalesced: bool = False
+    ) -> None:
+        """
+        Record a finished request in the metrics and queue it for the history
+        
+        Args:
+            operation: "generate", "stream", "batch", "regenerate" or
+                "translate"
+            params: Request parameters
+            route: The request's routing decision, carrying its token usage
+            content: Generated sections
+            started: perf_counter() value when the request started
+            retrieval_ms: Time spent in vector search
+            user_id: Owner of the generation
+            cached: The content was served from the response cache
+            coalesced: The content was shared from an identical request
+                that was already in flight
+        """
+        total_ms = (time.perf_counter() - started) * 1000
+        fallback = isinstance(content, FallbackContent)
+        self.metrics.count("requests", operation=operation)
+        self.metrics.count("fallbacks", int(fallback), operation=operation)
+        self.metrics.observe_request(operation, total_ms)
+        
+        if self.history is None:
+            return
+        self.history.record({
+            "generation_id": uuid.uuid4().hex,
+            "user_id": user_id or DEFAULT_USER,
+            "created_at": utc_timestamp(time.time()),
+            "operation": operation,
+            **params,
+            "tier": route.tier,
+            "routing_reason": route.reason,
+            "model_id": route.model_id,
+            "cached": cached,
+            "coalesced": coalesced,
+            "fallback": fallback,
+            "model_calls": route.model_calls,
+            "input_tokens": route.input_tokens,
+            "output_tokens": route.output_tokens,
+            "total_ms": int(total_ms),
+            "timings": {
+                "retrieval_ms": round(retrieval_ms, 1),
+                "model_ms": round(route.model_latency_ms, 1)
+            },
+            "sections": strip_rendered(content)
+        })
+    
+    def _render(
+        self,
+        content: Dict[str, Any],
+        title: str,
         language: str,
-        content_type: str,
-        context: List[str]
-    ) -> str:
-        """Build the prompt for Claude"""
+        formats: Optional[Sequence[str]]
+    ) -> Dict[str, Any]:
+        """render_content(), timed as the render stage"""
+        with self.metrics.timer("render"):
+            return render_content(content, title, language, formats)
+    
+    def _record_usage(self, model_id: str, usage: Optional[Dict[str, Any]]) -> None:
+        """
+        Count a model call and the token usage Bedrock reported for it
+        
+        The usage is also kept for _tokens_used() on the calling thread.
+        """
+        usage = usage or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cache_read = usage.get("cache_read_input_tokens", 0)
+        cache_write = usage.get("cache_creation_input_tokens", 0)
+        self.metrics.count("model_calls", model=model_id)
+        self.metrics.count("input_tokens", input_tokens, model=model_id)
+        self.metrics.count("output_tokens", usage.get("output_tokens", 0), model=model_id)
+        self.metrics.count("cache_read_input_tokens", cache_read, model=model_id)
+        self.metrics.count("cache_write_input_tokens", cache_write, model=model_id)
+        if "output_tokens" in usage:
+            self._usage.last = (input_tokens + cache_read + cache_write, usage["output_tokens"])
+        else:
+            self._usage.last = None
+    
+    def _tokens_used(self, prompt: RenderedPrompt, response_text: str) -> Tuple[int, int]:
+        """
+        (input, output) tokens of the model call that just returned on this
+        thread: Bedrock's reported usage, or estimates when there was none
+        """
+        usage = getattr(self._usage, "last", None)
+        self._usage.last = None
+        return usage or (prompt.input_tokens, estimate_tokens(response_text))
+    
+    def _cache_lookup(
+        self,
+        params: Dict[str, Any],
+        use_cache: bool,
+        model_id: str,
+        version: str = TEMPLATE_VERSION
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look a request up in the response cache.
         
-        context_text = "\n".join([f"- {c}" for c in context]) if context else "No specific context available."
+        Content is cached per routed model, so a request routed to the fast
+        model is not answered with (or overwrite) the quality model's output.
         
-        prompt = f"""You are an expert content creator specializing in {content_type} creation.
-
-Task: Generate comprehensive, engaging content for a {content_type} about: {title}
-
-Product/Service Description:
-{description}
-
-Relevant Context from Knowledge Base:
-{context_text}
-
-Requirements:
-1. Tone: {tone}
-2. Language: {language}
-3. Content Type: {content_type}
-
-Generate the following sections in JSON format:
-
-{{
-  "hero_section": "A compelling hero message (2-3 sentences)",
-  "features": ["Feature 1", "Feature 2", "Feature 3", "Feature 4"],
-  "benefits": ["Benefit 1", "Benefit 2", "Benefit 3"],
-  "seo_meta": {{
-    "title": "SEO optimized title (60 chars max)",
-    "description": "SEO meta description (160 chars max)",
-    "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
-  }},
-  "cta": "Clear call-to-action message",
-  "faqs": [
-    {{"question": "Question 1", "answer": "Answer 1"}},
-    {{"question": "Question 2", "answer": "Answer 2"}},
-    {{"question": "Question 3", "answer": "Answer 3"}}
-  ]
-}}
-
-Ensure all content:
-- Aligns with STANDs framework (Secure, Trusted, Aligned, Neutral, Defendable, Sustainable)
-- Is engaging and conversion-focused
-- Maintains the specified tone
-- Is in {language}
-- Is original and compelling
-
-Return ONLY valid JSON, no additional text."""
+        Args:
+            version: Prompt version the content was produced with
+        
+        Returns:
+            The cache key (None when caching is disabled) and the cached
+            content, or None on a miss or bypass
+        """
+        if self.response_cache is None:
+            return None, None
+        
+        cache_key = make_cache_key(params, model_id, version)
+        if not use_cache:
+            self.response_cache.record_bypass()
+            return cache_key, None
         
-        return prompt
+        cached = self.response_cache.get(cache_key)
+        if cached is None:
+            self.metrics.count("response_cache_misses")
+            return cache_key, None
+        self.metrics.count("response_cache_hits")
+        # Hand out a copy so callers cannot mutate the cached entry; entries
+        # written before rendering moved out of the cache still carry HTML
+        return cache_key, strip_rendered(copy.deepcopy(cached))
     
-    def _call_bedrock(self, prompt: str) -> str:
-        """Call AWS Bedrock Claude model"""
-        try:
-            # Prepare the request body for Claude
-            body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
+    def _coalesce(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func() through the single-flight group, or directly when
+        coalescing is disabled
+        
+        Returns:
+            The result (a private copy when shared) and whether it was
+            shared from a call already in flight
+        """
+        if self.coalescing is None:
+            return func(), False
+        result, shared = self.coalescing.do(key, func)
+        if shared:
+            self.metrics.count("coalesced_requests")
+            result = copy.deepcopy(result)
+        return result, shared
+    
+    def _cache_store(self, cache_key: Optional[str], content: Dict[str, Any]) -> None:
+        """Store generated sections, skipping placeholder fallback content"""
+        if cache_key is None or self.response_cache is None:
+            return
+        if isinstance(content, FallbackContent):
+            return
+        self.response_cache.set(cache_key, content)
+    
+    def _prepare_batch(
+        self,
+        items: List[Dict[str, Any]]
+    ) -> Tuple[
+        Dict[int, Dict[str, Any]],
+        Dict[int, RoutingDecision],
+        Dict[int, str],
+        List[Optional[Dict[str, Any]]]
+    ]:
+        """
+        Validate batch items, route them and answer the ones already in the cache.
+        
+        Returns:
+            Request params for items that still need generating (keyed by item
+            index), their routing decisions and cache keys, and a result list
+            pre-filled with errors for invalid items and content for cache hits
+        """
+        params: Dict[int, Dict[str, Any]] = {}
+        routes: Dict[int, RoutingDecision] = {}
+        cache_keys: Dict[int, str] = {}
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = self._batch_error(index, "Item must be an object")
+                continue
+            if not item.get("title") or not item.get("description"):
+                results[index] = self._batch_error(index, "Title and description are required")
+                continue
+            try:
+                resolve_formats(item.get("formats"))
+            except ValueError as e:
+                results[index] = self._batch_error(index, str(e))
+                continue
             
-            # Invoke Bedrock
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=body,
-                contentType="application/json"
+            item_params = {
+                "title": item["title"],
+                "description": item["description"],
+                "tone": item.get("tone", "professional"),
+                "language": item.get("language", "en"),
+                "content_type": item.get("content_type", "landing_page")
+            }
+            route = self.router.route(item_params, item.get("tier"))
+            cache_key, cached = self._cache_lookup(
+                item_params, not item.get("bypass_cache", False), route.model_id
             )
+            if cached is not None:
+                self._record_generation(
+                    "batch", item_params, route, cached, time.perf_counter(), 0.0,
+                    item.get("user_id"), cached=True
+                )
+                results[index] = self._batch_success(index, cached, item)
+                continue
             
-            # Parse response
-            response_body = json.loads(response['body'].read())
-            return response_body['content'][0]['text']
-            
-        except ClientError as e:
-            raise Exception(f"Bedrock API error: {str(e)}")
+            params[index] = item_params
+            routes[index] = route
+            if cache_key is not None:
+                cache_keys[index] = cache_key
+        
+        return params, routes, cache_keys, results
     
-    def _parse_response(
+    @staticmethod
+    def _context_filters(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata filters restricting retrieval to the request's language and content type"""
+        return {"language": params["language"], "content_type": params["content_type"]}
+    
+    def _batch_parallelism(self, max_parallel: Optional[int]) -> int:
+        """Resolve the effective parallelism cap for a batch"""
+        if max_parallel is None:
+            max_parallel = int(os.getenv("BATCH_MAX_PARALLEL", "8"))
+        return max(1, min(max_parallel, self.max_concurrency))
+    
+    def _batch_success(self, index: int, content: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+        """Success result with the renderings the item asked for"""
+        content = self._render(
+            content, item["title"], item.get("language", "en"), item.get("formats")
+        )
+        return {"index": index, "status": "success", "content": content}
+    
+    @staticmethod
+    def _batch_error(index: int, error: str) -> Dict[str, Any]:
+        return {"index": index, "status": "error", "error": error}
+    
+    def _translate(
+        self,
+        source: Dict[str, Any],
+        language: str,
+        params: Dict[str, Any],
+        use_cache: bool,
+        tier: Optional[str],
+        user_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Translate generated sections into another language
+        
+        Translations are cached under the source content's digest, so a
+        regenerated source is translated again.
+        
+        Raises:
+            RuntimeError: If the model output is unusable, even after
+                escalation
+        """
+        started = time.perf_counter()
+        target = {**params, "language": language}
+        route = self.router.route_translation(tier)
+        sections = strip_rendered(source)
+        digest = hashlib.sha256(
+            json.dumps(sections, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        cache_key, cached = self._cache_lookup(
+            target, use_cache, route.model_id, f"{TEMPLATE_VERSION}:translation:{digest}"
+        )
+        if cached is not None:
+            self._record_generation("translate", target, route, cached, started, 0.0, user_id, cached=True)
+            return cached
+        
+        template = get_template(params["content_type"])
+        with self.metrics.timer("prompt"):
+            prompt = render_translation(sections, language)
+        parsed, _ = self._generate_with_model(prompt, route, route.model_id, template)
+        if not parsed.ok and route.escalation_model_id:
+            parsed, _ = self._generate_with_model(
+                prompt, route, route.escalation_model_id, template, escalated=True
+            )
+        if not parsed.ok:
+            raise RuntimeError(f"Model returned an unusable translation into {language}")
+        
+        self._cache_store(cache_key, parsed.sections)
+        self._record_generation("translate", target, route, parsed.sections, started, 0.0, user_id)
+        return parsed.sections
+    
+    def _generate_from_context(
         self,
-        response_text: str,
         title: str,
-        description: str
+        description: str,
+        tone: str,
+        language: str,
+        content_type: str,
+        context: List[str],
+        route: Optional[RoutingDecision] = None
     ) -> Dict[str, Any]:
-        """Parse Claude's response and generate HTML/Markdown"""
-        try:
-            # Extract JSON from response (handle markdown code blocks)
-            json_text = response_text.strip()
-            if "```json" in json_text:
-                json_text = json_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in json_text:
-                json_text = json_text.split("```")[1].split("```")[0].strip()
-            
-            content_data = json.loads(json_text)
-            
-            # Generate HTML and Markdown
-            html_content = self._generate_html(content_data, title)
-            markdown_content = self._generate_markdown(content_data, title)
-            
-            return {
-                **content_data,
-                "html_content": html_content,
-                "markdown_content": markdown_content
-            }
-            
-        except json.JSONDecodeError as e:
-            # Fallback if JSON parsing fails
-            return self._create_fallback_content(title, description, response_text)
-    
-    def _generate_html(self, content: Dict[str, Any], title: str) -> str:
-        """Generate HTML content"""
-        features_html = "".join([f"<li>{f}</li>" for f in content.get("features", [])])
-        benefits_html = "".join([f"<li>{b}</li>" for b in content.get("benefits", [])])
-        faqs_html = "".join([
-            f'<div class="faq"><h3>{faq["question"]}</h3><p>{faq["answer"]}</p></div>'
-            for faq in content.get("faqs", [])
-        ])
+        """
+        Build the prompt around already-retrieved context, call the routed
+        model and parse the result
         
-        return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{content.get("seo_meta", {}).get("title", title)}</title>
-    <meta name="description" content="{content.get("seo_meta", {}).get("description", "")}">
-    <meta name="keywords" content="{", ".join(content.get("seo_meta", {}).get("keywords", []))}">
-</head>
-<body>
-    <header>
-        <h1>{title}</h1>
-    </header>
-    <main>
-        <section class="hero">
-            <p>{content.get("hero_section", "")}</p>
-        </section>
-        <section class="features">
-            <h2>Features</h2>
-            <ul>{features_html}</ul>
-        </section>
-        <section class="benefits">
-            <h2>Benefits</h2>
-            <ul>{benefits_html}</ul>
-        </section>
-        <section class="cta">
-            <button>{content.get("cta", "Get Started")}</button>
-        </section>
-        <section class="faqs">
-            <h2>Frequently Asked Questions</h2>
-            {faqs_html}
-        </section>
-    </main>
-</body>
-</html>"""
-    
-    def _generate_markdown(self, content: Dict[str, Any], title: str) -> str:
-        """Generate Markdown content"""
-        features_md = "\n".join([f"- {f}" for f in content.get("features", [])])
-        benefits_md = "\n".join([f"- {b}" for b in content.get("benefits", [])])
-        faqs_md = "\n".join([
-            f"### {faq['question']}\n\n{faq['answer']}\n"
-            for faq in content.get("faqs", [])
-        ])
+        Sections missing from a partly valid response are regenerated on
+        their own (see _complete_sections). When nothing usable comes back
+        and the route has an escalation model, the same prompt is retried
+        once on that model.
+        """
+        if route is None:
+            route = RoutingDecision(self.model_id, "quality", "default")
+        if self.parallel_sections:
+            return self._generate_sections(
+                title, description, tone, language, content_type, context, route
+            )
         
-        return f"""# {title}
-
-{content.get("hero_section", "")}
-
-## Features
-
-{features_md}
-
-## Benefits
-
-{benefits_md}
-
-## Call to Action
-
-{content.get("cta", "")}
-
-## Frequently Asked Questions
-
-{faqs_md}
-"""
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": language,
+            "content_type": content_type
+        }
+        template = get_template(content_type)
+        # Build prompt
+        prompt = self._build_prompt(context=context, **params)
+        
+        parsed, response_text = self._generate_with_model(prompt, route, route.model_id, template)
+        data = self._complete_sections(parsed, template, route, context, params)
+        if data is None and route.escalation_model_id:
+            parsed, response_text = self._generate_with_model(
+                prompt, route, route.escalation_model_id, template, escalated=True
+            )
+            data = self._complete_sections(parsed, template, route, context, params)
+        
+        if data is None:
+            return self._create_fallback_content(title, description, response_text, parsed.sections)
+        return data
     
-    def _create_fallback_content(
+    def _generate_with_model(
+        self,
+        prompt: RenderedPrompt,
+        route: RoutingDecision,
+        model_id: str,
+        template: PromptTemplate,
+        escalated: bool = False
+    ) -> Tuple[ParsedSections, str]:
+        """Call one model, record the call with the router and parse the response"""
+        started = time.perf_counter()
+        response_text = self._invoke_model(prompt, model_id)
+        self.router.record(
+            route,
+            model_id,
+            (time.perf_counter() - started) * 1000,
+            *self._tokens_used(prompt, response_text),
+            escalated=escalated
+        )
+        return self._parse(response_text, template), response_text
+    
+    def _generate_sections(
         self,
         title: str,
         description: str,
-        raw_response: str
+        tone: str,
+        language: str,
+        content_type: str,
+        context: List[str],
+        route: RoutingDecision
     ) -> Dict[str, Any]:
-        """Create fallback content if JSON parsing fails"""
+        """
+        Generate each section group with its own prompt, concurrently
+        
+        All prompts share the retrieved context. Wall-clock latency is that
+        of the slowest group rather than of the whole page, at the price of
+        sending the context once per group. The merged result has the same
+        shape as single-prompt output.
+        """
+        template = get_template(content_type)
+        groups = [group for group in SECTION_GROUPS if all(name in template.sections for name in group)]
+        started = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="content-section") as pool:
+            futures = [
+                pool.submit(
+                    self._generate_section_group,
+                    template.for_sections(group),
+                    route,
+                    title=title,
+                    description=description,
+                    tone=tone,
+                    language=language,
+                    content_type=content_type,
+                    context=context
+                )
+                for group in groups
+            ]
+            parts = [future.result() for future in futures]
+        
+        # One routing record per request, so section and single-shot
+        # requests are comparable
+        self.router.record(
+            route,
+            route.model_id,
+            (time.perf_counter() - started) * 1000,
+            sum(input_tokens for _, _, input_tokens, _ in parts),
+            sum(output_tokens for _, _, _, output_tokens in parts)
+        )
+        
+        sections: Dict[str, Any] = {}
+        failed_text = None
+        for data, response_text, _, _ in parts:
+            if data is None:
+                failed_text = response_text
+            else:
+                sections.update(data)
+        
+        # Keep the template's section order regardless of completion order
+        content_data = {name: sections[name] for name in template.sections if name in sections}
+        if failed_text is not None:
+            return self._create_fallback_content(title, description, failed_text, content_data)
+        return content_data
+    
+    def _generate_section_group(
+        self,
+        template: PromptTemplate,
+        route: RoutingDecision,
+        title: str,
+        description: str,
+        tone: str,
+        language: str,
+        content_type: str,
+        context: List[str],
+        notes: Optional[str] = None,
+        salvage: bool = True
+    ) -> Tuple[Optional[Dict[str, Any]], str, int, int]:
+        """
+        Generate one group of sections
+        
+        Args:
+            notes: Extra instructions for the prompt (see PromptTemplate.render)
+            salvage: Complete a partly valid response by regenerating only
+                its missing sections
+        
+        Returns:
+            The parsed sections (None when unusable even after escalation),
+            the raw response, and the tokens used by the routed model
+        """
+        params = {
+            "title": title,
+            "description": description,
+            "tone": tone,
+            "language": language,
+            "content_type": content_type
+        }
+        with self.metrics.timer("prompt"):
+            prompt = template.render(
+                context=context,
+                input_token_budget=self.input_token_budget,
+                notes=notes,
+                **params
+            )
+        
+        response_text = self._invoke_model(prompt, route.model_id)
+        usage = self._tokens_used(prompt, response_text)
+        parsed = self._parse(response_text, template)
+        if salvage:
+            data = self._complete_sections(parsed, template, route, context, params, notes)
+        else:
+            data = parsed.sections if parsed.ok else None
+        
+        if data is None and route.escalation_model_id:
+            started = time.perf_counter()
+            response_text = self._invoke_model(prompt, route.escalation_model_id)
+            self.router.record(
+                route,
+                route.escalation_model_id,
+                (time.perf_counter() - started) * 1000,
+                *self._tokens_used(prompt, response_text),
+                escalated=True
+            )
+            parsed = self._parse(response_text, template)
+            data = parsed.sections if parsed.ok else None
+        return (data, response_text) + usage
+    
+    def _complete_sections(
+        self,
+        parsed: ParsedSections,
+        template: PromptTemplate,
+        route: RoutingDecision,
+        context: List[str],
+        params: Dict[str, Any],
+        notes: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Turn a parsed response into a full set of sections
+        
+        A valid response is returned as is. When only some sections are
+        valid (truncated output, a malformed or wrongly shaped section), the
+        missing ones are generated with a reduced prompt and merged in, which
+        costs a fraction of regenerating the whole response.
+        
+        Returns:
+            All of the template's sections in schema order, or None when the
+            response cannot be completed
+        """
+        if parsed.ok:
+            return parsed.sections
+        if not (self.json_salvage and parsed.sections):
+            return None
+        
+        started = time.perf_counter()
+        data, _, input_tokens, output_tokens = self._generate_section_group(
+            template.for_sections(tuple(parsed.missing)),
+            route,
+            context=context,
+            notes=notes,
+            salvage=False,
+            **params
+        )
+        self.router.record(
+            route,
+            route.model_id,
+            (time.perf_counter() - started) * 1000,
+            input_tokens,
+            output_tokens,
+            salvage=True
+        )
+        self._parse_stats.record_salvage(
+            data is not None,
+            len(parsed.sections),
+            estimate_tokens(json.dumps(parsed.sections, ensure_ascii=False))
+        )
+        if data is None:
+            return None
+        
+        merged = {**parsed.sections, **data}
+        return {name: merged[name] for name in template.sections}
+    
+    def _prompt_cache_min_tokens(self, model_id: Optional[str]) -> int:
+        """Shortest system prefix worth marking for caching on this model"""
+        if "haiku" in (model_id or self.model_id).lower():
+            return max(self.prompt_cache_min_tokens, 2048)
+        return self.prompt_cache_min_tokens
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limiter for agenerate(), created on first use"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for blocking I/O, created on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="content-generator"
+            )
+        return self._executor
+    
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call on the generator's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+    
+    def _invoke_model(self, prompt: RenderedPrompt, model_id: Optional[str] = None) -> str:
+        """Send the prompt to the given (default: primary) model and return its text"""
+        return self._call_bedrock(prompt, model_id)
+    
+    def _invoke_model_stream(self, prompt: RenderedPrompt, model_id: Optional[str] = None) -> Iterator[str]:
+        """Send the prompt to the given (default: primary) model and yield text as it arrives"""
+        return self._call_bedrock_stream(prompt, model_id)
+    
+    def _build_prompt(
+        self,
+        title: str,
+        description: str,
+        tone: str,
+        language: str,
+        content_type: str,
+        context: List[str]
+    ) -> RenderedPrompt:
+        """Build the prompt for Claude from the content type's template"""
+        with self.metrics.timer("prompt"):
+            return get_template(content_type).render(
+                title=title,
+                description=description,
+                tone=tone,
+                language=language,
+                content_type=content_type,
+                context=context,
+                input_token_budget=self.input_token_budget
+            )
+    
+    def _call_bedrock(self, prompt: RenderedPrompt, model_id: Optional[str] = None) -> str:
+        """Call AWS Bedrock Claude model"""
+        with self.metrics.timer("model"):
+            response_body = self.bedrock.invoke(
+                self._build_request_body(prompt, model_id),
+                estimated_tokens=prompt.input_tokens + prompt.max_tokens,
+                model_id=model_id
+            )
+        self._record_usage(response_body.get("model_id") or model_id or self.model_id, response_body.get("usage"))
+        return response_body['content'][0]['text']
+    
+    def _call_bedrock_stream(self, prompt: RenderedPrompt, model_id: Optional[str] = None) -> Iterator[str]:
+        """Call AWS Bedrock Claude model with a streamed response"""
+        events = self.bedrock.invoke_stream(
+            self._build_request_body(prompt, model_id),
+            estimated_tokens=prompt.input_tokens + prompt.max_tokens,
+            model_id=model_id
+        )
+        # Each event is one Anthropic Messages streaming event; the text
+        # deltas carry content, message_start and message_delta the usage
+        usage: Dict[str, int] = {}
+        for payload in events:
+            if payload.get('type') == 'content_block_delta':
+                text = payload.get('delta', {}).get('text')
+                if text:
+                    yield text
+            elif payload.get('type') == 'message_start':
+                usage.update(payload.get('message', {}).get('usage', {}))
+            elif payload.get('type') == 'message_delta':
+                usage.update(payload.get('usage', {}))
+        self._record_usage(model_id or self.model_id, usage)
+    
+    def _build_request_body(self, prompt: RenderedPrompt, model_id: Optional[str] = None) -> Dict[str, Any]:
+        """Build the Bedrock request body for Claude"""
+        # The static template prefix goes in the system block so Bedrock can
+        # reuse its cached prefix; only the user message changes per request
+        system_block = {"type": "text", "text": prompt.system}
+        if self.prompt_caching and estimate_tokens(prompt.system) >= self._prompt_cache_min_tokens(model_id):
+            system_block["cache_control"] = {"type": "ephemeral"}
+        
         return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": prompt.max_tokens,
+            "system": [system_block],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt.user
+                }
+            ]
+        }
+    
+    def _parse(self, response_text: str, template: PromptTemplate) -> ParsedSections:
+        """Tolerantly parse a model response against a template's sections"""
+        with self.metrics.timer("parse"):
+            parsed = parse_sections(response_text, template.sections)
+        self._parse_stats.record(parsed)
+        if not parsed.ok:
+            print(f"Warning: model response failed validation: {'; '.join(parsed.errors)}")
+        return parsed
+    
+    def _create_fallback_content(
+        self,
+        title: str,
+        description: str,
+        raw_response: str,
+        sections: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create fallback content if the model response is unusable
+        
+        Args:
+            sections: Valid sections recovered from the response; they
+                replace the matching placeholders
+        """
+        placeholders = {
             "hero_section": f"Welcome to {title}. {description}",
             "features": ["Feature 1", "Feature 2", "Feature 3"],
             "benefits": ["Benefit 1", "Benefit 2", "Benefit 3"],
@@ -286,8 +1442,6 @@ Return ONLY valid JSON, no additional text."""
             "cta": "Get Started Today",
             "faqs": [
                 {"question": "What is this?", "answer": description}
-            ],
-            "html_content": f"<html><body><h1>{title}</h1><p>{description}</p></body></html>",
-            "markdown_content": f"# {title}\n\n{description}"
+            ]
         }
-
+        return FallbackContent({**placeholders, **(sections or {})})
@@ -13,7 +13,21 @@ mkdir -p deploy
 cp lambda_function.py deploy/
 cp content_generator.py deploy/
 cp vector_store.py deploy/
+cp embeddings.py deploy/
+cp numpy_index.py deploy/
+cp opensearch_client.py deploy/
+cp lexical_index.py deploy/
+cp ingestion.py deploy/
 cp bedrock_mock.py deploy/
+cp json_stream.py deploy/
+cp response_cache.py deploy/
+cp prompt_templates.py deploy/
+cp bedrock_client.py deploy/
+cp model_router.py deploy/
+cp renderer.py deploy/
+cp jobs.py deploy/
+cp history.py deploy/
+cp metrics.py deploy/
 
 # Install dependencies
 pip install -r requirements.txt -t deploy/
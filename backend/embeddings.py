@@ -0,0 +1,193 @@
+"""
+Text embedding for the vector store.
+Supports Amazon Titan embeddings (AWS) and a deterministic hashing embedder (local dev).
+"""
+import os
+import re
+import json
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class Embedder:
+    """
+    Base class for embedders.
+    
+    Subclasses implement _embed_batch(). embed() splits the input into
+    batches, skips texts it has already embedded (keyed by content hash) and
+    keeps the results in a bounded LRU cache.
+    """
+    
+    name = "base"
+    
+    def __init__(self, dimension: int, batch_size: int = 32, cache_size: int = 10000):
+        self.dimension = dimension
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, reusing cached vectors for texts seen before
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            One normalized vector per text, in input order
+        """
+        keys = [self.content_hash(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[key] = self._cache[key]
+        
+        # Embed each distinct uncached text once
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in pending:
+                pending[key] = text
+        
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), self.batch_size):
+            batch = pending_items[start:start + self.batch_size]
+            embedded = self._embed_batch([text for _, text in batch])
+            with self._lock:
+                for (key, _), vector in zip(batch, embedded):
+                    vectors[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        return [vectors[key] for key in keys]
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a single search query"""
+        return self.embed([query])[0]
+    
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Stable identifier for a piece of text"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic offline embedder.
+    
+    Unigrams and bigrams are hashed into a fixed number of signed buckets
+    and the result is L2-normalized, so texts sharing vocabulary land close
+    together without any model or network access.
+    """
+    
+    name = "hashing"
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+    
+    def _embed_one(self, text: str) -> List[float]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        
+        vector = [0.0] * self.dimension
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+
+class TitanEmbedder(Embedder):
+    """Amazon Titan text embeddings through Bedrock"""
+    
+    name = "titan"
+    
+    def __init__(
+        self,
+        region: str,
+        model_id: str = "amazon.titan-embed-text-v2:0",
+        dimension: int = 1024,
+        batch_size: int = 16,
+        cache_size: int = 10000
+    ):
+        super().__init__(dimension=dimension, batch_size=batch_size, cache_size=cache_size)
+        import boto3
+        from botocore.config import Config
+        self.model_id = model_id
+        self.bedrock_runtime = boto3.client(
+            "bedrock-runtime",
+            region_name=region,
+            config=Config(max_pool_connections=batch_size)
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # InvokeModel takes one text per call, so a batch is sent concurrently
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.batch_size,
+                thread_name_prefix="titan-embed"
+            )
+        return list(self._executor.map(self._embed_one, texts))
+    
+    def _embed_one(self, text: str) -> List[float]:
+        response = self.bedrock_runtime.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({
+                "inputText": text,
+                "dimensions": self.dimension,
+                "normalize": True
+            }),
+            contentType="application/json"
+        )
+        return json.loads(response["body"].read())["embedding"]
+
+
+def create_embedder(use_local: bool, region: str) -> Embedder:
+    """
+    Build the embedder selected by EMBEDDING_PROVIDER
+    
+    Args:
+        use_local: Whether local mocks are enabled (defaults to hashing)
+        region: AWS region for Titan
+    
+    Returns:
+        The configured embedder
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "hashing" if use_local else "titan").lower()
+    batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+    cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    
+    if provider == "titan":
+        return TitanEmbedder(
+            region=region,
+            model_id=os.getenv("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0"),
+            dimension=int(os.getenv("EMBEDDING_DIMENSION", "1024")),
+            batch_size=batch_size,
+            cache_size=cache_size
+        )
+    if provider == "hashing":
+        return HashingEmbedder(
+            dimension=int(os.getenv("EMBEDDING_DIMENSION", "384")),
+            batch_size=batch_size,
+            cache_size=cache_size
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
@@ -0,0 +1,352 @@
+"""
+Persisted generation history.
+Every generation is queued to a background writer, so persisting it stays
+off the response path, and stored with its request parameters, sections,
+model, token usage and timings. Listing is per user, newest first, with
+opaque cursors, and returns summary fields only (DynamoDB metadata table
+with a per-user GSI in AWS, SQLite for local development).
+"""
+import os
+import json
+import time
+import queue
+import base64
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Fields returned when listing history; full records (request, sections)
+# are only loaded by id. The DynamoDB GSI projects exactly these.
+SUMMARY_FIELDS = (
+    "generation_id",
+    "user_id",
+    "created_at",
+    "operation",
+    "title",
+    "content_type",
+    "language",
+    "tone",
+    "model_id",
+    "cached",
+    "fallback",
+    "input_tokens",
+    "output_tokens",
+    "total_ms"
+)
+
+DEFAULT_USER = "anonymous"
+MAX_PAGE_SIZE = 100
+
+
+def utc_timestamp(epoch_seconds: float) -> str:
+    """ISO-8601 UTC timestamp with milliseconds; sorts lexicographically"""
+    moment = datetime.fromtimestamp(epoch_seconds, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def _sort_key(entry: Dict[str, Any]) -> str:
+    # The id breaks ties between generations in the same millisecond
+    return f"{entry['created_at']}#{entry['generation_id']}"
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Raises ValueError for a cursor that was not produced by encode_cursor()"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+class SQLiteHistoryStore:
+    """History in a local SQLite file, indexed by (user_id, sort_key)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "generation_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, sort_key TEXT NOT NULL, "
+            "content_type TEXT NOT NULL, summary TEXT NOT NULL, record TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS generations_by_user ON generations (user_id, sort_key)"
+        )
+        self._conn.commit()
+    
+    def put_many(self, entries: List[Dict[str, Any]]) -> None:
+        rows = [
+            (
+                entry["generation_id"],
+                entry["user_id"],
+                _sort_key(entry),
+                entry["content_type"],
+                json.dumps({field: entry.get(field) for field in SUMMARY_FIELDS}),
+                json.dumps(entry)
+            )
+            for entry in entries
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+    
+    def list(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        query = "SELECT sort_key, summary FROM generations WHERE user_id = ?"
+        args: List[Any] = [user_id]
+        if cursor:
+            query += " AND sort_key < ?"
+            args.append(str(decode_cursor(cursor).get("sort_key", "")))
+        if content_type:
+            query += " AND content_type = ?"
+            args.append(content_type)
+        query += " ORDER BY sort_key DESC LIMIT ?"
+        # One extra row tells whether there is a next page
+        args.append(limit + 1)
+        
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        next_cursor = encode_cursor({"sort_key": rows[limit - 1][0]}) if len(rows) > limit else None
+        return [json.loads(summary) for _, summary in rows[:limit]], next_cursor
+    
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM generations WHERE generation_id = ?", (generation_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class DynamoDBHistoryStore:
+    """
+    History in the content-creator-metadata table.
+    
+    Items are keyed ``generation#<id>``. The ``history_pk`` (``user#<id>``)
+    and ``history_sk`` (timestamp#id) attributes feed a GSI that serves
+    newest-first listing per user and projects only SUMMARY_FIELDS, so
+    listing never reads the full ``record`` attribute.
+    """
+    
+    KEY_PREFIX = "generation#"
+    
+    def __init__(self, table_name: str, region: str, index_name: str):
+        import boto3
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+        self.index_name = index_name
+    
+    def put_many(self, entries: List[Dict[str, Any]]) -> None:
+        with self.table.batch_writer() as batch:
+            for entry in entries:
+                batch.put_item(Item={
+                    # Summary values are strings, ints and bools, which
+                    # DynamoDB stores without Decimal conversion
+                    **{field: entry.get(field) for field in SUMMARY_FIELDS},
+                    "id": self.KEY_PREFIX + entry["generation_id"],
+                    "history_pk": f"user#{entry['user_id']}",
+                    "history_sk": _sort_key(entry),
+                    "record": json.dumps(entry)
+                })
+    
+    def list(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        from boto3.dynamodb.conditions import Attr, Key
+        query: Dict[str, Any] = {
+            "IndexName": self.index_name,
+            "KeyConditionExpression": Key("history_pk").eq(f"user#{user_id}"),
+            "ScanIndexForward": False,
+            "Limit": limit
+        }
+        if cursor:
+            start_key = decode_cursor(cursor)
+            if start_key.get("history_pk") != f"user#{user_id}":
+                raise ValueError("Invalid cursor")
+            query["ExclusiveStartKey"] = start_key
+        if content_type:
+            # Applied after Limit, so filtered pages can be short; the cursor
+            # still continues where the page stopped
+            query["FilterExpression"] = Attr("content_type").eq(content_type)
+        
+        response = self.table.query(**query)
+        items = [
+            {field: _from_dynamodb(item.get(field)) for field in SUMMARY_FIELDS}
+            for item in response.get("Items", [])
+        ]
+        last_key = response.get("LastEvaluatedKey")
+        return items, encode_cursor(last_key) if last_key else None
+    
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"id": self.KEY_PREFIX + generation_id}).get("Item")
+        return json.loads(item["record"]) if item else None
+
+
+def _from_dynamodb(value: Any) -> Any:
+    """Turn DynamoDB Decimals back into ints"""
+    if value is not None and value.__class__.__name__ == "Decimal":
+        return int(value)
+    return value
+
+
+class GenerationHistory:
+    """
+    Records generations through a background writer and serves history.
+    
+    record() only enqueues; a daemon thread writes queued entries in
+    batches. When the queue is full, entries are dropped and counted
+    rather than slowing requests down. Store errors are logged and never
+    reach the request.
+    """
+    
+    def __init__(self, store: Any, queue_size: int = 1000, batch_size: int = 25):
+        self.store = store
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+    
+    @classmethod
+    def from_env(cls, use_local_mocks: bool, region: str) -> Optional["GenerationHistory"]:
+        """
+        Build the history described by the HISTORY_* environment variables
+        
+        Returns:
+            A GenerationHistory, or None when history is disabled or its
+            store cannot be initialized
+        """
+        if os.getenv("HISTORY_ENABLED", "true").lower() != "true":
+            return None
+        
+        default_backend = "sqlite" if use_local_mocks or not os.getenv("METADATA_TABLE") else "dynamodb"
+        backend = os.getenv("HISTORY_BACKEND", default_backend).lower()
+        try:
+            if backend == "dynamodb":
+                store = DynamoDBHistoryStore(
+                    os.environ["METADATA_TABLE"],
+                    region,
+                    os.getenv("HISTORY_INDEX", "history-by-user")
+                )
+            else:
+                store = SQLiteHistoryStore(os.getenv(
+                    "HISTORY_PATH",
+                    os.path.join(os.path.dirname(__file__), "history.db")
+                ))
+        except Exception as e:
+            print(f"Warning: history store initialization failed: {e}")
+            return None
+        
+        return cls(store, queue_size=int(os.getenv("HISTORY_QUEUE_SIZE", "1000")))
+    
+    def record(self, entry: Dict[str, Any]) -> None:
+        """
+        Queue a generation for persistence
+        
+        Args:
+            entry: Full history entry (see ContentGenerator._record_history)
+        """
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count("dropped")
+            return
+        self._count("queued")
+    
+    def list(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of a user's history, newest first
+        
+        Args:
+            user_id: Whose history to list
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            cursor: ``next_cursor`` of the previous page
+            content_type: Only list this content type
+        
+        Returns:
+            ``{"items": [summary, ...], "next_cursor": str or None}``
+        
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        items, next_cursor = self.store.list(user_id, limit, cursor, content_type)
+        return {"items": items, "next_cursor": next_cursor}
+    
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """Full record of one generation, or None"""
+        return self.store.get(generation_id)
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every queued entry has been written
+        
+        Lambda freezes the container as soon as the handler returns, so
+        the handler flushes before returning.
+        
+        Returns:
+            False if entries were still pending after `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout
+        # task_done() notifies all_tasks_done when the last entry is written
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return writer counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.unfinished_tasks
+        return stats
+    
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.store.put_many(batch)
+                self._count("written", len(batch))
+            except Exception as e:
+                print(f"History write error: {e}")
+                self._count("errors", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
@@ -0,0 +1,212 @@
+"""
+Streaming bulk ingestion into the vector store.
+Reads text/Markdown files or JSONL of any size, chunks long texts with
+overlap and upserts fixed-size batches under content-hash ids.
+
+Usage:
+    python ingestion.py docs/ knowledge.jsonl --chunk-size 1000 --overlap 200
+"""
+import os
+import json
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from vector_store import VectorStore, document_id
+
+
+TEXT_EXTENSIONS = (".txt", ".md")
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def chunk_text_stream(
+    pieces: Iterable[str],
+    chunk_size: int = 1000,
+    overlap: int = 200
+) -> Iterator[str]:
+    """
+    Split a stream of text into overlapping chunks
+    
+    Only about one chunk of text is held in memory at a time, so the
+    input can be arbitrarily large. Chunks end on whitespace where
+    possible.
+    
+    Args:
+        pieces: Successive pieces of one text
+        chunk_size: Maximum chunk length in characters
+        overlap: Characters repeated at the start of the next chunk
+    
+    Yields:
+        Chunk texts
+    
+    Raises:
+        ValueError: If chunk_size is not positive or overlap is out of range
+    """
+    error = chunking_error(chunk_size, overlap)
+    if error:
+        raise ValueError(error)
+    
+    buffer = ""
+    fresh = 0  # characters in the buffer not yet emitted in any chunk
+    for piece in pieces:
+        buffer += piece
+        fresh += len(piece)
+        while len(buffer) >= chunk_size:
+            cut = _last_whitespace(buffer, chunk_size)
+            if cut <= chunk_size // 2:
+                cut = chunk_size
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            
+            start = cut - overlap
+            boundary = _last_whitespace(buffer, start)
+            if overlap and boundary > max(cut - 2 * overlap, 0):
+                start = boundary
+            buffer = buffer[start:]
+            fresh = len(buffer) - (cut - start)
+    
+    if fresh > 0 and buffer.strip():
+        yield buffer.strip()
+
+
+def chunking_error(chunk_size: int, overlap: int) -> Optional[str]:
+    """Why a chunk size/overlap pair is invalid, or None when it is valid"""
+    if chunk_size <= 0:
+        return "chunk_size must be positive"
+    if overlap < 0 or overlap * 2 > chunk_size:
+        return "overlap must be between 0 and half of chunk_size"
+    return None
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a file or a directory tree
+    
+    ``.jsonl`` lines are objects with a ``text`` field and optional
+    ``metadata``; ``.txt``/``.md`` files become one record each whose text
+    is read lazily in blocks.
+    
+    Yields:
+        Dicts with ``pieces`` (iterable of text) and ``metadata``
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                yield from iter_records(os.path.join(root, name))
+        return
+    
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not record.get("text"):
+                    print(f"Skipping {path}:{line_number}: no text")
+                    continue
+                yield {
+                    "pieces": [record["text"]],
+                    "metadata": {**record.get("metadata", {}), "source": f"{path}:{line_number}"}
+                }
+    elif path.endswith(TEXT_EXTENSIONS):
+        yield {"pieces": _read_blocks(path), "metadata": {"source": path}}
+
+
+def iter_chunks(
+    records: Iterable[Dict[str, Any]],
+    chunk_size: int = 1000,
+    overlap: int = 200
+) -> Iterator[Dict[str, Any]]:
+    """Chunk every record, attaching the chunk's position to its metadata"""
+    for record in records:
+        for position, text in enumerate(chunk_text_stream(record["pieces"], chunk_size, overlap)):
+            yield {"text": text, "metadata": {**record["metadata"], "chunk": position}}
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most `size` items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(
+    vector_store: VectorStore,
+    paths: Iterable[str],
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    batch_size: int = 64
+) -> Dict[str, int]:
+    """
+    Ingest files into the vector store in bounded-memory batches
+    
+    Each chunk's id is a hash of its text, so re-running ingestion over the
+    same content inserts nothing.
+    
+    Args:
+        vector_store: Store to write to
+        paths: Files or directories to ingest
+        chunk_size: Maximum chunk length in characters
+        overlap: Characters shared between consecutive chunks
+        batch_size: Chunks embedded and upserted per batch
+    
+    Returns:
+        Counts of chunks seen and inserted, and batches written
+    """
+    stats = {"chunks": 0, "inserted": 0, "batches": 0}
+    records = (record for path in paths for record in iter_records(path))
+    
+    for batch in batched(iter_chunks(records, chunk_size, overlap), batch_size):
+        stats["inserted"] += vector_store.upsert_documents(
+            [document_id(chunk["text"]) for chunk in batch],
+            [chunk["text"] for chunk in batch],
+            metadatas=[chunk["metadata"] for chunk in batch],
+            persist=False
+        )
+        stats["chunks"] += len(batch)
+        stats["batches"] += 1
+    
+    vector_store.flush()
+    return stats
+
+
+def _read_blocks(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def _last_whitespace(text: str, end: int) -> int:
+    """Index of the last whitespace character before `end`, or -1"""
+    return max(text.rfind(" ", 0, end), text.rfind("\n", 0, end), text.rfind("\t", 0, end))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector store")
+    parser.add_argument("paths", nargs="+", help="Files or directories (.txt, .md, .jsonl)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    error = chunking_error(args.chunk_size, args.overlap)
+    if error:
+        parser.error(error)
+    if args.batch_size <= 0:
+        parser.error("--batch-size must be positive")
+    
+    result = ingest(
+        VectorStore(),
+        args.paths,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        batch_size=args.batch_size
+    )
+    print(json.dumps(result))
@@ -0,0 +1,358 @@
+"""
+Asynchronous generation jobs.
+A submitted job is stored as queued and handed to a worker; clients poll
+for its status and result by id, so long generations are not cut off by
+API Gateway's 29-second integration timeout. In AWS jobs live in the
+metadata table (large results in S3) and run in an asynchronous
+invocation of the same Lambda; locally they live in SQLite and run on an
+in-process worker pool.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def job_kind(body: Dict[str, Any]) -> str:
+    """Job kind for a request body, using the same shapes as the sync API"""
+    if "items" in body:
+        return "batch"
+    if "sections" in body:
+        return "regenerate"
+    return "generate"
+
+
+class SQLiteJobStore:
+    """Job records in a local SQLite file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, record TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def create(self, record: Dict[str, Any], ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, record, expires_at) VALUES (?, ?, ?, ?)",
+                (record["id"], record["status"], json.dumps(record), time.time() + ttl_seconds)
+            )
+            self._conn.commit()
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, expires_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+    
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically move a queued job to running; None if it is not queued"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ? WHERE id = ? AND status = ?",
+                (RUNNING, job_id, QUEUED)
+            )
+            self._conn.commit()
+            if cursor.rowcount != 1:
+                return None
+            row = self._conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0])
+    
+    def save(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, record = ? WHERE id = ?",
+                (record["status"], json.dumps(record), record["id"])
+            )
+            self._conn.commit()
+
+
+class DynamoDBJobStore:
+    """
+    Job records in the content-creator-metadata table.
+    
+    When the whole record (request plus result) would not fit in a DynamoDB
+    item, the result is written to S3 and the record keeps only its key.
+    """
+    
+    KEY_PREFIX = "job#"
+    # DynamoDB items are limited to 400 KB; leave room for the key and the
+    # other attributes
+    MAX_RECORD_BYTES = 350_000
+    
+    def __init__(self, table_name: str, region: str, bucket: Optional[str] = None):
+        import boto3
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+        self.bucket = bucket
+        self.s3 = boto3.client("s3", region_name=region) if bucket else None
+    
+    def create(self, record: Dict[str, Any], ttl_seconds: float) -> None:
+        self.table.put_item(Item={
+            "id": self.KEY_PREFIX + record["id"],
+            "status": record["status"],
+            "record": json.dumps(record),
+            "expires_at": int(time.time() + ttl_seconds)
+        })
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"id": self.KEY_PREFIX + job_id}).get("Item")
+        # DynamoDB TTL deletes lazily, so expiry is checked here as well
+        if not item or int(item.get("expires_at", 0)) < time.time():
+            return None
+        record = json.loads(item["record"])
+        if record.get("result_key"):
+            body = self.s3.get_object(Bucket=self.bucket, Key=record["result_key"])["Body"]
+            record["result"] = json.loads(body.read())
+        return record
+    
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically move a queued job to running; None if it is not queued"""
+        from botocore.exceptions import ClientError
+        try:
+            item = self.table.update_item(
+                Key={"id": self.KEY_PREFIX + job_id},
+                UpdateExpression="SET #status = :running",
+                ConditionExpression="#status = :queued",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":running": RUNNING, ":queued": QUEUED},
+                ReturnValues="ALL_NEW"
+            )["Attributes"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        return json.loads(item["record"])
+    
+    def save(self, record: Dict[str, Any]) -> None:
+        # json.dumps escapes non-ASCII, so its length is the size in bytes
+        serialized = json.dumps(record)
+        if len(serialized) > self.MAX_RECORD_BYTES and record.get("result") is not None:
+            if self.bucket:
+                key = f"jobs/{record['id']}.json"
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(record["result"]).encode("utf-8"))
+                record = {**record, "result": None, "result_key": key}
+            else:
+                # Failing the job beats a write DynamoDB rejects, which would
+                # leave it running forever
+                record = {
+                    **record,
+                    "status": FAILED,
+                    "result": None,
+                    "error": "Job result is too large to store without DOCUMENTS_BUCKET"
+                }
+            serialized = json.dumps(record)
+        self.table.update_item(
+            Key={"id": self.KEY_PREFIX + record["id"]},
+            UpdateExpression="SET #status = :status, #record = :record",
+            ExpressionAttributeNames={"#status": "status", "#record": "record"},
+            ExpressionAttributeValues={":status": record["status"], ":record": serialized}
+        )
+
+
+class InProcessDispatcher:
+    """Runs jobs on a local thread pool (local development)"""
+    
+    def __init__(self, workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="content-job")
+    
+    def dispatch(self, job_id: str, run: Callable[[str], None]) -> None:
+        self._executor.submit(run, job_id)
+
+
+class LambdaDispatcher:
+    """Runs jobs in an asynchronous invocation of a Lambda function"""
+    
+    def __init__(self, function_name: str, region: str):
+        import boto3
+        self.function_name = function_name
+        self.client = boto3.client("lambda", region_name=region)
+    
+    def dispatch(self, job_id: str, run: Callable[[str], None]) -> None:
+        # The invoked handler recognizes the bare {"job_id": ...} event
+        self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"job_id": job_id}).encode("utf-8")
+        )
+
+
+class JobManager:
+    """
+    Submits, runs and reports generation jobs.
+    
+    Jobs are claimed with a conditional queued -> running update, so a
+    redelivered invocation cannot run a job twice. A job still running
+    after ``timeout_seconds`` (its worker died) is reported as failed.
+    """
+    
+    def __init__(
+        self,
+        store: Any,
+        dispatcher: Any,
+        runner: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+        ttl_seconds: float = 7 * 86400,
+        timeout_seconds: float = 900
+    ):
+        """
+        Args:
+            store: Job store (SQLiteJobStore or DynamoDBJobStore)
+            dispatcher: Starts a worker for a job id
+            runner: Executes a job's request and returns its result
+            ttl_seconds: How long job records are kept
+            timeout_seconds: Time queued (since creation) or running after
+                which a job counts as lost
+        """
+        self.store = store
+        self.dispatcher = dispatcher
+        self.runner = runner
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+    
+    @classmethod
+    def from_env(
+        cls,
+        use_local_mocks: bool,
+        region: str,
+        runner: Callable[[str, Dict[str, Any]], Dict[str, Any]]
+    ) -> "JobManager":
+        """
+        Build a job manager from the JOB_* environment variables
+        
+        JOB_TIMEOUT should be a little longer than the worker's own limit
+        (the deployed stack sets it from the Lambda timeout), so a killed
+        worker's job is reported as failed soon after.
+        """
+        in_lambda = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+        default_backend = "sqlite" if use_local_mocks or not os.getenv("METADATA_TABLE") else "dynamodb"
+        backend = os.getenv("JOB_STORE_BACKEND", default_backend).lower()
+        if backend == "dynamodb":
+            store = DynamoDBJobStore(
+                os.environ["METADATA_TABLE"], region, os.getenv("DOCUMENTS_BUCKET")
+            )
+        else:
+            store = SQLiteJobStore(os.getenv(
+                "JOB_STORE_PATH",
+                os.path.join(os.path.dirname(__file__), "jobs.db")
+            ))
+        
+        default_dispatch = "lambda" if in_lambda and not use_local_mocks else "local"
+        if os.getenv("JOB_DISPATCH", default_dispatch).lower() == "lambda":
+            dispatcher = LambdaDispatcher(os.environ["AWS_LAMBDA_FUNCTION_NAME"], region)
+        else:
+            dispatcher = InProcessDispatcher(int(os.getenv("JOB_WORKERS", "4")))
+        
+        return cls(
+            store,
+            dispatcher,
+            runner,
+            ttl_seconds=float(os.getenv("JOB_TTL", str(7 * 86400))),
+            timeout_seconds=float(os.getenv("JOB_TIMEOUT", "900"))
+        )
+    
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a job and start a worker for it
+        
+        Args:
+            request: Request body, in the shape of the matching sync endpoint
+        
+        Returns:
+            The job's public status
+        """
+        record = {
+            "id": uuid.uuid4().hex,
+            "kind": job_kind(request),
+            "status": QUEUED,
+            "request": request,
+            "created_at": time.time()
+        }
+        self.store.create(record, self.ttl_seconds)
+        try:
+            self.dispatcher.dispatch(record["id"], self.run)
+        except Exception as e:
+            self._finish(record, error=f"Could not start job: {e}")
+        return self._public(record)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status (and result or error once finished), or None"""
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        started = record.get("started_at")
+        if record["status"] == RUNNING and started and time.time() - started > self.timeout_seconds:
+            record = {**record, "status": FAILED, "error": "Job timed out"}
+        elif record["status"] == QUEUED and time.time() - record["created_at"] > self.timeout_seconds:
+            # The worker never picked it up (e.g. a lost async invocation).
+            # Claiming it first means a late worker will skip it, so the
+            # job cannot go from failed back to running.
+            claimed = self.store.claim(job_id)
+            if claimed is not None:
+                self._finish(claimed, error="Job was never started")
+                record = claimed
+            else:
+                record = self.store.get(job_id) or record
+        return self._public(record)
+    
+    def run(self, job_id: str) -> None:
+        """Execute a queued job and store its outcome (called by the worker)"""
+        record = self.store.claim(job_id)
+        if record is None:
+            print(f"Job {job_id} is not queued; skipping")
+            return
+        record["status"] = RUNNING
+        record["started_at"] = time.time()
+        self.store.save(record)
+        try:
+            result = self.runner(record["kind"], record["request"])
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self._finish(record, error=str(e))
+            return
+        self._finish(record, result=result)
+    
+    def _finish(
+        self,
+        record: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        record["status"] = FAILED if error is not None else SUCCEEDED
+        record["finished_at"] = time.time()
+        if error is not None:
+            record["error"] = error
+        else:
+            record["result"] = result
+        self.store.save(record)
+    
+    @staticmethod
+    def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields of a job record returned to clients"""
+        job = {
+            "job_id": record["id"],
+            "kind": record["kind"],
+            "status": record["status"],
+            "created_at": record["created_at"]
+        }
+        for field in ("started_at", "finished_at", "error", "result"):
+            if record.get(field) is not None:
+                job[field] = record[field]
+        if record.get("started_at") and record.get("finished_at"):
+            job["duration_ms"] = round((record["finished_at"] - record["started_at"]) * 1000, 1)
+        return job
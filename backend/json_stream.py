@@ -0,0 +1,269 @@
+"""
+Incremental JSON parsing for streamed model output.
+Emits each top-level section of the response object as soon as it is complete,
+and tolerates the usual model mistakes (surrounding prose, markdown fences,
+trailing commas, raw newlines in strings, output cut off at max_tokens).
+"""
+import json
+import threading
+from typing import Any, Dict, List, Tuple
+
+from prompt_templates import schema_errors
+
+
+class ParsedSections:
+    """Outcome of parsing one model response against an output schema"""
+    
+    def __init__(
+        self,
+        sections: Dict[str, Any],
+        missing: List[str],
+        errors: List[str],
+        repaired: bool,
+        truncated: bool
+    ):
+        # Valid sections, in schema order
+        self.sections = sections
+        # Schema sections that are absent or invalid, in schema order
+        self.missing = missing
+        self.errors = errors
+        # The response was not clean JSON but could be (partly) recovered
+        self.repaired = repaired
+        # The response object was never closed (e.g. max_tokens was hit)
+        self.truncated = truncated
+    
+    @property
+    def ok(self) -> bool:
+        return not self.missing
+
+
+class SectionStreamParser:
+    """
+    Incremental parser for a single top-level JSON object.
+    
+    Text is fed in arbitrary chunks. Each top-level member ("hero_section",
+    "features", ...) is returned from feed() as soon as the scanner sees the
+    comma or closing brace that ends it. Anything before the opening brace
+    (prose, markdown fences) is ignored.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+        self._members: Dict[str, Any] = {}
+        self._object_start = -1
+        self._fixed_members = False
+        self.done = False
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next chunk of text.
+        
+        Args:
+            text: Next piece of the model output
+        
+        Returns:
+            List of (section name, parsed value) pairs completed by this chunk
+        """
+        if self.done:
+            return []
+        
+        self._buffer += text
+        sections: List[Tuple[str, Any]] = []
+        
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._object_start = self._pos
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    sections.extend(self._close_member())
+                    self.done = True
+                    self._pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                sections.extend(self._close_member())
+                self._member_start = self._pos + 1
+            
+            self._pos += 1
+        
+        self._members.update(sections)
+        return sections
+    
+    def result(self, schema: Dict[str, Any]) -> ParsedSections:
+        """
+        Validate everything fed so far against an output schema
+        
+        Members that were never closed (truncated output) or could not be
+        parsed are reported as missing, so only they need regenerating.
+        
+        Args:
+            schema: Section names mapped to example values
+        """
+        sections: Dict[str, Any] = {}
+        missing: List[str] = []
+        errors: List[str] = []
+        for name, example in schema.items():
+            problems = schema_errors(self._members, {name: example})
+            if problems:
+                missing.append(name)
+                errors.extend(problems)
+            else:
+                sections[name] = self._members[name]
+        
+        # Anything but whitespace and markdown fences around the object
+        # counts as prose the model should not have written
+        before = self._buffer[:max(self._object_start, 0)].replace("```json", "")
+        after = self._buffer[self._pos:] if self.done else ""
+        prose = bool(before.strip(" \n`") or after.strip(" \n`"))
+        return ParsedSections(
+            sections,
+            missing,
+            errors,
+            repaired=prose or self._fixed_members or not self.done,
+            truncated=not self.done
+        )
+    
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        """Parse the member that ends at the current position"""
+        member = self._buffer[self._member_start:self._pos].strip()
+        if not member:
+            return []
+        try:
+            # strict=False accepts raw newlines/tabs inside strings
+            return list(json.loads("{" + member + "}", strict=False).items())
+        except json.JSONDecodeError:
+            pass
+        try:
+            items = list(json.loads("{" + _strip_trailing_commas(member) + "}", strict=False).items())
+        except json.JSONDecodeError:
+            # Unrecoverable; the section is reported missing by result()
+            self._fixed_members = True
+            return []
+        self._fixed_members = True
+        return items
+
+
+def parse_sections(text: str, schema: Dict[str, Any]) -> ParsedSections:
+    """
+    Parse a complete model response in a single pass
+    
+    The first JSON object in the text is used; when the text contains a
+    ```json fence, scanning starts inside it so braces in any preceding
+    prose are ignored.
+    
+    Args:
+        text: Raw model output
+        schema: Section names mapped to example values
+    
+    Returns:
+        The valid sections and the ones that still need generating
+    """
+    fence = text.find("```json")
+    parser = SectionStreamParser()
+    parser.feed(text[fence + len("```json"):] if fence != -1 else text)
+    return parser.result(schema)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, outside strings"""
+    out: List[str] = []
+    pending_comma = -1
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            pending_comma = len(out)
+        elif char in "}]" and pending_comma != -1:
+            del out[pending_comma]
+        
+        if not char.isspace() and char != ",":
+            pending_comma = -1
+        out.append(char)
+    return "".join(out)
+
+
+class ParseStats:
+    """Thread-safe counters for response parsing and section salvage"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {
+            "responses": 0,
+            "valid": 0,
+            "repaired": 0,
+            "partial": 0,
+            "failed": 0,
+            "salvage_attempts": 0,
+            "retries_saved": 0,
+            "sections_salvaged": 0,
+            "output_tokens_saved": 0
+        }
+    
+    def record(self, parsed: ParsedSections) -> None:
+        """Count one parsed model response"""
+        if parsed.ok:
+            outcome = "repaired" if parsed.repaired else "valid"
+        else:
+            outcome = "partial" if parsed.sections else "failed"
+        with self._lock:
+            self._counts["responses"] += 1
+            self._counts[outcome] += 1
+    
+    def record_salvage(self, succeeded: bool, sections: int, output_tokens: int) -> None:
+        """
+        Count one attempt to complete a partial response
+        
+        Args:
+            succeeded: The missing sections were regenerated, so the full
+                response did not have to be generated again
+            sections: Valid sections kept from the partial response
+            output_tokens: (Estimated) output tokens those sections cost
+        """
+        with self._lock:
+            self._counts["salvage_attempts"] += 1
+            if succeeded:
+                self._counts["retries_saved"] += 1
+                self._counts["sections_salvaged"] += sections
+                self._counts["output_tokens_saved"] += output_tokens
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the counters plus success rates"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+        responses = stats["responses"] or 1
+        stats["parse_success_rate"] = round((stats["valid"] + stats["repaired"]) / responses, 4)
+        stats["usable_rate"] = round(
+            (stats["valid"] + stats["repaired"] + stats["retries_saved"]) / responses, 4
+        )
+        return stats
@@ -4,29 +4,205 @@ This is the main entry point for the serverless function.
 """
 import json
 import os
-from typing import Dict, Any
+import time
+import base64
+import threading
+from typing import Dict, Any, List, Optional
+
+_import_started = time.perf_counter()
 
 from content_generator import ContentGenerator
 from vector_store import VectorStore
+from bedrock_client import BedrockThrottledError
+from renderer import compress_body, resolve_formats
+from jobs import JobManager
+
+# Startup timings (milliseconds) for this container. Filled in as the module
+# is imported and as the shared components are first built.
+_startup_timings: Dict[str, float] = {
+    "module_import_ms": (time.perf_counter() - _import_started) * 1000
+}
+
+# Components are created once per container on first use and reused across
+# warm invocations. The lock (reentrant, since the generator builds the
+# vector store) keeps concurrent first requests on a threaded server from
+# each building their own copy.
+_vector_store: Optional[VectorStore] = None
+_content_generator: Optional[ContentGenerator] = None
+_job_manager: Optional[JobManager] = None
+_components_lock = threading.RLock()
+
+
+def get_vector_store() -> VectorStore:
+    """Return the container-wide VectorStore, creating it on first use"""
+    global _vector_store
+    if _vector_store is None:
+        with _components_lock:
+            if _vector_store is None:
+                started = time.perf_counter()
+                _vector_store = VectorStore()
+                _startup_timings["vector_store_init_ms"] = (time.perf_counter() - started) * 1000
+    return _vector_store
+
+
+def get_content_generator() -> ContentGenerator:
+    """Return the container-wide ContentGenerator, creating it on first use"""
+    global _content_generator
+    if _content_generator is None:
+        with _components_lock:
+            if _content_generator is None:
+                vector_store = get_vector_store()
+                started = time.perf_counter()
+                _content_generator = ContentGenerator(vector_store)
+                _startup_timings["content_generator_init_ms"] = (time.perf_counter() - started) * 1000
+                _log_startup_report()
+    return _content_generator
+
+
+def get_job_manager() -> JobManager:
+    """Return the container-wide JobManager, creating it on first use"""
+    global _job_manager
+    if _job_manager is None:
+        with _components_lock:
+            if _job_manager is None:
+                _job_manager = JobManager.from_env(
+                    os.getenv("USE_LOCAL_MOCKS", "true").lower() == "true",
+                    os.getenv("AWS_REGION", "us-east-1"),
+                    run_job
+                )
+    return _job_manager
+
+
+def get_startup_report() -> Dict[str, Any]:
+    """
+    Report how long this container spent getting ready to serve.
+    
+    Returns:
+        Dictionary of per-stage timings in milliseconds plus a total, and
+        whether the shared components have been initialized yet
+    """
+    timings = {k: round(v, 3) for k, v in _startup_timings.items()}
+    return {
+        **timings,
+        "total_ms": round(sum(_startup_timings.values()), 3),
+        "initialized": _content_generator is not None
+    }
+
+
+def reset_components() -> None:
+    """Drop the cached components so the next request rebuilds them"""
+    global _vector_store, _content_generator, _job_manager
+    with _components_lock:
+        _vector_store = None
+        _content_generator = None
+        _job_manager = None
+        for key in ("vector_store_init_ms", "content_generator_init_ms"):
+            _startup_timings.pop(key, None)
+
+
+def _log_startup_report() -> None:
+    """Log the startup report once, when the container finishes warming up"""
+    print(json.dumps({"startup": get_startup_report()}))
+
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+
+# Largest max_parallel a batch may ask for; the generator never runs more
+# than MAX_CONCURRENT_GENERATIONS at once anyway
+MAX_BATCH_PARALLEL = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "32"))
+
+# Most languages one multi-language request may ask for
+MAX_LANGUAGES = int(os.getenv("MAX_LANGUAGES", "20"))
+
+# Response bodies at least this large are gzip/brotli compressed when the
+# client accepts it (-1 disables compression)
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+# Seconds the handler waits for queued history writes before returning.
+# Lambda freezes the container once the handler returns, so in Lambda the
+# history write is on the response path (usually one DynamoDB put, a few
+# milliseconds); only the local server writes entirely in the background.
+HISTORY_FLUSH_TIMEOUT = float(os.getenv("HISTORY_FLUSH_TIMEOUT", "2"))
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler function.
     
+    A body with an ``items`` list is treated as a batch request (the
+    ``/api/generate/batch`` shape); anything else is a single generation.
+    Requests to ``/api/jobs`` are queued as asynchronous jobs instead, and
+    a bare ``{"job_id": ...}`` event (the asynchronous self-invocation)
+    runs one. ``GET /api/history`` lists the caller's past generations.
+    The response body is compressed when the client sends a matching
+    Accept-Encoding header and asks for JSON first in its Accept header
+    (see _accepts_binary_json). Metrics recorded during the invocation are
+    logged as one CloudWatch EMF line.
+    
     Args:
         event: Lambda event containing request data
         context: Lambda context object
-        
+    
     Returns:
         Lambda response with status code and body
     """
+    if "job_id" in event and "httpMethod" not in event:
+        get_job_manager().run(event["job_id"])
+        _flush_history()
+        _emit_metrics(job_id=event["job_id"])
+        return {"job_id": event["job_id"]}
+    
+    response = _handle_request(event)
+    # The container is frozen once the handler returns, so queued history
+    # writes are finished first (see HISTORY_FLUSH_TIMEOUT)
+    _flush_history()
+    _emit_metrics(path=event.get("path"), status_code=response["statusCode"])
+    if COMPRESSION_MIN_BYTES < 0:
+        return response
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    if not _accepts_binary_json(headers.get("accept", "")):
+        return response
+    return _compress_response(response, headers.get("accept-encoding", ""))
+
+
+def _handle_request(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Route one API Gateway event and build its (uncompressed) response"""
     try:
-        # Parse request body
-        if isinstance(event.get("body"), str):
-            body = json.loads(event["body"])
+        user_id = _user_id(event)
+        path_parameters = event.get("pathParameters") or {}
+        if event.get("httpMethod") == "GET":
+            if path_parameters.get("job_id"):
+                return _handle_job_status(path_parameters["job_id"])
+            is_history = (event.get("path") or "").rstrip("/").endswith("/api/history")
+            if (path_parameters.get("generation_id") or is_history) and user_id is None:
+                # History is private: never served without an authenticated caller
+                return _json_response(401, {"error": "Authentication required"})
+            if path_parameters.get("generation_id"):
+                return _handle_history_entry(path_parameters["generation_id"], user_id)
+            if is_history:
+                return _handle_history_list(event.get("queryStringParameters") or {}, user_id)
+        
+        # Parse request body; application/json is a binary media type of the
+        # API (so compressed responses pass through), which base64-encodes
+        # JSON request bodies
+        raw_body = event.get("body")
+        if isinstance(raw_body, str) and event.get("isBase64Encoded"):
+            raw_body = base64.b64decode(raw_body).decode("utf-8")
+        if isinstance(raw_body, str):
+            body = json.loads(raw_body)
         else:
-            body = event.get("body", {})
+            body = raw_body or {}
+        
+        # The caller's identity comes from the request, never the body
+        body["user_id"] = user_id
+        if (event.get("path") or "").rstrip("/").endswith("/api/jobs"):
+            return _handle_job_submit(body)
+        if "items" in body:
+            return _handle_batch(body)
+        if "sections" in body:
+            return _handle_regenerate(body)
+        if "languages" in body:
+            return _handle_multilingual(body)
         
         # Extract request parameters
         title = body.get("title", "")
@@ -37,20 +213,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Validate required fields
         if not title or not description:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*"
-                },
-                "body": json.dumps({
-                    "error": "Title and description are required"
-                })
-            }
+            return _json_response(400, {
+                "error": "Title and description are required"
+            })
+        try:
+            formats = resolve_formats(body.get("formats"))
+        except ValueError as e:
+            return _json_response(400, {"error": str(e)})
         
-        # Initialize components
-        vector_store = VectorStore()
-        content_generator = ContentGenerator(vector_store)
+        # Reuse components across warm invocations
+        content_generator = get_content_generator()
         
         # Generate content
         result = content_generator.generate(
@@ -58,32 +230,299 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             description=description,
             tone=tone,
             language=language,
-            content_type=content_type
+            content_type=content_type,
+            use_cache=not body.get("bypass_cache", False),
+            tier=body.get("tier"),
+            formats=formats,
+            user_id=user_id
         )
         
         # Return success response
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": json.dumps(result)
-        }
-        
+        return _json_response(200, result)
+    
+    except BedrockThrottledError as e:
+        # Capacity problem, not a bug: tell the client to back off and retry
+        print(f"Throttled: {str(e)}")
+        return _json_response(429, {
+            "error": "Model capacity exceeded, please retry later",
+            "detail": str(e)
+        })
+    
     except Exception as e:
         # Log error (in production, use CloudWatch)
         print(f"Error: {str(e)}")
         
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": json.dumps({
-                "error": "Internal server error",
-                "detail": str(e)
+        return _json_response(500, {
+            "error": "Internal server error",
+            "detail": str(e)
+        })
+
+
+def _handle_batch(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate content for every item of a batch request"""
+    items = body.get("items")
+    if not isinstance(items, list) or not items:
+        return _json_response(400, {"error": "items must be a non-empty list"})
+    if len(items) > MAX_BATCH_SIZE:
+        return _json_response(400, {
+            "error": f"Batch size {len(items)} exceeds the limit of {MAX_BATCH_SIZE}"
+        })
+    error = _max_parallel_error(body.get("max_parallel"))
+    if error:
+        return _json_response(400, {"error": error})
+    
+    results = get_content_generator().generate_batch(
+        _with_user(items, body.get("user_id")),
+        max_parallel=body.get("max_parallel")
+    )
+    return _json_response(200, summarize_batch(results))
+
+
+def _handle_regenerate(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Regenerate the listed sections of previously generated content"""
+    content = body.get("content")
+    sections = body.get("sections")
+    if not isinstance(content, dict) or not isinstance(sections, list) or not sections:
+        return _json_response(400, {
+            "error": "content (object) and sections (non-empty list) are required"
+        })
+    if not body.get("title") or not body.get("description"):
+        return _json_response(400, {"error": "Title and description are required"})
+    
+    try:
+        result = get_content_generator().regenerate_sections(
+            content,
+            sections,
+            title=body["title"],
+            description=body["description"],
+            tone=body.get("tone", "professional"),
+            language=body.get("language", "en"),
+            content_type=body.get("content_type", "landing_page"),
+            tier=body.get("tier"),
+            formats=body.get("formats"),
+            user_id=body.get("user_id")
+        )
+    except ValueError as e:
+        return _json_response(400, {"error": str(e)})
+    return _json_response(200, result)
+
+
+def _handle_multilingual(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate one page in every language of the request"""
+    if not body.get("title") or not body.get("description"):
+        return _json_response(400, {"error": "Title and description are required"})
+    error = _languages_error(body.get("languages"))
+    if error:
+        return _json_response(400, {"error": error})
+    
+    try:
+        result = get_content_generator().generate_multilingual(
+            title=body["title"],
+            description=body["description"],
+            languages=body["languages"],
+            tone=body.get("tone", "professional"),
+            content_type=body.get("content_type", "landing_page"),
+            use_cache=not body.get("bypass_cache", False),
+            tier=body.get("tier"),
+            formats=body.get("formats"),
+            user_id=body.get("user_id")
+        )
+    except ValueError as e:
+        return _json_response(400, {"error": str(e)})
+    return _json_response(200, result)
+
+
+def _languages_error(languages: Any) -> Optional[str]:
+    """Validation error for a request's languages list, or None"""
+    if (
+        not isinstance(languages, list)
+        or not languages
+        or len(languages) > MAX_LANGUAGES
+        or not all(isinstance(code, str) and code.strip() for code in languages)
+    ):
+        return f"languages must be a non-empty list of at most {MAX_LANGUAGES} language codes"
+    return None
+
+
+def _max_parallel_error(max_parallel: Any) -> Optional[str]:
+    """Validation error for a batch's optional max_parallel, or None"""
+    if max_parallel is None:
+        return None
+    if (
+        not isinstance(max_parallel, int)
+        or isinstance(max_parallel, bool)
+        or not 1 <= max_parallel <= MAX_BATCH_PARALLEL
+    ):
+        return f"max_parallel must be an integer from 1 to {MAX_BATCH_PARALLEL}"
+    return None
+
+
+def _handle_job_submit(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue a generate, batch, regenerate or multi-language request as an asynchronous job"""
+    if "items" in body:
+        items = body["items"]
+        if not isinstance(items, list) or not items or len(items) > MAX_BATCH_SIZE:
+            return _json_response(400, {
+                "error": f"items must be a non-empty list of at most {MAX_BATCH_SIZE} requests"
+            })
+        error = _max_parallel_error(body.get("max_parallel"))
+        if error:
+            return _json_response(400, {"error": error})
+    elif not body.get("title") or not body.get("description"):
+        return _json_response(400, {"error": "Title and description are required"})
+    elif "sections" in body:
+        if not isinstance(body.get("content"), dict) or not isinstance(body["sections"], list) or not body["sections"]:
+            return _json_response(400, {
+                "error": "content (object) and sections (non-empty list) are required"
             })
-        }
+    elif "languages" in body:
+        error = _languages_error(body["languages"])
+        if error:
+            return _json_response(400, {"error": error})
+    
+    job = get_job_manager().submit(body)
+    return _json_response(202, {**job, "status_url": f"/api/jobs/{job['job_id']}"})
+
+
+def _handle_job_status(job_id: str) -> Dict[str, Any]:
+    """Report an asynchronous job's status, and its result once finished"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return _json_response(404, {"error": f"Job {job_id} not found"})
+    return _json_response(200, job)
+
+
+def _handle_history_list(query: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """List one page of the caller's generation history"""
+    try:
+        page = get_content_generator().list_history(
+            user_id,
+            limit=int(query.get("limit", 20)),
+            cursor=query.get("cursor"),
+            content_type=query.get("content_type")
+        )
+    except ValueError as e:
+        return _json_response(400, {"error": str(e)})
+    return _json_response(200, page)
+
+
+def _handle_history_entry(generation_id: str, user_id: str) -> Dict[str, Any]:
+    """Return one of the caller's past generations in full"""
+    entry = get_content_generator().get_history(generation_id, user_id)
+    if entry is None:
+        return _json_response(404, {"error": f"Generation {generation_id} not found"})
+    return _json_response(200, entry)
+
+
+def _user_id(event: Dict[str, Any]) -> Optional[str]:
+    """
+    The caller's user id: the ``sub`` claim set by the Cognito authorizer,
+    or None for unauthenticated requests (whose generations are recorded
+    under the anonymous user). Client-supplied headers are never trusted.
+    """
+    claims = ((event.get("requestContext") or {}).get("authorizer") or {}).get("claims") or {}
+    return claims.get("sub") or None
+
+
+def _with_user(items: List[Dict[str, Any]], user_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Batch items attributed to the caller"""
+    return [{**item, "user_id": user_id} if isinstance(item, dict) else item for item in items]
+
+
+def _flush_history() -> None:
+    if _content_generator is not None and _content_generator.history is not None:
+        if not _content_generator.history.flush(HISTORY_FLUSH_TIMEOUT):
+            print("Warning: history writes still pending at the end of the invocation")
+
+
+def _emit_metrics(**properties: Any) -> None:
+    if _content_generator is not None:
+        _content_generator.metrics.emit_emf(**properties)
+
+
+def run_job(kind: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute a queued job's request (the JobManager runner)
+    
+    Args:
+        kind: "generate", "batch" or "regenerate"
+        body: Request body, in the shape of the matching sync endpoint
+    
+    Returns:
+        The response body the sync endpoint would have returned
+    """
+    content_generator = get_content_generator()
+    if kind == "batch":
+        return summarize_batch(content_generator.generate_batch(
+            _with_user(body["items"], body.get("user_id")),
+            max_parallel=body.get("max_parallel")
+        ))
+    
+    params = {
+        "title": body["title"],
+        "description": body["description"],
+        "tone": body.get("tone", "professional"),
+        "language": body.get("language", "en"),
+        "content_type": body.get("content_type", "landing_page"),
+        "tier": body.get("tier"),
+        "formats": body.get("formats"),
+        "user_id": body.get("user_id")
+    }
+    if kind == "regenerate":
+        return content_generator.regenerate_sections(body["content"], body["sections"], **params)
+    if "languages" in body:
+        params.pop("language")
+        return content_generator.generate_multilingual(
+            languages=body["languages"], use_cache=not body.get("bypass_cache", False), **params
+        )
+    return content_generator.generate(use_cache=not body.get("bypass_cache", False), **params)
+
+
+def summarize_batch(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Wrap per-item batch results with success/failure counts"""
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+
+def _json_response(status_code: int, payload: Any) -> Dict[str, Any]:
+    """Build an API Gateway proxy response with a JSON body"""
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*"
+        },
+        "body": json.dumps(payload)
+    }
+
+
+def _accepts_binary_json(accept: str) -> bool:
+    """
+    Whether API Gateway will decode a base64 body for this request.
+    
+    API Gateway only turns an ``isBase64Encoded`` proxy response back into
+    bytes when the first media type in the request's Accept header is one
+    of the API's binary media types (``application/json`` here). Otherwise,
+    e.g. for ``*/*``, the client would receive the base64 text itself.
+    """
+    first = accept.split(",")[0].split(";")[0].strip().lower()
+    return first == "application/json"
+
 
+def _compress_response(response: Dict[str, Any], accept_encoding: str) -> Dict[str, Any]:
+    """Compress a proxy response body (base64-encoded, as API Gateway requires)"""
+    compressed, encoding = compress_body(
+        response["body"].encode("utf-8"), accept_encoding, COMPRESSION_MIN_BYTES
+    )
+    if encoding is None:
+        return response
+    return {
+        **response,
+        "headers": {**response["headers"], "Content-Encoding": encoding, "Vary": "Accept, Accept-Encoding"},
+        "body": base64.b64encode(compressed).decode("ascii"),
+        "isBase64Encoded": True
+    }
@@ -0,0 +1,174 @@
+"""
+Lexical (BM25) index and metadata filtering for hybrid retrieval.
+Maintained alongside the vector index so exact terms such as product names
+or "SOC 2" can be matched, then fused with vector results.
+"""
+import re
+import math
+import heapq
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens plus adjacent-word bigrams (so "SOC 2" matches as a phrase)"""
+    words = _TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuse several ranked id lists with reciprocal rank fusion
+    
+    Args:
+        rankings: Ranked lists of document ids, best first
+        k: Damping constant; larger values flatten the rank contribution
+    
+    Returns:
+        Ids ordered by fused score, best first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])
+
+
+class LexicalIndex:
+    """
+    Inverted-index BM25 scorer with metadata postings.
+    
+    Metadata filters are resolved against per-field postings into a set of
+    allowed documents before any scoring happens. A document that has no
+    value for a filtered field is treated as applying to every value (for
+    example, generic knowledge-base entries with no language tag).
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._field_values: Dict[str, Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._field_present: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def add(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """Index documents; ids already present are ignored"""
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                if doc_id in self._positions:
+                    continue
+                position = len(self.ids)
+                self._positions[doc_id] = position
+                self.ids.append(doc_id)
+                self.texts.append(text)
+                self.metadatas.append(metadata or {})
+                
+                tokens = tokenize(text)
+                self._lengths.append(len(tokens))
+                self._total_length += len(tokens)
+                for token in tokens:
+                    postings = self._postings[token]
+                    postings[position] = postings.get(position, 0) + 1
+                
+                for key, value in (metadata or {}).items():
+                    try:
+                        self._field_values[key][value].add(position)
+                    except TypeError:
+                        continue  # unhashable values cannot be filtered on
+                    self._field_present[key].add(position)
+    
+    def text(self, doc_id: str) -> str:
+        return self.texts[self._positions[doc_id]]
+    
+    def allowed_ids(self, filters: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """
+        Resolve metadata filters to the set of matching document ids
+        
+        Args:
+            filters: Field -> value (or list of accepted values); None values
+                are ignored
+        
+        Returns:
+            Matching ids, or None when there is nothing to filter on
+        """
+        positions = self._allowed_positions(filters)
+        if positions is None:
+            return None
+        return {self.ids[p] for p in positions}
+    
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[str]:
+        """
+        Rank documents by BM25 score
+        
+        Args:
+            query: Search query
+            top_k: Number of results
+            allowed_ids: Restrict scoring to these documents
+        
+        Returns:
+            Ids of the best matching documents, best first
+        """
+        count = len(self.ids)
+        if count == 0:
+            return []
+        allowed = None
+        if allowed_ids is not None:
+            allowed = {self._positions[i] for i in allowed_ids if i in self._positions}
+            if not allowed:
+                return []
+        
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings.items():
+                if allowed is not None and position not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / average_length)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [self.ids[position] for position, _ in best]
+    
+    def _allowed_positions(self, filters: Optional[Dict[str, Any]]) -> Optional[Set[int]]:
+        active = {k: v for k, v in (filters or {}).items() if v is not None}
+        if not active:
+            return None
+        
+        allowed: Optional[Set[int]] = None
+        everything = set(range(len(self.ids)))
+        for key, accepted in active.items():
+            values = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+            matching = everything - self._field_present.get(key, set())
+            for value in values:
+                matching |= self._field_values.get(key, {}).get(value, set())
+            allowed = matching if allowed is None else allowed & matching
+        return allowed
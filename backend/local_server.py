@@ -3,13 +3,27 @@ Local development server for the content creation backend.
 This mimics the Lambda function behavior for local testing.
 """
 import os
+import json
+import asyncio
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Union
 from dotenv import load_dotenv
 
-from lambda_function import lambda_handler
+from lambda_function import (
+    get_content_generator,
+    get_job_manager,
+    summarize_batch,
+    COMPRESSION_MIN_BYTES,
+    MAX_BATCH_PARALLEL,
+    MAX_BATCH_SIZE,
+    MAX_LANGUAGES
+)
+from bedrock_client import BedrockThrottledError
+from renderer import compress_body
 
 load_dotenv()
 
@@ -25,12 +39,53 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def compress_responses(request: Request, call_next):
+    """gzip/brotli-compress JSON responses for clients that accept it"""
+    response = await call_next(request)
+    if (
+        COMPRESSION_MIN_BYTES < 0
+        or "content-encoding" in response.headers
+        or not response.headers.get("content-type", "").startswith("application/json")
+    ):
+        # Server-Sent Events must reach the client unbuffered
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    compressed, encoding = compress_body(
+        body, request.headers.get("accept-encoding", ""), COMPRESSION_MIN_BYTES
+    )
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if encoding is not None:
+        headers["content-encoding"] = encoding
+        headers["vary"] = "Accept-Encoding"
+    return Response(content=compressed, status_code=response.status_code, headers=headers)
+
+
 class ContentRequest(BaseModel):
     title: str
     description: str
     tone: str = "professional"
     language: str = "en"
     content_type: str = "landing_page"
+    bypass_cache: bool = False
+    # Model routing tier: "fast", "balanced" or "quality" (None = server default)
+    tier: Optional[Literal["fast", "balanced", "quality"]] = None
+    # Renderings to include (None = server default, [] = sections only)
+    formats: Optional[List[Literal["html", "markdown", "jsonld"]]] = None
+    # Generate in several languages: the first is generated, the others
+    # translated from it (replaces language; generate and job requests only)
+    languages: Optional[List[str]] = Field(None, min_length=1, max_length=MAX_LANGUAGES)
+
+
+class RegenerateRequest(ContentRequest):
+    content: Dict[str, Any]
+    sections: List[str] = Field(..., min_length=1)
+
+
+class BatchRequest(BaseModel):
+    items: List[ContentRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    max_parallel: Optional[int] = Field(None, ge=1, le=MAX_BATCH_PARALLEL, strict=True)
 
 
 @app.get("/health")
@@ -39,39 +94,230 @@ async def health():
 
 
 @app.post("/api/generate")
-async def generate_content(request: ContentRequest):
-    """Generate content using the Lambda handler logic"""
+async def generate_content(request: ContentRequest, x_user_id: Optional[str] = Header(None)):
+    """Generate content without blocking the event loop; ``languages`` asks for several locales"""
+    if not request.title or not request.description:
+        raise HTTPException(
+            status_code=400,
+            detail="Title and description are required"
+        )
+    
     try:
-        # Convert FastAPI request to Lambda event format
-        event = {
-            "body": request.model_dump_json(),
-            "headers": {},
-            "requestContext": {
-                "requestId": "local-request"
-            }
-        }
+        # First call builds the shared components, which does blocking I/O
+        content_generator = await asyncio.to_thread(get_content_generator)
         
-        context = type('Context', (), {
-            'aws_request_id': 'local-request-id',
-            'function_name': 'content-generator-local'
-        })()
+        if request.languages is not None:
+            return await content_generator.agenerate_multilingual(
+                title=request.title,
+                description=request.description,
+                languages=request.languages,
+                tone=request.tone,
+                content_type=request.content_type,
+                use_cache=not request.bypass_cache,
+                tier=request.tier,
+                formats=request.formats,
+                user_id=x_user_id
+            )
+        return await content_generator.agenerate(
+            title=request.title,
+            description=request.description,
+            tone=request.tone,
+            language=request.language,
+            content_type=request.content_type,
+            use_cache=not request.bypass_cache,
+            tier=request.tier,
+            formats=request.formats,
+            user_id=x_user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BedrockThrottledError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/generate/batch")
+async def generate_content_batch(request: BatchRequest, x_user_id: Optional[str] = Header(None)):
+    """Generate content for many requests; failed items do not fail the batch"""
+    try:
+        content_generator = await asyncio.to_thread(get_content_generator)
         
-        # Call the Lambda handler
-        response = lambda_handler(event, context)
+        results = await content_generator.agenerate_batch(
+            [{**item.model_dump(), "user_id": x_user_id} for item in request.items],
+            max_parallel=request.max_parallel
+        )
+        return summarize_batch(results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/regenerate")
+async def regenerate_sections(request: RegenerateRequest, x_user_id: Optional[str] = Header(None)):
+    """Regenerate only the listed sections of previously generated content"""
+    try:
+        content_generator = await asyncio.to_thread(get_content_generator)
         
-        # Parse the Lambda response
-        if response.get("statusCode") == 200:
-            import json
-            return json.loads(response["body"])
-        else:
-            raise HTTPException(
-                status_code=response.get("statusCode", 500),
-                detail=response.get("body", "Unknown error")
-            )
+        return await content_generator.aregenerate_sections(
+            request.content,
+            request.sections,
+            title=request.title,
+            description=request.description,
+            tone=request.tone,
+            language=request.language,
+            content_type=request.content_type,
+            tier=request.tier,
+            formats=request.formats,
+            user_id=x_user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BedrockThrottledError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/jobs", status_code=202)
+async def submit_job(
+    request: Union[BatchRequest, RegenerateRequest, ContentRequest],
+    x_user_id: Optional[str] = Header(None)
+):
+    """
+    Queue a generate, batch, regenerate or multi-language request as an
+    asynchronous job.
+    
+    The body has the shape of the matching synchronous endpoint and is
+    validated the same way before it is queued; poll ``status_url`` for
+    the result.
+    """
+    if not isinstance(request, BatchRequest) and (not request.title or not request.description):
+        raise HTTPException(
+            status_code=400,
+            detail="Title and description are required"
+        )
+    
+    job_manager = await asyncio.to_thread(get_job_manager)
+    body = request.model_dump(exclude_none=True)
+    if x_user_id:
+        body["user_id"] = x_user_id
+    job = await asyncio.to_thread(job_manager.submit, body)
+    return {**job, "status_url": f"/api/jobs/{job['job_id']}"}
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status of an asynchronous job, with its result or error once finished"""
+    job_manager = await asyncio.to_thread(get_job_manager)
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.post("/api/generate/stream")
+async def generate_content_stream(request: ContentRequest, x_user_id: Optional[str] = Header(None)):
+    """
+    Stream generated content as Server-Sent Events.
+    
+    Emits a ``section`` event for each section as soon as it is complete,
+    then a ``complete`` event with the full result (or an ``error`` event).
+    """
+    if not request.title or not request.description:
+        raise HTTPException(
+            status_code=400,
+            detail="Title and description are required"
+        )
+    
+    content_generator = await asyncio.to_thread(get_content_generator)
+    
+    async def event_source():
+        try:
+            async for event in content_generator.agenerate_stream(
+                title=request.title,
+                description=request.description,
+                tone=request.tone,
+                language=request.language,
+                content_type=request.content_type,
+                use_cache=not request.bypass_cache,
+                tier=request.tier,
+                formats=request.formats,
+                user_id=x_user_id
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.get("/api/history")
+async def list_history(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    content_type: Optional[str] = None,
+    x_user_id: Optional[str] = Header(None)
+):
+    """
+    The caller's past generations, newest first.
+    
+    Returns summaries only; pass ``next_cursor`` back as ``cursor`` for the
+    next page and fetch a full record from ``/api/history/{generation_id}``.
+    """
+    content_generator = await asyncio.to_thread(get_content_generator)
+    try:
+        return await asyncio.to_thread(
+            content_generator.list_history, x_user_id, limit, cursor, content_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/history/{generation_id}")
+async def history_entry(generation_id: str, x_user_id: Optional[str] = Header(None)):
+    """One past generation with its request, sections, usage and timings"""
+    content_generator = await asyncio.to_thread(get_content_generator)
+    entry = await asyncio.to_thread(content_generator.get_history, generation_id, x_user_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Generation {generation_id} not found")
+    return entry
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters"""
+    content_generator = await asyncio.to_thread(get_content_generator)
+    return content_generator.cache_stats()
+
+
+@app.get("/api/routing/stats")
+async def routing_stats():
+    """Model routing counters: calls, latency and estimated cost per model"""
+    content_generator = await asyncio.to_thread(get_content_generator)
+    return content_generator.routing_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and token/cache counters in Prometheus text format"""
+    content_generator = await asyncio.to_thread(get_content_generator)
+    return PlainTextResponse(
+        content_generator.metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/api/parse/stats")
+async def parse_stats():
+    """Model output parsing success rate and generations saved by section salvage"""
+    content_generator = await asyncio.to_thread(get_content_generator)
+    return content_generator.parse_stats()
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port, reload=True)
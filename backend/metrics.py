@@ -0,0 +1,280 @@
+"""
+Request metrics.
+Per-stage latencies (retrieval, prompt building, model call, parsing,
+rendering) and token/cache counters. Everything is aggregated per process
+for a Prometheus-style /metrics endpoint; in Lambda the values recorded
+during an invocation are also written as one CloudWatch Embedded Metric
+Format (EMF) log line, which CloudWatch turns into metrics without any
+API calls.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; the memory gauge is left out there
+    resource = None
+
+
+STAGES = ("retrieval", "prompt", "model", "parse", "render")
+
+# Histogram bucket upper bounds in milliseconds, from parsing or rendering
+# one page to a long model call
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Counter name -> (EMF metric name, help text)
+COUNTERS = {
+    "requests": ("Requests", "Completed generation requests"),
+    "fallbacks": ("Fallbacks", "Requests answered with placeholder content"),
+    "model_calls": ("ModelCalls", "Bedrock model invocations"),
+    "input_tokens": ("InputTokens", "Uncached prompt tokens reported by Bedrock"),
+    "output_tokens": ("OutputTokens", "Completion tokens reported by Bedrock"),
+    "cache_read_input_tokens": ("CacheReadInputTokens", "Prompt tokens read from the Bedrock prompt cache"),
+    "cache_write_input_tokens": ("CacheWriteInputTokens", "Prompt tokens written to the Bedrock prompt cache"),
+    "response_cache_hits": ("ResponseCacheHits", "Requests served from the response cache"),
+    "response_cache_misses": ("ResponseCacheMisses", "Response cache lookups that missed"),
+    "coalesced_requests": ("CoalescedRequests", "Requests that shared an identical in-flight generation")
+}
+
+# EMF allows at most 100 values per metric in one log line
+_MAX_EMF_VALUES = 100
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (not thread-safe on its own)"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs in Prometheus order, ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((_format_number(bound), running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+class Metrics:
+    """
+    Thread-safe metric registry.
+    
+    Stage latencies are histograms labelled by stage, request latencies
+    histograms labelled by operation, and counters may carry labels (token
+    counters are labelled by model). With ``emf`` enabled, every value is
+    also kept until the next emit_emf() call, which writes them as one EMF
+    log line; without it nothing accumulates per invocation.
+    """
+    
+    def __init__(self, namespace: str = "ContentCreator", service: str = "content-generator", emf: bool = False):
+        """
+        Args:
+            namespace: CloudWatch namespace of the EMF metrics
+            service: Value of the ``Service`` dimension
+            emf: Keep per-invocation values for emit_emf()
+        """
+        self.namespace = namespace
+        self.service = service
+        self.emf = emf
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._requests: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._pending_latencies: Dict[str, List[float]] = {}
+        self._pending_counters: Dict[str, float] = {}
+        self._pending_properties: Dict[str, Any] = {}
+    
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """
+        Build the registry from METRICS_NAMESPACE, METRICS_SERVICE and
+        METRICS_EMF (on by default inside Lambda)
+        """
+        in_lambda = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+        return cls(
+            namespace=os.getenv("METRICS_NAMESPACE", "ContentCreator"),
+            service=os.getenv("METRICS_SERVICE", "content-generator"),
+            emf=os.getenv("METRICS_EMF", "true" if in_lambda else "false").lower() == "true"
+        )
+    
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of `stage`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+    
+    def observe(self, stage: str, elapsed_ms: float) -> None:
+        """Record one latency observation for a pipeline stage"""
+        with self._lock:
+            self._stages.setdefault(stage, Histogram()).observe(elapsed_ms)
+            if self.emf:
+                self._pending_latencies.setdefault(f"{stage.capitalize()}Latency", []).append(elapsed_ms)
+    
+    def observe_request(self, operation: str, elapsed_ms: float) -> None:
+        """Record the end-to-end latency of a completed request"""
+        with self._lock:
+            self._requests.setdefault(operation, Histogram()).observe(elapsed_ms)
+            if self.emf:
+                self._pending_latencies.setdefault("RequestLatency", []).append(elapsed_ms)
+                operations = self._pending_properties.setdefault("operations", [])
+                if operation not in operations:
+                    operations.append(operation)
+    
+    def count(self, name: str, amount: float = 1, **labels: str) -> None:
+        """
+        Add to a counter
+        
+        Args:
+            name: A key of COUNTERS
+            amount: Increment; zero increments are ignored
+            labels: Prometheus labels (EMF values are summed across them)
+        """
+        if not amount:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if self.emf:
+                self._pending_counters[name] = self._pending_counters.get(name, 0) + amount
+    
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            stages = {name: (h.cumulative(), h.sum, h.count) for name, h in sorted(self._stages.items())}
+            requests = {name: (h.cumulative(), h.sum, h.count) for name, h in sorted(self._requests.items())}
+            counters = sorted(self._counters.items())
+        
+        lines: List[str] = []
+        _histogram_lines(
+            lines,
+            "content_stage_duration_ms",
+            "Latency of each generation pipeline stage",
+            "stage",
+            stages
+        )
+        _histogram_lines(
+            lines,
+            "content_request_duration_ms",
+            "End-to-end latency of completed requests",
+            "operation",
+            requests
+        )
+        documented = set()
+        for (name, labels), value in counters:
+            metric = f"content_{name}_total"
+            if name not in documented:
+                documented.add(name)
+                lines.append(f"# HELP {metric} {COUNTERS.get(name, ('', name))[1]}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(dict(labels))} {_format_number(value)}")
+        
+        peak_rss = max_rss_bytes()
+        if peak_rss is not None:
+            lines.append("# HELP content_process_max_rss_bytes Peak resident memory of the process")
+            lines.append("# TYPE content_process_max_rss_bytes gauge")
+            lines.append(f"content_process_max_rss_bytes {peak_rss}")
+        return "\n".join(lines) + "\n"
+    
+    def emit_emf(self, **properties: Any) -> Optional[Dict[str, Any]]:
+        """
+        Write the values recorded since the last call as one EMF log line
+        
+        Args:
+            properties: Extra fields for the log line (searchable in Logs
+                Insights, not dimensions)
+        
+        Returns:
+            The EMF document, or None when EMF is disabled or nothing was
+            recorded
+        """
+        if not self.emf:
+            return None
+        with self._lock:
+            latencies, self._pending_latencies = self._pending_latencies, {}
+            counters, self._pending_counters = self._pending_counters, {}
+            pending_properties, self._pending_properties = self._pending_properties, {}
+        if not latencies and not counters:
+            return None
+        
+        definitions = []
+        document: Dict[str, Any] = {"Service": self.service, **pending_properties, **properties}
+        for name, values in latencies.items():
+            definitions.append({"Name": name, "Unit": "Milliseconds"})
+            document[name] = [round(v, 3) for v in values[:_MAX_EMF_VALUES]]
+        for name, value in counters.items():
+            emf_name = COUNTERS.get(name, (name, ""))[0]
+            definitions.append({"Name": emf_name, "Unit": "Count"})
+            document[emf_name] = value
+        document["_aws"] = {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": self.namespace,
+                "Dimensions": [["Service"]],
+                "Metrics": definitions
+            }]
+        }
+        print(json.dumps(document))
+        return document
+
+
+def max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _histogram_lines(
+    lines: List[str],
+    metric: str,
+    help_text: str,
+    label: str,
+    histograms: Dict[str, Tuple[List[Tuple[str, int]], float, int]]
+) -> None:
+    if not histograms:
+        return
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, (buckets, total, count) in histograms.items():
+        for le, cumulative in buckets:
+            lines.append(f"{metric}_bucket{_labels({label: name, 'le': le})} {cumulative}")
+        lines.append(f"{metric}_sum{_labels({label: name})} {_format_number(round(total, 3))}")
+        lines.append(f"{metric}_count{_labels({label: name})} {count}")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
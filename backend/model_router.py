@@ -0,0 +1,258 @@
+"""
+Per-request model routing between a fast model (Claude Haiku) and a
+quality model (Claude Sonnet).
+Routes on content type, input size and a caller-supplied tier, and keeps
+counters of every decision so latency and cost savings can be measured.
+"""
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from prompt_templates import estimate_tokens
+
+
+TIERS = ("fast", "balanced", "quality")
+
+# USD per million (input, output) tokens, used only for savings estimates.
+# Models are matched by family name; anything else is priced as Sonnet.
+MODEL_PRICES = {
+    "haiku": (0.80, 4.00),
+    "sonnet": (3.00, 15.00)
+}
+
+
+class RoutingDecision:
+    """The model picked for one request and why"""
+    
+    def __init__(
+        self,
+        model_id: str,
+        tier: str,
+        reason: str,
+        escalation_model_id: Optional[str] = None
+    ):
+        self.model_id = model_id
+        self.tier = tier
+        self.reason = reason
+        # Model to retry on when the output is unusable (None = no escalation)
+        self.escalation_model_id = escalation_model_id
+        # Usage of every model call made for this request (see ModelRouter.record)
+        self.model_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.model_latency_ms = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"model_id": self.model_id, "tier": self.tier, "reason": self.reason}
+
+
+class ModelRouter:
+    """
+    Picks the model for each request.
+    
+    - ``quality`` always uses the quality model, ``fast`` the fast model.
+    - ``balanced`` (the default) uses the fast model for the content types
+      in ``fast_content_types`` when the request input is small, and the
+      quality model otherwise.
+    
+    With ``escalate`` enabled, requests routed to the fast model carry the
+    quality model as their escalation target, which the generator uses
+    when the fast model's output cannot be parsed or fails the schema.
+    """
+    
+    def __init__(
+        self,
+        fast_model_id: str,
+        quality_model_id: str,
+        enabled: bool = True,
+        default_tier: str = "balanced",
+        fast_content_types: Iterable[str] = ("product_page", "about_page"),
+        fast_max_input_tokens: int = 400,
+        escalate: bool = True,
+        log_decisions: bool = True
+    ):
+        self.fast_model_id = fast_model_id
+        self.quality_model_id = quality_model_id
+        self.enabled = enabled
+        self.default_tier = default_tier if default_tier in TIERS else "balanced"
+        self.fast_content_types = set(fast_content_types)
+        self.fast_max_input_tokens = fast_max_input_tokens
+        self.escalate = escalate
+        self.log_decisions = log_decisions
+        self._stats: Dict[str, Any] = {"requests": 0, "escalations": 0, "salvages": 0, "tiers": {}, "models": {}}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls, quality_model_id: str, use_local_mocks: bool) -> "ModelRouter":
+        """
+        Build a router from the MODEL_ROUTING_* environment variables
+        
+        Args:
+            quality_model_id: The default (larger) model
+            use_local_mocks: Use a mock model id for the fast model
+        """
+        default_fast = "local-mock-haiku" if use_local_mocks else "anthropic.claude-3-5-haiku-20241022-v1:0"
+        fast_types = os.getenv("MODEL_ROUTING_FAST_CONTENT_TYPES", "product_page,about_page")
+        return cls(
+            fast_model_id=os.getenv("BEDROCK_FAST_MODEL_ID", default_fast),
+            quality_model_id=quality_model_id,
+            enabled=os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true",
+            default_tier=os.getenv("MODEL_ROUTING_DEFAULT_TIER", "balanced"),
+            fast_content_types=[t.strip() for t in fast_types.split(",") if t.strip()],
+            fast_max_input_tokens=int(os.getenv("MODEL_ROUTING_FAST_MAX_INPUT_TOKENS", "400")),
+            escalate=os.getenv("MODEL_ROUTING_ESCALATE", "true").lower() == "true",
+            log_decisions=os.getenv("MODEL_ROUTING_LOG", "true").lower() == "true"
+        )
+    
+    def route(self, params: Dict[str, Any], tier: Optional[str] = None) -> RoutingDecision:
+        """
+        Pick the model for a request
+        
+        Args:
+            params: Request parameters (title, description, content_type, ...)
+            tier: Caller-supplied latency/quality tier; None uses the default
+        
+        Returns:
+            The routing decision
+        """
+        tier = self._tier(tier)
+        if not self.enabled:
+            return RoutingDecision(self.quality_model_id, tier, "routing_disabled")
+        if tier == "quality":
+            return self._decision(self.quality_model_id, tier, "tier")
+        if tier == "fast":
+            return self._decision(self.fast_model_id, tier, "tier")
+        
+        if params.get("content_type") not in self.fast_content_types:
+            return self._decision(self.quality_model_id, tier, "content_type")
+        input_tokens = estimate_tokens(f"{params.get('title', '')} {params.get('description', '')}")
+        if input_tokens > self.fast_max_input_tokens:
+            return self._decision(self.quality_model_id, tier, "input_size")
+        return self._decision(self.fast_model_id, tier, "small_input")
+    
+    def route_translation(self, tier: Optional[str] = None) -> RoutingDecision:
+        """
+        Pick the model that translates generated content into another language
+        
+        Translation does not need the quality model, so every tier except
+        ``quality`` uses the fast model (escalating as usual).
+        """
+        tier = self._tier(tier)
+        if not self.enabled:
+            return RoutingDecision(self.quality_model_id, tier, "routing_disabled")
+        if tier == "quality":
+            return self._decision(self.quality_model_id, tier, "tier")
+        return self._decision(self.fast_model_id, tier, "translation")
+    
+    def record(
+        self,
+        decision: RoutingDecision,
+        model_id: str,
+        latency_ms: float,
+        input_tokens: int,
+        output_tokens: int,
+        escalated: bool = False,
+        salvage: bool = False
+    ) -> None:
+        """
+        Record one model call made for a routed request
+        
+        The call is also added to the decision's own usage totals.
+        
+        Args:
+            decision: The request's routing decision
+            model_id: Model that was actually called
+            latency_ms: Duration of the model call
+            input_tokens: Prompt tokens (Bedrock usage when reported, else estimated)
+            output_tokens: Completion tokens (likewise)
+            escalated: This call is the retry on the escalation model
+            salvage: This call regenerates sections missing from an earlier
+                response of the same request
+        """
+        cost = _cost(model_id, input_tokens, output_tokens)
+        baseline = _cost(self.quality_model_id, input_tokens, output_tokens)
+        with self._lock:
+            if escalated:
+                self._stats["escalations"] += 1
+            elif salvage:
+                self._stats["salvages"] += 1
+            else:
+                self._stats["requests"] += 1
+                self._stats["tiers"][decision.tier] = self._stats["tiers"].get(decision.tier, 0) + 1
+            
+            model = self._stats["models"].setdefault(model_id, {
+                "calls": 0, "latency_ms": 0.0, "input_tokens": 0, "output_tokens": 0,
+                "cost_usd": 0.0, "quality_cost_usd": 0.0
+            })
+            model["calls"] += 1
+            model["latency_ms"] += latency_ms
+            model["input_tokens"] += input_tokens
+            model["output_tokens"] += output_tokens
+            model["cost_usd"] += cost
+            # What the same call would have cost on the quality model; an
+            # escalation retry is pure overhead, so it has no baseline
+            model["quality_cost_usd"] += 0.0 if escalated else baseline
+            
+            decision.model_calls += 1
+            decision.input_tokens += input_tokens
+            decision.output_tokens += output_tokens
+            decision.model_latency_ms += latency_ms
+        
+        if self.log_decisions:
+            print(json.dumps({"routing": {
+                **decision.to_dict(),
+                "called_model_id": model_id,
+                "escalated": escalated,
+                "salvage": salvage,
+                "latency_ms": round(latency_ms, 1),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": round(cost, 6)
+            }}))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return per-model latency/cost counters and estimated savings"""
+        with self._lock:
+            models = {name: dict(values) for name, values in self._stats["models"].items()}
+            stats = {
+                "enabled": self.enabled,
+                "requests": self._stats["requests"],
+                "escalations": self._stats["escalations"],
+                "salvages": self._stats["salvages"],
+                "tiers": dict(self._stats["tiers"])
+            }
+        
+        for values in models.values():
+            values["avg_latency_ms"] = round(values["latency_ms"] / values["calls"], 1)
+            values["latency_ms"] = round(values["latency_ms"], 1)
+        cost = sum(values["cost_usd"] for values in models.values())
+        baseline = sum(values.pop("quality_cost_usd") for values in models.values())
+        for values in models.values():
+            values["cost_usd"] = round(values["cost_usd"], 6)
+        
+        stats["models"] = models
+        stats["estimated_cost_usd"] = round(cost, 6)
+        stats["estimated_savings_usd"] = round(baseline - cost, 6)
+        return stats
+    
+    def _tier(self, tier: Optional[str]) -> str:
+        """The requested tier, or the default when it is missing or unknown"""
+        if tier not in TIERS:
+            if tier is not None:
+                print(f"Warning: unknown tier '{tier}', using '{self.default_tier}'")
+            tier = self.default_tier
+        return tier
+    
+    def _decision(self, model_id: str, tier: str, reason: str) -> RoutingDecision:
+        escalation = None
+        if self.escalate and model_id != self.quality_model_id:
+            escalation = self.quality_model_id
+        return RoutingDecision(model_id, tier, reason, escalation)
+
+
+def _cost(model_id: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of one call"""
+    family = "haiku" if "haiku" in model_id else "sonnet"
+    input_price, output_price = MODEL_PRICES[family]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
@@ -0,0 +1,194 @@
+"""
+In-process exact vector index built on NumPy.
+Keeps normalized embeddings in one contiguous float32 matrix and persists
+them to an .npy file that can be memory-mapped on load.
+"""
+import os
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine-similarity index.
+    
+    Vectors are L2-normalized on insert, so a search is a single matrix
+    product followed by argpartition for the top-k. Rows are stored in a
+    preallocated matrix that grows geometrically, keeping appends cheap.
+    """
+    
+    def __init__(self, dimension: int, path: Optional[str] = None):
+        self.dimension = dimension
+        self.path = path
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._id_positions: Dict[str, int] = {}
+        
+        if path and os.path.exists(self._matrix_path):
+            self.load()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """View of the stored (normalized) embeddings"""
+        return self._matrix[:self._size]
+    
+    def contains(self, doc_id: str) -> bool:
+        return doc_id in self._id_positions
+    
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Add documents; ids that are already present are skipped
+        
+        Returns:
+            Number of documents actually added
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        new_rows = [
+            i for i, doc_id in enumerate(ids)
+            if doc_id not in self._id_positions
+        ]
+        # Drop duplicates within the same call as well
+        seen = set()
+        rows = []
+        for i in new_rows:
+            if ids[i] not in seen:
+                seen.add(ids[i])
+                rows.append(i)
+        if not rows:
+            return 0
+        
+        vectors = self._normalize(np.asarray([embeddings[i] for i in rows], dtype=np.float32))
+        self._reserve(self._size + len(rows))
+        self._matrix[self._size:self._size + len(rows)] = vectors
+        
+        for i in rows:
+            self._id_positions[ids[i]] = len(self.ids)
+            self.ids.append(ids[i])
+            self.documents.append(documents[i])
+            self.metadatas.append(metadatas[i])
+        self._size += len(rows)
+        return len(rows)
+    
+    def search(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> List[List[int]]:
+        """
+        Find the nearest stored rows for each query
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            rows: Optional candidate row positions (e.g. from a metadata
+                prefilter); only these rows are scored
+        
+        Returns:
+            Row positions of the best matches for each query, best first
+        """
+        if self._size == 0 or len(query_embeddings) == 0:
+            return [[] for _ in query_embeddings]
+        
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        candidates_count = matrix.shape[0]
+        if candidates_count == 0:
+            return [[] for _ in query_embeddings]
+        
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        scores = queries @ matrix.T
+        k = min(top_k, candidates_count)
+        
+        if k < candidates_count:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(candidates_count), (len(queries), 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        best = np.take_along_axis(candidates, order, axis=1)
+        if rows is not None:
+            best = rows[best]
+        return best.tolist()
+    
+    def positions(self, ids: Iterable[str]) -> np.ndarray:
+        """Sorted row positions of the given ids (unknown ids are ignored)"""
+        return np.sort(np.fromiter(
+            (self._id_positions[i] for i in ids if i in self._id_positions),
+            dtype=np.int64
+        ))
+    
+    def save(self) -> None:
+        """Persist the index next to self.path (matrix as .npy, documents as JSON)"""
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        
+        # Write to temporary files and swap them in, so a memory-mapped copy
+        # of the previous matrix is never truncated underneath a reader.
+        matrix_tmp = self._matrix_path + ".tmp.npy"
+        np.save(matrix_tmp, np.ascontiguousarray(self.embeddings))
+        os.replace(matrix_tmp, self._matrix_path)
+        
+        documents_tmp = self._documents_path + ".tmp"
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas
+            }, f)
+        os.replace(documents_tmp, self._documents_path)
+    
+    def load(self) -> None:
+        """Load a persisted index, memory-mapping the embedding matrix"""
+        matrix = np.load(self._matrix_path, mmap_mode="r")
+        with open(self._documents_path, encoding="utf-8") as f:
+            data = json.load(f)
+        
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Index at {self.path} has dimension {matrix.shape[1]}, expected {self.dimension}"
+            )
+        
+        self._matrix = matrix
+        self._size = matrix.shape[0]
+        self.ids = data["ids"]
+        self.documents = data["documents"]
+        self.metadatas = data.get("metadatas") or [{} for _ in self.ids]
+        self._id_positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+    
+    def _reserve(self, rows: int) -> None:
+        """Make room for at least `rows` rows, copying out of a memory map if needed"""
+        if rows <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        capacity = max(rows, 2 * self._matrix.shape[0], 64)
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.path, "embeddings.npy")
+    
+    @property
+    def _documents_path(self) -> str:
+        return os.path.join(self.path, "documents.json")
@@ -0,0 +1,238 @@
+"""
+Minimal OpenSearch k-NN client for the vector store.
+Talks to Amazon OpenSearch Serverless (SigV4-signed) or any
+OpenSearch-compatible endpoint over a pooled keep-alive HTTP session.
+"""
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Metadata fields mapped as keywords so they can be used in filters
+FILTER_FIELDS = ("language", "content_type", "tenant")
+
+
+class OpenSearchError(Exception):
+    """Raised when OpenSearch rejects a request"""
+
+
+class OpenSearchVectorClient:
+    """k-NN index operations over a pooled HTTP session"""
+    
+    def __init__(
+        self,
+        endpoint: str,
+        index_name: str,
+        dimension: int,
+        region: str,
+        auth: str = "sigv4",
+        pool_size: int = 10,
+        bulk_size: int = 500,
+        timeout: float = 10.0
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        if not self.endpoint.startswith("http"):
+            self.endpoint = f"https://{self.endpoint}"
+        self.index_name = index_name
+        self.dimension = dimension
+        self.region = region
+        self.bulk_size = bulk_size
+        self.timeout = timeout
+        
+        # One session reuses TCP/TLS connections across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self._credentials = None
+        if auth == "sigv4":
+            import boto3
+            self._credentials = boto3.Session().get_credentials()
+    
+    def ensure_index(self) -> None:
+        """Create the k-NN index if it does not exist yet"""
+        response = self._request("HEAD", f"/{self.index_name}", allow_status=(404,))
+        if response.status_code != 404:
+            return
+        
+        self._request("PUT", f"/{self.index_name}", body={
+            "settings": {"index": {"knn": True}},
+            "mappings": {
+                "properties": {
+                    "embedding": {
+                        "type": "knn_vector",
+                        "dimension": self.dimension,
+                        "method": {"name": "hnsw", "engine": "faiss", "space_type": "l2"}
+                    },
+                    "text": {"type": "text"},
+                    "doc_id": {"type": "keyword"},
+                    # Metadata fields used in search filters
+                    **{field: {"type": "keyword"} for field in FILTER_FIELDS}
+                }
+            }
+        })
+    
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        """Return which of the given document ids are already indexed"""
+        if not ids:
+            return set()
+        payload = self._request(
+            "POST",
+            f"/{self.index_name}/_mget",
+            body={"ids": list(ids), "_source": False}
+        ).json()
+        return {doc["_id"] for doc in payload.get("docs", []) if doc.get("found")}
+    
+    def hybrid_search(
+        self,
+        query_embeddings: List[List[float]],
+        queries: List[str],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+        lexical: bool = True
+    ) -> List[Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]]:
+        """
+        Run filtered k-NN and BM25 queries; all of them go out in one _msearch
+        
+        The metadata filter is applied inside the k-NN query (efficient
+        filtering), so top_k hits are returned even when the filter is
+        selective. A document without a filtered field matches every value.
+        
+        Args:
+            query_embeddings: Query vectors
+            queries: Query texts, used for the BM25 match
+            top_k: Number of hits per retriever
+            filters: Field -> value (or list of accepted values)
+            lexical: Also run the BM25 query
+        
+        Returns:
+            (vector hits, lexical hits) for each query, each a list of
+            (doc id, text) pairs, best first
+        """
+        if not queries:
+            return []
+        
+        filter_clauses = _filter_clauses(filters)
+        lines = []
+        for vector, query in zip(query_embeddings, queries):
+            knn = {"vector": list(vector), "k": top_k}
+            if filter_clauses:
+                knn["filter"] = {"bool": {"filter": filter_clauses}}
+            lines.append({"index": self.index_name})
+            lines.append({"size": top_k, "_source": ["text"], "query": {"knn": {"embedding": knn}}})
+            if lexical:
+                lines.append({"index": self.index_name})
+                lines.append({
+                    "size": top_k,
+                    "_source": ["text"],
+                    "query": {"bool": {"must": [{"match": {"text": query}}], "filter": filter_clauses}}
+                })
+        
+        hit_lists = []
+        for response in self._request("POST", "/_msearch", ndjson=lines).json().get("responses", []):
+            if "error" in response:
+                raise OpenSearchError(f"Search failed: {response['error']}")
+            hits = response.get("hits", {}).get("hits", [])
+            hit_lists.append([(hit["_id"], hit["_source"]["text"]) for hit in hits])
+        
+        if lexical:
+            return list(zip(hit_lists[0::2], hit_lists[1::2]))
+        return [(hits, []) for hits in hit_lists]
+    
+    def bulk_index(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Index documents through the _bulk API in batches of bulk_size
+        
+        Returns:
+            Number of documents indexed
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        indexed = 0
+        for start in range(0, len(ids), self.bulk_size):
+            lines = []
+            for doc_id, vector, text, metadata in zip(
+                ids[start:start + self.bulk_size],
+                embeddings[start:start + self.bulk_size],
+                documents[start:start + self.bulk_size],
+                metadatas[start:start + self.bulk_size]
+            ):
+                lines.append({"index": {"_index": self.index_name, "_id": doc_id}})
+                lines.append({**metadata, "doc_id": doc_id, "text": text, "embedding": list(vector)})
+            
+            payload = self._request("POST", "/_bulk", ndjson=lines).json()
+            if payload.get("errors"):
+                failed = [
+                    item for item in payload.get("items", [])
+                    if next(iter(item.values())).get("error")
+                ]
+                raise OpenSearchError(f"{len(failed)} bulk item(s) failed: {failed[:3]}")
+            indexed += len(lines) // 2
+        return indexed
+    
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        ndjson: Optional[List[Dict[str, Any]]] = None,
+        allow_status: tuple = ()
+    ) -> requests.Response:
+        """Send a (signed) request and raise OpenSearchError on failure"""
+        headers = {}
+        data = b""
+        if ndjson is not None:
+            data = ("\n".join(json.dumps(line) for line in ndjson) + "\n").encode("utf-8")
+            headers["Content-Type"] = "application/x-ndjson"
+        elif body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        
+        url = self.endpoint + path
+        if self._credentials is not None:
+            headers = self._sign(method, url, data, headers)
+        
+        response = self.session.request(
+            method, url, data=data or None, headers=headers, timeout=self.timeout
+        )
+        if response.status_code >= 400 and response.status_code not in allow_status:
+            raise OpenSearchError(
+                f"{method} {path} failed with {response.status_code}: {response.text[:500]}"
+            )
+        return response
+    
+    def _sign(self, method: str, url: str, data: bytes, headers: Dict[str, str]) -> Dict[str, str]:
+        """Add SigV4 headers for OpenSearch Serverless"""
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+        
+        headers = {**headers, "x-amz-content-sha256": hashlib.sha256(data).hexdigest()}
+        request = AWSRequest(method=method, url=url, data=data, headers=headers)
+        SigV4Auth(self._credentials.get_frozen_credentials(), "aoss", self.region).add_auth(request)
+        return dict(request.headers)
+
+
+def _filter_clauses(filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bool filter clauses for metadata filters; a missing field matches any value"""
+    clauses = []
+    for field, accepted in (filters or {}).items():
+        if accepted is None:
+            continue
+        values = list(accepted) if isinstance(accepted, (list, tuple, set)) else [accepted]
+        clauses.append({"bool": {
+            "should": [
+                {"terms": {field: values}},
+                {"bool": {"must_not": [{"exists": {"field": field}}]}}
+            ],
+            "minimum_should_match": 1
+        }})
+    return clauses
@@ -0,0 +1,219 @@
+"""
+Mock OpenSearch server for local development.
+Implements the subset of the REST API the vector store uses (index
+creation, _bulk, _mget, _msearch/_search k-NN and bool/match queries)
+with exact brute-force search, so the OpenSearch backend can run without
+AWS.
+
+Usage:
+    python opensearch_mock.py --port 9200
+    OPENSEARCH_ENDPOINT=http://localhost:9200 OPENSEARCH_AUTH=none VECTOR_DB_TYPE=opensearch ...
+"""
+import re
+import json
+import math
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _MockIndexes:
+    """In-memory documents grouped by index name"""
+    
+    def __init__(self):
+        self.indexes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+    
+    def knn(
+        self,
+        index: str,
+        vector: List[float],
+        k: int,
+        query_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        with self.lock:
+            documents = list(self.indexes.get(index, {}).items())
+        scored = []
+        for doc_id, source in documents:
+            if query_filter and not _matches(query_filter, source):
+                continue
+            distance = math.sqrt(sum((a - b) ** 2 for a, b in zip(vector, source["embedding"])))
+            scored.append((distance, doc_id, source))
+        scored.sort(key=lambda item: item[0])
+        return [
+            {"_id": doc_id, "_score": 1 / (1 + distance), "_source": source}
+            for distance, doc_id, source in scored[:k]
+        ]
+    
+    def query(self, index: str, query: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+        """Evaluate a bool/match query, scoring by matched term count"""
+        with self.lock:
+            documents = list(self.indexes.get(index, {}).items())
+        scored = []
+        for doc_id, source in documents:
+            score = _score(query, source)
+            if score > 0:
+                scored.append((score, doc_id, source))
+        scored.sort(key=lambda item: -item[0])
+        return [
+            {"_id": doc_id, "_score": score, "_source": source}
+            for score, doc_id, source in scored[:size]
+        ]
+
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _score(query: Dict[str, Any], source: Dict[str, Any]) -> float:
+    """Relevance of a document for a query; 0 means no match"""
+    if "match" in query:
+        field, text = next(iter(query["match"].items()))
+        document_terms = _terms(source.get(field, ""))
+        return float(sum(document_terms.count(term) for term in set(_terms(text))))
+    if "bool" in query:
+        clauses = query["bool"]
+        if not all(_matches(clause, source) for clause in clauses.get("filter", [])):
+            return 0.0
+        must = [_score(clause, source) for clause in clauses.get("must", [])]
+        if any(score == 0 for score in must):
+            return 0.0
+        return sum(must) or 1.0
+    return 1.0 if _matches(query, source) else 0.0
+
+
+def _matches(query: Dict[str, Any], source: Dict[str, Any]) -> bool:
+    """Evaluate the filter subset of the query DSL (bool, terms, term, exists)"""
+    if "bool" in query:
+        clauses = query["bool"]
+        if not all(_matches(c, source) for c in clauses.get("filter", []) + clauses.get("must", [])):
+            return False
+        if any(_matches(c, source) for c in clauses.get("must_not", [])):
+            return False
+        should = clauses.get("should", [])
+        if should:
+            required = clauses.get("minimum_should_match", 1)
+            return sum(_matches(c, source) for c in should) >= required
+        return True
+    if "terms" in query:
+        field, values = next(iter(query["terms"].items()))
+        return source.get(field) in values
+    if "term" in query:
+        field, value = next(iter(query["term"].items()))
+        return source.get(field) == value
+    if "exists" in query:
+        return source.get(query["exists"]["field"]) is not None
+    if "match" in query:
+        return _score(query, source) > 0
+    return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: _MockIndexes
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+    
+    def do_HEAD(self) -> None:
+        index = self.path.strip("/")
+        self._send(200 if index in self.store.indexes else 404, None)
+    
+    def do_PUT(self) -> None:
+        index = self.path.strip("/")
+        self._read_body()
+        with self.store.lock:
+            self.store.indexes.setdefault(index, {})
+        self._send(200, {"acknowledged": True, "index": index})
+    
+    def do_POST(self) -> None:
+        parts = self.path.split("?")[0].strip("/").split("/")
+        body = self._read_body()
+        
+        if parts[-1] == "_bulk":
+            self._send(200, self._bulk(body))
+        elif parts[-1] == "_msearch":
+            lines = self._ndjson(body)
+            responses = [
+                self._search(header.get("index", parts[0]), query)
+                for header, query in zip(lines[0::2], lines[1::2])
+            ]
+            self._send(200, {"responses": responses})
+        elif len(parts) == 2 and parts[1] == "_mget":
+            index = self.store.indexes.get(parts[0], {})
+            ids = json.loads(body or b"{}").get("ids", [])
+            self._send(200, {"docs": [{"_id": i, "found": i in index} for i in ids]})
+        elif len(parts) == 2 and parts[1] == "_search":
+            self._send(200, self._search(parts[0], json.loads(body or b"{}")))
+        else:
+            self._send(404, {"error": "not found"})
+    
+    def _bulk(self, body: bytes) -> Dict[str, Any]:
+        lines = self._ndjson(body)
+        items = []
+        with self.store.lock:
+            for action, source in zip(lines[0::2], lines[1::2]):
+                meta = action.get("index") or action.get("create") or {}
+                index = self.store.indexes.setdefault(meta["_index"], {})
+                doc_id = meta.get("_id") or str(len(index))
+                index[doc_id] = source
+                items.append({"index": {"_id": doc_id, "status": 201}})
+        return {"errors": False, "items": items}
+    
+    def _search(self, index: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        if index not in self.store.indexes:
+            return {"error": {"type": "index_not_found_exception", "index": index}, "status": 404}
+        body = query.get("query", {})
+        if "knn" in body:
+            field, params = next(iter(body["knn"].items()))
+            size = min(params["k"], query.get("size", params["k"]))
+            hits = self.store.knn(index, params["vector"], size, params.get("filter"))
+        else:
+            hits = self.store.query(index, body, query.get("size", 10))
+        return {"hits": {"total": {"value": len(hits)}, "hits": hits}}
+    
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+    
+    @staticmethod
+    def _ndjson(body: bytes) -> List[Dict[str, Any]]:
+        return [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+    
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+
+def start_opensearch_mock(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the mock server on a background thread
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+    
+    Returns:
+        The running server and its base URL
+    """
+    handler = type("OpenSearchMockHandler", (_Handler,), {"store": _MockIndexes()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenSearch k-NN server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+    
+    handler = type("OpenSearchMockHandler", (_Handler,), {"store": _MockIndexes()})
+    print(f"Mock OpenSearch listening on http://{args.host}:{args.port}")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
@@ -0,0 +1,397 @@
+"""
+Prompt templates for content generation.
+Each content type has a static prefix (role, output schema, STANDs rules)
+that is byte-identical across requests, so it can be sent as a cacheable
+system block, and a small dynamic part that is filled in per request under
+an input-token budget. Multi-language requests translate generated
+sections with a separate, much smaller prompt.
+"""
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Bump whenever template text changes in a way that affects output, so
+# cached responses produced by the old prompts are no longer served.
+TEMPLATE_VERSION = "2"
+
+# Rough characters-per-token ratio for English prose; only used to keep
+# prompts inside a budget, never for billing.
+CHARS_PER_TOKEN = 4
+
+# Output sections and the example value shown to the model for each
+SECTION_SCHEMA: Dict[str, Any] = {
+    "hero_section": "A compelling hero message (2-3 sentences)",
+    "features": ["Feature 1", "Feature 2", "Feature 3", "Feature 4"],
+    "benefits": ["Benefit 1", "Benefit 2", "Benefit 3"],
+    "seo_meta": {
+        "title": "SEO optimized title (60 chars max)",
+        "description": "SEO meta description (160 chars max)",
+        "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+    },
+    "cta": "Clear call-to-action message",
+    "faqs": [
+        {"question": "Question 1", "answer": "Answer 1"},
+        {"question": "Question 2", "answer": "Answer 2"},
+        {"question": "Question 3", "answer": "Answer 3"}
+    ]
+}
+
+# Sections generated together in parallel-sections mode. Each group is one
+# model call; groups are balanced so no single call dominates latency.
+SECTION_GROUPS = (
+    ("hero_section", "cta"),
+    ("features", "benefits"),
+    ("seo_meta",),
+    ("faqs",)
+)
+
+# Relative output size of each section, used to split max_tokens between
+# section prompts
+SECTION_WEIGHTS = {
+    "hero_section": 2,
+    "features": 2,
+    "benefits": 2,
+    "seo_meta": 2,
+    "cta": 1,
+    "faqs": 4
+}
+
+# Floor for a section prompt's max_tokens, so short sections are not cut off
+MIN_SECTION_MAX_TOKENS = 256
+
+NO_CONTEXT = "No specific context available."
+
+# Static prefix of the translation prompt used for multi-language requests;
+# like the template prefixes it is identical across requests and cacheable
+TRANSLATION_PREFIX = """You are a professional translator of web content.
+
+Translate every string value of the JSON document in the user message into the requested language:
+- Keep the keys, nesting, list lengths and order exactly as they are
+- Keep product and brand names as they are
+- Keep the tone of the original
+- Write SEO keywords the way people search for them in that language
+
+Return ONLY valid JSON, no additional text."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a piece of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fit_context(context: List[str], budget_tokens: int) -> List[str]:
+    """
+    Keep as much retrieved context as fits in a token budget
+    
+    Snippets are taken in rank order; the first snippet that does not fit
+    is truncated on a word boundary and the rest are dropped.
+    
+    Args:
+        context: Retrieved snippets, best first
+        budget_tokens: Tokens available for the context block
+    
+    Returns:
+        The snippets that fit
+    """
+    kept = []
+    remaining = budget_tokens
+    for snippet in context:
+        # Each snippet is rendered as "- snippet\n"
+        cost = estimate_tokens(snippet) + 1
+        if cost <= remaining:
+            kept.append(snippet)
+            remaining -= cost
+            continue
+        
+        max_chars = (remaining - 1) * CHARS_PER_TOKEN
+        if max_chars > 0:
+            cut = snippet.rfind(" ", 0, max_chars)
+            truncated = snippet[:cut if cut > 0 else max_chars].rstrip()
+            if truncated:
+                kept.append(truncated + " ...")
+        break
+    return kept
+
+
+def schema_errors(content: Dict[str, Any], sections: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Check generated content against the output schema
+    
+    Only the shape is checked: every section must be present and match its
+    example value in the schema recursively. Strings must be non-empty,
+    lists non-empty with items shaped like the first example item, and
+    objects must have every key of the example object.
+    
+    Returns:
+        Human-readable problems; empty when the content is valid
+    """
+    errors = []
+    for name, example in (sections or SECTION_SCHEMA).items():
+        if name not in content:
+            errors.append(f"missing section '{name}'")
+            continue
+        problem = _shape_error(content[name], example)
+        if problem:
+            errors.append(f"section '{name}' {problem}")
+    return errors
+
+
+def _shape_error(value: Any, example: Any) -> Optional[str]:
+    """Describe how `value` differs in shape from `example`, or None"""
+    if not isinstance(value, type(example)):
+        return f"should be {type(example).__name__}"
+    if isinstance(example, str):
+        return None if value.strip() else "is empty"
+    if isinstance(example, list):
+        if not value:
+            return "is empty"
+        for item in value:
+            problem = _shape_error(item, example[0])
+            if problem:
+                return f"item {problem}"
+        return None
+    if isinstance(example, dict):
+        for key, child in example.items():
+            if key not in value:
+                return f"is missing '{key}'"
+            problem = _shape_error(value[key], child)
+            if problem:
+                return f"'{key}' {problem}"
+    return None
+
+
+class RenderedPrompt:
+    """A prompt ready to send: cacheable system prefix plus per-request user message"""
+    
+    def __init__(
+        self,
+        system: str,
+        user: str,
+        max_tokens: int,
+        context_used: int,
+        context_dropped: int
+    ):
+        self.system = system
+        self.user = user
+        self.max_tokens = max_tokens
+        self.context_used = context_used
+        self.context_dropped = context_dropped
+    
+    @property
+    def text(self) -> str:
+        """The whole prompt as one string (for models without a system field)"""
+        return f"{self.system}\n\n{self.user}"
+    
+    @property
+    def input_tokens(self) -> int:
+        return estimate_tokens(self.system) + estimate_tokens(self.user)
+
+
+class PromptTemplate:
+    """Prompt for one content type"""
+    
+    def __init__(
+        self,
+        content_type: str,
+        role: str,
+        guidance: List[str],
+        max_tokens: int,
+        sections: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            content_type: Content type the template is used for
+            role: Opening line describing the writer
+            guidance: Content-type specific writing rules
+            max_tokens: Output token limit for this content type
+            sections: Output schema (defaults to SECTION_SCHEMA)
+        """
+        self.content_type = content_type
+        self.role = role
+        self.guidance = guidance
+        self.max_tokens = max_tokens
+        self.sections = sections or SECTION_SCHEMA
+        self._section_templates: Dict[Tuple[str, ...], "PromptTemplate"] = {}
+        
+        schema = json.dumps(self.sections, indent=2)
+        rules = "".join(f"\n- {rule}" for rule in guidance)
+        # Nothing request-specific may go in here, or the prefix stops
+        # being cacheable
+        self.static_prefix = f"""{role}
+
+Generate the following sections in JSON format:
+
+{schema}
+
+Ensure all content:
+- Aligns with STANDs framework (Secure, Trusted, Aligned, Neutral, Defendable, Sustainable)
+- Is engaging and conversion-focused
+- Maintains the specified tone
+- Is written in the requested language
+- Is original and compelling{rules}
+
+Return ONLY valid JSON, no additional text."""
+        self.static_tokens = estimate_tokens(self.static_prefix)
+    
+    def for_sections(self, names: Tuple[str, ...]) -> "PromptTemplate":
+        """
+        Template that asks for only some of this template's sections
+        
+        Derived templates are built once and reused, so their static
+        prefixes stay cacheable. Their max_tokens is this template's share
+        for those sections (by SECTION_WEIGHTS), with headroom.
+        
+        Args:
+            names: Section names, in output order
+        """
+        template = self._section_templates.get(names)
+        if template is None:
+            weight = sum(SECTION_WEIGHTS.get(name, 1) for name in names)
+            total = sum(SECTION_WEIGHTS.get(name, 1) for name in self.sections)
+            template = PromptTemplate(
+                self.content_type,
+                self.role,
+                self.guidance,
+                max_tokens=max(MIN_SECTION_MAX_TOKENS, math.ceil(1.5 * self.max_tokens * weight / total)),
+                sections={name: self.sections[name] for name in names}
+            )
+            # Benign race: two threads may build the same template once
+            self._section_templates[names] = template
+        return template
+    
+    def render(
+        self,
+        title: str,
+        description: str,
+        tone: str,
+        language: str,
+        content_type: str,
+        context: List[str],
+        input_token_budget: int,
+        notes: Optional[str] = None
+    ) -> RenderedPrompt:
+        """
+        Fill in the dynamic part of the prompt
+        
+        Args:
+            title: Page title
+            description: Product/service description
+            tone: Content tone
+            language: Language code
+            content_type: Requested content type (may differ from
+                self.content_type for the default template)
+            context: Retrieved context, best first
+            input_token_budget: Maximum estimated input tokens for the whole
+                prompt; retrieved context is trimmed to stay under it
+            notes: Extra request-specific instructions appended to the
+                user message
+        
+        Returns:
+            The rendered prompt
+        """
+        def user_message(context_text: str) -> str:
+            return f"""Task: Generate comprehensive, engaging content for a {content_type} about: {title}
+
+Product/Service Description:
+{description}
+
+Relevant Context from Knowledge Base:
+{context_text}
+
+Requirements:
+1. Tone: {tone}
+2. Language: {language}
+3. Content Type: {content_type}
+""" + (f"\n{notes}\n" if notes else "")
+        
+        fixed_tokens = self.static_tokens + estimate_tokens(user_message(""))
+        kept = fit_context(context, input_token_budget - fixed_tokens)
+        context_text = "\n".join(f"- {c}" for c in kept) if kept else NO_CONTEXT
+        
+        return RenderedPrompt(
+            system=self.static_prefix,
+            user=user_message(context_text),
+            max_tokens=self.max_tokens,
+            context_used=len(kept),
+            context_dropped=len(context) - len(kept)
+        )
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {
+    "landing_page": PromptTemplate(
+        "landing_page",
+        "You are an expert content creator specializing in landing page creation.",
+        [
+            "Leads with the single strongest value proposition",
+            "Keeps every section scannable and short"
+        ],
+        max_tokens=2000
+    ),
+    "product_page": PromptTemplate(
+        "product_page",
+        "You are an expert content creator specializing in product page creation.",
+        [
+            "Makes features concrete and specific to the product",
+            "Answers buying objections in the FAQs"
+        ],
+        max_tokens=1500
+    ),
+    "blog_post": PromptTemplate(
+        "blog_post",
+        "You are an expert content creator specializing in blog post creation.",
+        [
+            "Uses the hero section as an engaging introduction",
+            "Prefers informative, educational phrasing over sales language"
+        ],
+        max_tokens=3000
+    ),
+    "about_page": PromptTemplate(
+        "about_page",
+        "You are an expert content creator specializing in about page creation.",
+        [
+            "Tells the company story and mission in the hero section",
+            "Frames features and benefits around values and credibility"
+        ],
+        max_tokens=1500
+    ),
+}
+
+# Used for content types without their own template; its prefix does not
+# name the content type, so it is shared (and cached) across all of them
+DEFAULT_TEMPLATE = PromptTemplate(
+    "default",
+    "You are an expert content creator specializing in web content creation.",
+    [],
+    max_tokens=2000
+)
+
+
+def get_template(content_type: str) -> PromptTemplate:
+    """Look up the template for a content type, falling back to DEFAULT_TEMPLATE"""
+    return TEMPLATES.get(content_type, DEFAULT_TEMPLATE)
+
+
+def render_translation(sections: Dict[str, Any], language: str) -> RenderedPrompt:
+    """
+    Prompt that translates already generated sections into another language
+    
+    It carries no retrieved context or writing rules, only the sections, so
+    it is a fraction of the size of a generation prompt.
+    
+    Args:
+        sections: Content sections to translate (without renderings)
+        language: Target language code
+    
+    Returns:
+        The rendered prompt; max_tokens leaves room for languages that
+        take more tokens than the source
+    """
+    document = json.dumps(sections, ensure_ascii=False, indent=2)
+    return RenderedPrompt(
+        system=TRANSLATION_PREFIX,
+        user=f"Target language: {language}\n\nContent:\n{document}",
+        max_tokens=max(MIN_SECTION_MAX_TOKENS, 2 * estimate_tokens(document)),
+        context_used=0,
+        context_dropped=0
+    )
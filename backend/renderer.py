@@ -0,0 +1,306 @@
+"""
+Rendering of generated content into output formats.
+Page templates are compiled once at import and escape every value coming
+from the model. Only the formats a request asks for are rendered, and
+response bodies can be gzip/brotli compressed.
+"""
+import os
+import gzip
+import html
+import json
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are gzip-compressed only
+    brotli = None
+
+
+FORMATS = ("html", "markdown", "jsonld")
+
+# Response key holding each format's output
+FORMAT_KEYS = {
+    "html": "html_content",
+    "markdown": "markdown_content",
+    "jsonld": "jsonld_content"
+}
+
+# Formats rendered when a request does not say; HTML and Markdown keep the
+# response shape existing clients expect
+DEFAULT_FORMATS = tuple(
+    f.strip() for f in os.getenv("DEFAULT_RENDER_FORMATS", "html,markdown").split(",") if f.strip()
+)
+
+# brotli quality 11 is meant for static assets; 4 compresses about as well
+# as gzip -6 at a fraction of the CPU cost
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+
+class Markup(str):
+    """Already-escaped HTML, inserted into templates verbatim"""
+
+
+class CompiledTemplate:
+    """
+    A ``str.format``-style template parsed once into literal and field parts.
+    
+    Rendering is a single join with no parsing. With an ``escape`` function,
+    every value except Markup is escaped before it is inserted.
+    """
+    
+    def __init__(self, source: str, escape: Optional[Callable[[str], str]] = None):
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(source)]
+        self._escape = escape
+    
+    def render(self, **values: Any) -> str:
+        out = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                value = str(values[field])
+                if self._escape is not None and not isinstance(values[field], Markup):
+                    value = self._escape(value)
+                out.append(value)
+        return "".join(out)
+
+
+def _escape_html(value: str) -> str:
+    return html.escape(value, quote=True)
+
+
+_HTML_PAGE = CompiledTemplate("""<!DOCTYPE html>
+<html lang="{lang}">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{page_title}</title>
+    <meta name="description" content="{meta_description}">
+    <meta name="keywords" content="{keywords}">{jsonld_script}
+</head>
+<body>
+    <header>
+        <h1>{title}</h1>
+    </header>
+    <main>
+        <section class="hero">
+            <p>{hero}</p>
+        </section>
+        <section class="features">
+            <h2>Features</h2>
+            <ul>{features}</ul>
+        </section>
+        <section class="benefits">
+            <h2>Benefits</h2>
+            <ul>{benefits}</ul>
+        </section>
+        <section class="cta">
+            <button>{cta}</button>
+        </section>
+        <section class="faqs">
+            <h2>Frequently Asked Questions</h2>
+            {faqs}
+        </section>
+    </main>
+</body>
+</html>""", escape=_escape_html)
+
+_HTML_ITEM = CompiledTemplate("<li>{text}</li>", escape=_escape_html)
+_HTML_FAQ = CompiledTemplate(
+    '<div class="faq"><h3>{question}</h3><p>{answer}</p></div>',
+    escape=_escape_html
+)
+_HTML_JSONLD = CompiledTemplate('\n    <script type="application/ld+json">{data}</script>')
+
+_MARKDOWN_PAGE = CompiledTemplate("""# {title}
+
+{hero}
+
+## Features
+
+{features}
+
+## Benefits
+
+{benefits}
+
+## Call to Action
+
+{cta}
+
+## Frequently Asked Questions
+
+{faqs}
+""")
+
+_MARKDOWN_ITEM = CompiledTemplate("- {text}")
+_MARKDOWN_FAQ = CompiledTemplate("### {question}\n\n{answer}\n")
+
+
+def resolve_formats(formats: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Validate a request's ``formats`` option
+    
+    Args:
+        formats: Requested formats; None means DEFAULT_FORMATS and an empty
+            list means sections only
+    
+    Returns:
+        The formats, deduplicated in request order
+    
+    Raises:
+        ValueError: If a format is unknown
+    """
+    if formats is None:
+        return DEFAULT_FORMATS
+    resolved = tuple(dict.fromkeys(formats))
+    unknown = [f for f in resolved if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown formats {unknown}; expected some of {list(FORMATS)}")
+    return resolved
+
+
+def strip_rendered(content: Dict[str, Any]) -> Dict[str, Any]:
+    """Content sections without any rendered output"""
+    rendered = FORMAT_KEYS.values()
+    return content.__class__({k: v for k, v in content.items() if k not in rendered})
+
+
+def render_content(
+    content: Dict[str, Any],
+    title: str,
+    language: str = "en",
+    formats: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
+    """
+    Add the requested renderings to content sections
+    
+    Args:
+        content: Content sections (rendered keys already present are replaced)
+        title: Page title
+        language: Language code, used for the HTML ``lang`` attribute
+        formats: Formats to render (see resolve_formats)
+    
+    Returns:
+        A new dict of the same type with the sections plus one key per
+        format (``html_content``, ``markdown_content``, ``jsonld_content``)
+    """
+    result = strip_rendered(content)
+    sections = dict(result)
+    for fmt in resolve_formats(formats):
+        result[FORMAT_KEYS[fmt]] = _RENDERERS[fmt](sections, title, language)
+    return result
+
+
+def render_html(content: Dict[str, Any], title: str, language: str = "en") -> str:
+    """Render a standalone HTML page with escaped values and FAQ JSON-LD"""
+    seo_meta = content.get("seo_meta", {})
+    faqs = _faqs(content)
+    jsonld_script = ""
+    if faqs:
+        # "<" is escaped so no value can close the script element
+        data = json.dumps(render_jsonld(content, title, language), ensure_ascii=False)
+        jsonld_script = _HTML_JSONLD.render(data=data.replace("<", "\\u003c"))
+    
+    return _HTML_PAGE.render(
+        lang=language,
+        page_title=seo_meta.get("title", title),
+        meta_description=seo_meta.get("description", ""),
+        keywords=", ".join(seo_meta.get("keywords", [])),
+        jsonld_script=Markup(jsonld_script),
+        title=title,
+        hero=content.get("hero_section", ""),
+        features=Markup("".join(_HTML_ITEM.render(text=f) for f in content.get("features", []))),
+        benefits=Markup("".join(_HTML_ITEM.render(text=b) for b in content.get("benefits", []))),
+        cta=content.get("cta", "Get Started"),
+        faqs=Markup("".join(_HTML_FAQ.render(question=q, answer=a) for q, a in faqs))
+    )
+
+
+def render_markdown(content: Dict[str, Any], title: str, language: str = "en") -> str:
+    """Render the content as a Markdown document"""
+    return _MARKDOWN_PAGE.render(
+        title=title,
+        hero=content.get("hero_section", ""),
+        features="\n".join(_MARKDOWN_ITEM.render(text=f) for f in content.get("features", [])),
+        benefits="\n".join(_MARKDOWN_ITEM.render(text=b) for b in content.get("benefits", [])),
+        cta=content.get("cta", ""),
+        faqs="\n".join(_MARKDOWN_FAQ.render(question=q, answer=a) for q, a in _faqs(content))
+    )
+
+
+def render_jsonld(content: Dict[str, Any], title: str, language: str = "en") -> Dict[str, Any]:
+    """Build schema.org WebPage (and FAQPage, when there are FAQs) markup"""
+    seo_meta = content.get("seo_meta", {})
+    graph = [{
+        "@type": "WebPage",
+        "name": seo_meta.get("title", title),
+        "description": seo_meta.get("description", ""),
+        "keywords": ", ".join(seo_meta.get("keywords", [])),
+        "inLanguage": language
+    }]
+    faqs = _faqs(content)
+    if faqs:
+        graph.append({
+            "@type": "FAQPage",
+            "inLanguage": language,
+            "mainEntity": [
+                {
+                    "@type": "Question",
+                    "name": question,
+                    "acceptedAnswer": {"@type": "Answer", "text": answer}
+                }
+                for question, answer in faqs
+            ]
+        })
+    return {"@context": "https://schema.org", "@graph": graph}
+
+
+def _faqs(content: Dict[str, Any]) -> list:
+    """(question, answer) pairs, skipping malformed entries"""
+    return [
+        (faq["question"], faq["answer"])
+        for faq in content.get("faqs", [])
+        if isinstance(faq, dict) and "question" in faq and "answer" in faq
+    ]
+
+
+_RENDERERS: Dict[str, Callable[[Dict[str, Any], str, str], Any]] = {
+    "html": render_html,
+    "markdown": render_markdown,
+    "jsonld": render_jsonld
+}
+
+
+def compress_body(body: bytes, accept_encoding: str, min_size: int = 1024) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a response body with the best encoding the client accepts
+    
+    Brotli is preferred when the ``brotli`` package is installed, then gzip.
+    
+    Args:
+        body: Encoded response body
+        accept_encoding: The request's Accept-Encoding header
+        min_size: Bodies smaller than this are sent as is
+    
+    Returns:
+        The (possibly) compressed body and its Content-Encoding, or None
+        when it was left uncompressed
+    """
+    if len(body) < min_size or not accept_encoding:
+        return body, None
+    
+    accepted = set()
+    for entry in accept_encoding.split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted or "*" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
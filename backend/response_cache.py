@@ -0,0 +1,315 @@
+"""
+Two-tier cache for generated content.
+Tier one is an in-process LRU with TTL; tier two is persistent storage
+(DynamoDB metadata table in AWS, SQLite for local development).
+Identical requests that are still being generated are coalesced with
+SingleFlight, which works whether or not caching is enabled.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
+
+
+def normalize_text(value: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join(str(value).split())
+
+
+def make_cache_key(params: Dict[str, Any], model_id: str, template_version: str) -> str:
+    """
+    Build a cache key for a generation request.
+    
+    Args:
+        params: Request parameters (title, description, tone, language, content_type)
+        model_id: Model the content is generated with
+        template_version: Version of the prompt template
+    
+    Returns:
+        Hex digest identifying the request
+    """
+    normalized = {
+        "title": normalize_text(params.get("title", "")),
+        "description": normalize_text(params.get("description", "")),
+        "tone": normalize_text(params.get("tone", "professional")).lower(),
+        "language": normalize_text(params.get("language", "en")).lower(),
+        "content_type": normalize_text(params.get("content_type", "landing_page")).lower(),
+        "model_id": model_id,
+        "template_version": template_version
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+    
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Flight:
+    """One in-progress call and the callers waiting for it"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+    
+    A caller arriving while a call with the same key is running waits for
+    it and receives its result (or exception) instead of starting its own.
+    Nothing is kept once the call finishes; later callers start a new one.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0}
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func() unless an identical call is already in flight
+        
+        Args:
+            key: Identity of the call
+            func: The call; runs on the first caller's thread
+        
+        Returns:
+            The result and whether it was shared from another caller's call
+        
+        Raises:
+            Whatever func() raised, in the first caller and every waiter
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._stats["calls"] += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self._stats["coalesced"] += 1
+                leader = False
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Calls started, calls saved by coalescing and calls in flight"""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+
+class SQLiteCacheStore:
+    """Persistent cache tier backed by a local SQLite file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_seconds)
+            )
+            self._conn.commit()
+
+
+class DynamoDBCacheStore:
+    """Persistent cache tier stored in the content-creator-metadata table"""
+    
+    KEY_PREFIX = "response-cache#"
+    
+    def __init__(self, table_name: str, region: str):
+        import boto3
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={"id": self.KEY_PREFIX + key}).get("Item")
+        # DynamoDB TTL deletes lazily, so expiry is checked here as well
+        if not item or int(item.get("expires_at", 0)) < time.time():
+            return None
+        return json.loads(item["content"])
+    
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        self.table.put_item(Item={
+            "id": self.KEY_PREFIX + key,
+            "content": json.dumps(value),
+            "expires_at": int(time.time() + ttl_seconds)
+        })
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with hit/miss counters.
+    
+    Lookups try the in-process LRU first, then the persistent store; tier-two
+    hits are promoted into tier one. Errors from the persistent store are
+    logged and treated as misses so caching never fails a generation.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[Any] = None,
+        max_size: int = 256,
+        ttl_seconds: float = 3600
+    ):
+        self.memory = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._stats = {"memory_hits": 0, "store_hits": 0, "misses": 0, "writes": 0, "bypassed": 0}
+        self._stats_lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls, use_local_mocks: bool, region: str) -> Optional["ResponseCache"]:
+        """
+        Build the cache described by the RESPONSE_CACHE_* environment variables.
+        
+        Returns:
+            A ResponseCache, or None when caching is disabled
+        """
+        if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        
+        default_backend = "sqlite" if use_local_mocks or not os.getenv("METADATA_TABLE") else "dynamodb"
+        backend = os.getenv("RESPONSE_CACHE_BACKEND", default_backend).lower()
+        
+        store = None
+        try:
+            if backend == "dynamodb":
+                store = DynamoDBCacheStore(os.environ["METADATA_TABLE"], region)
+            elif backend == "sqlite":
+                path = os.getenv(
+                    "RESPONSE_CACHE_PATH",
+                    os.path.join(os.path.dirname(__file__), "response_cache.db")
+                )
+                store = SQLiteCacheStore(path)
+        except Exception as e:
+            print(f"Warning: response cache store initialization failed: {e}")
+        
+        return cls(
+            store=store,
+            max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        )
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception as e:
+                print(f"Response cache read error: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("store_hits")
+                return value
+        
+        self._count("misses")
+        return None
+    
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, value)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, self.ttl_seconds)
+            except Exception as e:
+                print(f"Response cache write error: {e}")
+        self._count("writes")
+    
+    def record_bypass(self) -> None:
+        self._count("bypassed")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit ratio"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["store_hits"] + stats["misses"]
+        stats["hits"] = stats["memory_hits"] + stats["store_hits"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+    
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
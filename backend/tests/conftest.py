@@ -0,0 +1,24 @@
+"""
+Shared test setup: backend modules are flat, so the backend directory goes
+on sys.path, and every test runs against the local mocks.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(autouse=True)
+def local_env(monkeypatch, tmp_path):
+    """Offline configuration with all local state under the test's tmp dir"""
+    monkeypatch.setenv("USE_LOCAL_MOCKS", "true")
+    monkeypatch.setenv("VECTOR_DB_TYPE", "numpy")
+    monkeypatch.setenv("NUMPY_INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setenv("JOB_STORE_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("RESPONSE_CACHE_ENABLED", "false")
+    monkeypatch.setenv("HISTORY_ENABLED", "false")
+    monkeypatch.setenv("MODEL_ROUTING_LOG", "false")
+    monkeypatch.delenv("BEDROCK_ENDPOINT_URL", raising=False)
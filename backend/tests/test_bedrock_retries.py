@@ -0,0 +1,85 @@
+"""Retry, throttling and failover behaviour of BedrockInvoker against the local mock"""
+import json
+import random
+
+import pytest
+
+from bedrock_client import BedrockInvoker, BedrockThrottledError
+from bedrock_mock import BedrockMock, BedrockRuntimeMock
+
+REQUEST = {
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens": 256,
+    "messages": [{"role": "user", "content": "Task: Generate content about: Acme\n"}]
+}
+
+
+def make_invoker(seed, targets=(("local-mock", "local"),), max_retries=10):
+    mock = BedrockMock(seed=seed)
+    return BedrockInvoker(
+        list(targets),
+        lambda region: BedrockRuntimeMock(region, mock),
+        max_retries=max_retries,
+        base_delay=0.0001,
+        max_delay=0.0001
+    )
+
+
+def expected_throttles(seed, rate):
+    """Throttled calls before the first admitted one, for a seeded mock"""
+    rng = random.Random(seed)
+    count = 0
+    while rng.random() < rate:
+        count += 1
+    return count
+
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_throttled_calls_are_retried_until_they_succeed(monkeypatch, seed):
+    monkeypatch.setenv("MOCK_THROTTLE_RATE", "0.6")
+    throttles = expected_throttles(seed, 0.6)
+    invoker = make_invoker(seed)
+    
+    response = invoker.invoke(REQUEST, estimated_tokens=300)
+    
+    assert json.loads(response["content"][0]["text"])
+    assert invoker.stats() == {
+        "calls": 1,
+        "attempts": throttles + 1,
+        "throttled": throttles,
+        "server_errors": 0,
+        "retries": throttles,
+        "failovers": 0,
+        "failures": 0
+    }
+
+
+def test_same_seed_repeats_the_throttle_sequence(monkeypatch):
+    monkeypatch.setenv("MOCK_THROTTLE_RATE", "0.5")
+    first, second = make_invoker(3), make_invoker(3)
+    for _ in range(5):
+        first.invoke(REQUEST, estimated_tokens=300)
+        second.invoke(REQUEST, estimated_tokens=300)
+    assert first.stats() == second.stats()
+
+
+def test_exhausted_retries_raise_throttled_error(monkeypatch):
+    monkeypatch.setenv("MOCK_THROTTLE_MODELS", "local-mock")
+    invoker = make_invoker(1, max_retries=2)
+    
+    with pytest.raises(BedrockThrottledError):
+        invoker.invoke(REQUEST, estimated_tokens=300)
+    assert invoker.stats()["attempts"] == 3
+    assert invoker.stats()["retries"] == 2
+    assert invoker.stats()["failures"] == 1
+
+
+def test_throttled_model_fails_over_to_the_next_target(monkeypatch):
+    monkeypatch.setenv("MOCK_THROTTLE_MODELS", "local-mock")
+    invoker = make_invoker(1, targets=(("local-mock", "local"), ("local-mock-fallback", "local")), max_retries=1)
+    
+    response = invoker.invoke(REQUEST, estimated_tokens=300)
+    
+    assert response["model_id"] == "local-mock-fallback"
+    assert invoker.stats()["failovers"] == 1
+    assert invoker.stats()["throttled"] == 2
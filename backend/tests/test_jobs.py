@@ -0,0 +1,38 @@
+"""JobManager status reporting with the SQLite store"""
+import time
+
+from jobs import FAILED, QUEUED, JobManager, SQLiteJobStore
+
+
+class DroppedDispatcher:
+    """Accepts jobs but never runs them, like a lost async invocation"""
+    
+    def dispatch(self, job_id, run):
+        pass
+
+
+def make_manager(tmp_path, timeout_seconds):
+    runs = []
+    manager = JobManager(
+        SQLiteJobStore(str(tmp_path / "jobs.db")),
+        DroppedDispatcher(),
+        lambda kind, body: runs.append(kind) or {"ok": True},
+        timeout_seconds=timeout_seconds
+    )
+    return manager, runs
+
+
+def test_job_that_never_starts_times_out(tmp_path):
+    manager, runs = make_manager(tmp_path, timeout_seconds=0.05)
+    job = manager.submit({"title": "Acme", "description": "Rockets"})
+    assert manager.get(job["job_id"])["status"] == QUEUED
+    
+    time.sleep(0.1)
+    status = manager.get(job["job_id"])
+    
+    assert status["status"] == FAILED
+    assert status["error"] == "Job was never started"
+    # A worker that turns up late leaves the failed job alone
+    manager.run(job["job_id"])
+    assert runs == []
+    assert manager.get(job["job_id"])["status"] == FAILED
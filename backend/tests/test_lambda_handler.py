@@ -0,0 +1,92 @@
+"""lambda_handler end to end against the local mocks"""
+import base64
+import gzip
+import json
+
+import pytest
+
+import lambda_function
+
+
+@pytest.fixture
+def handler():
+    lambda_function.reset_components()
+    yield lambda_function.lambda_handler
+    lambda_function.reset_components()
+
+
+def generate_event(headers=None, claims=None, path="/api/generate"):
+    event = {
+        "httpMethod": "POST",
+        "path": path,
+        "headers": headers or {},
+        "body": json.dumps({"title": "Acme Rockets", "description": "Reusable rockets for small payloads"})
+    }
+    if claims is not None:
+        event["requestContext"] = {"authorizer": {"claims": claims}}
+    return event
+
+
+def test_wildcard_accept_gets_plain_json(handler):
+    response = handler(generate_event({"Accept": "*/*", "Accept-Encoding": "gzip"}), None)
+    
+    assert response["statusCode"] == 200
+    assert not response.get("isBase64Encoded")
+    assert "Content-Encoding" not in response["headers"]
+    assert json.loads(response["body"])
+
+
+def test_json_accept_gets_compressed_body(handler):
+    response = handler(generate_event({"Accept": "application/json", "Accept-Encoding": "gzip"}), None)
+    
+    assert response["statusCode"] == 200
+    assert response["isBase64Encoded"]
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(base64.b64decode(response["body"])))
+
+
+@pytest.mark.parametrize("path", ["/api/generate/batch", "/api/jobs"])
+@pytest.mark.parametrize("max_parallel", [0, -1, "4", True, 2.5, lambda_function.MAX_BATCH_PARALLEL + 1])
+def test_invalid_max_parallel_is_rejected(handler, path, max_parallel):
+    item = {"title": "Acme Rockets", "description": "Reusable rockets"}
+    event = {
+        "httpMethod": "POST",
+        "path": path,
+        "headers": {},
+        "body": json.dumps({"items": [item], "max_parallel": max_parallel})
+    }
+    
+    response = handler(event, None)
+    
+    assert response["statusCode"] == 400
+    assert "max_parallel" in json.loads(response["body"])["error"]
+
+
+def history_event(sub, generation_id=None):
+    path = "/api/history" + (f"/{generation_id}" if generation_id else "")
+    return {
+        "httpMethod": "GET",
+        "path": path,
+        "headers": {},
+        "pathParameters": {"generation_id": generation_id} if generation_id else None,
+        "queryStringParameters": None,
+        "requestContext": {"authorizer": {"claims": {"sub": sub}}}
+    }
+
+
+def test_generation_appears_in_the_callers_history_only(monkeypatch, tmp_path, handler):
+    monkeypatch.setenv("HISTORY_ENABLED", "true")
+    monkeypatch.setenv("HISTORY_PATH", str(tmp_path / "history.db"))
+    lambda_function.reset_components()
+    
+    response = handler(generate_event(claims={"sub": "alice"}), None)
+    assert response["statusCode"] == 200
+    
+    # The handler flushes history writes before it returns
+    items = json.loads(handler(history_event("alice"), None)["body"])["items"]
+    assert [item["title"] for item in items] == ["Acme Rockets"]
+    entry = handler(history_event("alice", items[0]["generation_id"]), None)
+    assert entry["statusCode"] == 200
+    
+    assert json.loads(handler(history_event("bob"), None)["body"])["items"] == []
+    assert handler(history_event("bob", items[0]["generation_id"]), None)["statusCode"] == 404
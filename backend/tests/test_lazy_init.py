@@ -0,0 +1,83 @@
+"""Shared components are built on first use, not when lambda_function is imported"""
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lambda_function
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_load_vector_backends():
+    # A fresh interpreter, so modules imported by other tests do not count
+    code = (
+        "import sys, lambda_function\n"
+        "loaded = [m for m in ('chromadb', 'opensearch_client', 'numpy_index') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+        "assert lambda_function._vector_store is None\n"
+        "assert lambda_function._content_generator is None\n"
+        "assert not lambda_function.get_startup_report()['initialized']\n"
+    )
+    env = {**os.environ, "VECTOR_DB_TYPE": "opensearch"}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_components_are_created_once_and_reused():
+    lambda_function.reset_components()
+    try:
+        generator = lambda_function.get_content_generator()
+        
+        assert lambda_function.get_content_generator() is generator
+        assert lambda_function.get_vector_store() is generator.vector_store
+        report = lambda_function.get_startup_report()
+        assert report["initialized"]
+        assert "vector_store_init_ms" in report and "content_generator_init_ms" in report
+    finally:
+        lambda_function.reset_components()
+    assert not lambda_function.get_startup_report()["initialized"]
+
+
+def test_concurrent_cold_start_builds_one_generator(monkeypatch):
+    # Slow construction down so every thread arrives before the first finishes
+    built = []
+    original = lambda_function.ContentGenerator
+    
+    def slow_generator(vector_store):
+        time.sleep(0.05)
+        built.append(vector_store)
+        return original(vector_store)
+    
+    monkeypatch.setattr(lambda_function, "ContentGenerator", slow_generator)
+    lambda_function.reset_components()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            generators = list(pool.map(lambda _: lambda_function.get_content_generator(), range(8)))
+        
+        assert len(built) == 1
+        assert all(generator is generators[0] for generator in generators)
+    finally:
+        lambda_function.reset_components()
+
+
+def test_concurrent_first_job_requests_share_one_manager(monkeypatch):
+    built = []
+    original = lambda_function.JobManager.from_env
+    
+    def slow_from_env(*args, **kwargs):
+        time.sleep(0.05)
+        built.append(args)
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(lambda_function.JobManager, "from_env", slow_from_env)
+    lambda_function.reset_components()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            managers = list(pool.map(lambda _: lambda_function.get_job_manager(), range(8)))
+        
+        assert len(built) == 1
+        assert all(manager is managers[0] for manager in managers)
+    finally:
+        lambda_function.reset_components()
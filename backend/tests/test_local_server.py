@@ -0,0 +1,36 @@
+"""Request validation in the local FastAPI server"""
+import pytest
+from fastapi.testclient import TestClient
+
+import lambda_function
+import local_server
+
+ITEM = {"title": "Acme Rockets", "description": "Reusable rockets"}
+
+
+@pytest.fixture
+def client():
+    lambda_function.reset_components()
+    with TestClient(local_server.app) as client:
+        yield client
+    lambda_function.reset_components()
+
+
+@pytest.mark.parametrize("path", ["/api/generate/batch", "/api/jobs"])
+@pytest.mark.parametrize("max_parallel", [0, "4", lambda_function.MAX_BATCH_PARALLEL + 1])
+def test_invalid_max_parallel_is_rejected(client, path, max_parallel):
+    response = client.post(path, json={"items": [ITEM], "max_parallel": max_parallel})
+    
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("body", [
+    {"title": "", "description": "Reusable rockets"},
+    {"title": "Acme Rockets", "description": "", "languages": ["en", "de"]},
+    {"title": "Acme Rockets", "description": "Reusable rockets", "languages": []}
+])
+def test_job_bodies_are_validated_like_the_sync_endpoints(client, body):
+    response = client.post("/api/jobs", json=body)
+    
+    assert response.status_code in (400, 422)
+    assert client.post("/api/generate", json=body).status_code == response.status_code
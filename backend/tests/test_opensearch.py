@@ -0,0 +1,79 @@
+"""OpenSearchVectorClient bulk indexing and hybrid search against opensearch_mock"""
+import pytest
+
+from opensearch_client import OpenSearchVectorClient
+from opensearch_mock import start_opensearch_mock
+
+
+def vector(*values):
+    return [float(v) for v in values]
+
+
+@pytest.fixture
+def client():
+    server, url = start_opensearch_mock()
+    client = OpenSearchVectorClient(url, "test-index", dimension=3, region="local", auth="none", bulk_size=2)
+    client.ensure_index()
+    yield client
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def indexed(client):
+    count = client.bulk_index(
+        ["a", "b", "c", "d", "e"],
+        [vector(1, 0, 0), vector(0, 1, 0), vector(0, 0, 1), vector(1, 1, 0), vector(0.9, 0.1, 0)],
+        [
+            "encryption keeps customer data secure",
+            "dashboards refresh in real time",
+            "pricing plans for growing teams",
+            "secure dashboards for every team",
+            "encrypted backups stored securely"
+        ],
+        [
+            {"language": "en"},
+            {"language": "en"},
+            {"language": "de"},
+            {},
+            {"language": "de"}
+        ]
+    )
+    return client, count
+
+
+def test_bulk_index_sends_every_document_in_batches(indexed):
+    client, count = indexed
+    assert count == 5
+    assert client.existing_ids(["a", "e", "missing"]) == {"a", "e"}
+
+
+def test_hybrid_search_returns_vector_and_lexical_hits(indexed):
+    client, _ = indexed
+    results = client.hybrid_search([vector(1, 0, 0)], ["dashboards"], top_k=2)
+    
+    assert len(results) == 1
+    vector_hits, lexical_hits = results[0]
+    assert [doc_id for doc_id, _ in vector_hits] == ["a", "e"]
+    assert {doc_id for doc_id, _ in lexical_hits} == {"b", "d"}
+    assert dict(vector_hits)["a"] == "encryption keeps customer data secure"
+
+
+def test_hybrid_search_filters_keep_documents_without_the_field(indexed):
+    client, _ = indexed
+    vector_hits, lexical_hits = client.hybrid_search(
+        [vector(1, 0, 0)], ["secure"], top_k=5, filters={"language": "en"}
+    )[0]
+    
+    assert {doc_id for doc_id, _ in vector_hits} == {"a", "b", "d"}
+    assert {doc_id for doc_id, _ in lexical_hits} <= {"a", "b", "d"}
+
+
+def test_hybrid_search_batches_queries_and_can_skip_bm25(indexed):
+    client, _ = indexed
+    results = client.hybrid_search(
+        [vector(1, 0, 0), vector(0, 0, 1)], ["secure", "pricing"], top_k=1, lexical=False
+    )
+    
+    assert [[doc_id for doc_id, _ in hits] for hits, _ in results] == [["a"], ["c"]]
+    assert all(lexical == [] for _, lexical in results)
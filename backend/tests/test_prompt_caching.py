@@ -0,0 +1,44 @@
+"""cache_control is only sent on system prompts long enough for Bedrock to cache"""
+from content_generator import ContentGenerator
+from bedrock_emulator import EmulatorConfig, _Emulator
+from prompt_templates import CHARS_PER_TOKEN, RenderedPrompt
+from vector_store import VectorStore
+
+
+def rendered(system_tokens):
+    return RenderedPrompt(
+        system="x" * (CHARS_PER_TOKEN * system_tokens),
+        user="Task: Acme",
+        max_tokens=256,
+        context_used=0,
+        context_dropped=0
+    )
+
+
+def system_block(generator, system_tokens, model_id=None):
+    return generator._build_request_body(rendered(system_tokens), model_id)["system"][0]
+
+
+def test_short_prefixes_are_sent_unmarked():
+    generator = ContentGenerator(VectorStore())
+    
+    assert "cache_control" not in system_block(generator, 400)
+    assert system_block(generator, 1100)["cache_control"] == {"type": "ephemeral"}
+
+
+def test_haiku_needs_the_longer_prefix():
+    generator = ContentGenerator(VectorStore())
+    haiku = "anthropic.claude-3-5-haiku-20241022-v1:0"
+    
+    assert "cache_control" not in system_block(generator, 1100, haiku)
+    assert "cache_control" in system_block(generator, 2100, haiku)
+
+
+def test_emulator_does_not_cache_short_blocks():
+    emulator = _Emulator(EmulatorConfig(cache_min_tokens=1024))
+    short = {"system": [{"type": "text", "text": "x" * 400, "cache_control": {"type": "ephemeral"}}]}
+    long = {"system": [{"type": "text", "text": "y" * 8000, "cache_control": {"type": "ephemeral"}}]}
+    
+    assert emulator._usage(short, "x" * 400, "ok")["cache_creation_input_tokens"] == 0
+    assert emulator._usage(long, "y" * 8000, "ok")["cache_creation_input_tokens"] > 0
+    assert emulator._usage(long, "y" * 8000, "ok")["cache_read_input_tokens"] > 0
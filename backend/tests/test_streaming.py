@@ -0,0 +1,42 @@
+"""agenerate_stream gives its concurrency slot back only once the producer thread is done"""
+import asyncio
+import threading
+import time
+
+from content_generator import ContentGenerator
+from vector_store import VectorStore
+
+
+def test_abandoned_stream_stops_the_producer_before_releasing_its_slot():
+    generator = ContentGenerator(VectorStore())
+    produced = []
+    closed = threading.Event()
+    
+    def slow_stream(**kwargs):
+        try:
+            for i in range(50):
+                time.sleep(0.01)
+                produced.append(i)
+                yield {"event": "section", "section": f"s{i}", "data": i}
+        finally:
+            closed.set()
+    
+    generator.generate_stream = slow_stream
+    
+    async def consume_one_and_disconnect():
+        stream = generator.agenerate_stream("Acme", "Rockets")
+        await stream.__anext__()
+        await stream.aclose()
+        semaphore = generator._get_semaphore()
+        # The slot stays taken until the producer notices the stop flag
+        for _ in range(100):
+            if semaphore._value == generator.max_concurrency:
+                break
+            await asyncio.sleep(0.01)
+        return semaphore._value
+    
+    free_slots = asyncio.run(consume_one_and_disconnect())
+    
+    assert free_slots == generator.max_concurrency
+    assert closed.is_set()
+    assert len(produced) < 50
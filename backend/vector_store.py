@@ -1,19 +1,39 @@
 """
 Vector store implementation.
-Supports both Amazon OpenSearch Serverless (AWS) and ChromaDB (local dev).
+Supports Amazon OpenSearch Serverless (AWS), ChromaDB (local dev) and a
+built-in NumPy index (no external dependencies).
 """
 import os
-from typing import List, Optional
-import boto3
-from botocore.exceptions import ClientError
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-except (ImportError, ModuleNotFoundError):
-    CHROMADB_AVAILABLE = False
-    chromadb = None
+from embeddings import create_embedder
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from response_cache import LRUCache, normalize_text
+
+# chromadb is heavy to import (it pulls in onnxruntime, numpy, etc.), so it is
+# loaded on first use instead of at module import time.
+_chromadb = None
+_chromadb_checked = False
+
+
+def document_id(text: str) -> str:
+    """Content-derived document id, identical for identical text"""
+    return "doc_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _load_chromadb():
+    """Import chromadb once and return the module, or None if unavailable"""
+    global _chromadb, _chromadb_checked
+    if not _chromadb_checked:
+        _chromadb_checked = True
+        try:
+            import chromadb
+            _chromadb = chromadb
+        except (ImportError, ModuleNotFoundError):
+            _chromadb = None
+    return _chromadb
 
 
 class VectorStore:
@@ -23,20 +43,51 @@ class VectorStore:
         self.use_local = os.getenv("USE_LOCAL_MOCKS", "true").lower() == "true"
         self.vector_db_type = os.getenv("VECTOR_DB_TYPE", "chroma")
         self.region = os.getenv("AWS_REGION", "us-east-1")
+        # The same embedder is used for indexing and querying
+        self.embedder = create_embedder(self.use_local, self.region)
+        # Hybrid search fuses vector and BM25 rankings with reciprocal rank fusion
+        self.hybrid = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+        # BM25 and metadata postings for the in-process backends (OpenSearch
+        # does both server-side)
+        self.lexical = LexicalIndex()
+        # Search results are memoized under the collection version, which
+        # every insert bumps, so a write invalidates all earlier entries.
+        # Writes made by other processes are only picked up after the TTL.
+        self.version = 0
+        self.search_cache: Optional[LRUCache] = None
+        if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true":
+            self.search_cache = LRUCache(
+                max_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+                ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL", "300"))
+            )
+        self._search_stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
         
-        if self.use_local or self.vector_db_type == "chroma":
-            self._init_chroma()
-        else:
+        if self.vector_db_type == "numpy":
+            self.backend = "numpy"
+            self._init_numpy()
+        elif self.vector_db_type == "opensearch":
+            self.backend = "opensearch"
             self._init_opensearch()
+        else:
+            self.backend = "chroma"
+            self._init_chroma()
     
     def _init_chroma(self):
         """Initialize ChromaDB for local development"""
-        if not CHROMADB_AVAILABLE:
+        chromadb = _load_chromadb()
+        if chromadb is None:
+            # Fall back to the built-in index rather than canned results
             self.client = None
             self.collection = None
+            self.backend = "numpy"
+            self._init_numpy()
             return
         
         try:
+            from chromadb.config import Settings
+            
             # Use persistent storage for local dev
             db_path = os.path.join(os.path.dirname(__file__), "chroma_db")
             os.makedirs(db_path, exist_ok=True)
@@ -46,20 +97,49 @@ class VectorStore:
                 settings=Settings(anonymized_telemetry=False)
             )
             
-            # Get or create collection
+            # Get or create collection. Vectors from different embedders are
+            # not comparable, so each embedder gets its own collection.
             self.collection = self.client.get_or_create_collection(
-                name="content_knowledge_base",
+                name=f"content_knowledge_base_{self.embedder.name}_{self.embedder.dimension}",
                 metadata={"hnsw:space": "cosine"}
             )
             
+            stored = self.collection.get(include=["documents", "metadatas"])
+            self.lexical.add(
+                stored["ids"],
+                stored["documents"],
+                [m or {} for m in (stored.get("metadatas") or [None] * len(stored["ids"]))]
+            )
+            
             # Initialize with sample data if empty
-            if self.collection.count() == 0:
+            if len(self.lexical) == 0:
                 self._initialize_sample_data()
-                
+        
         except Exception as e:
             print(f"Warning: ChromaDB initialization failed: {e}")
             self.client = None
             self.collection = None
+            self.backend = "numpy"
+            self._init_numpy()
+    
+    def _init_numpy(self):
+        """Initialize the in-process NumPy index"""
+        from numpy_index import NumpyVectorIndex
+        
+        index_path = os.getenv(
+            "NUMPY_INDEX_PATH",
+            os.path.join(
+                os.path.dirname(__file__),
+                "numpy_index",
+                f"{self.embedder.name}_{self.embedder.dimension}"
+            )
+        )
+        self.index = NumpyVectorIndex(self.embedder.dimension, path=index_path)
+        self.lexical.add(self.index.ids, self.index.documents, self.index.metadatas)
+        
+        # Initialize with sample data if empty
+        if len(self.index) == 0:
+            self._initialize_sample_data()
     
     def _init_opensearch(self):
         """Initialize Amazon OpenSearch Serverless"""
@@ -69,9 +149,19 @@ class VectorStore:
         if not self.opensearch_endpoint:
             raise ValueError("OPENSEARCH_ENDPOINT environment variable required for OpenSearch")
         
-        # OpenSearch client initialization would go here
-        # For now, we'll use ChromaDB as fallback
-        self._init_chroma()
+        from opensearch_client import OpenSearchVectorClient
+        
+        self.opensearch = OpenSearchVectorClient(
+            endpoint=self.opensearch_endpoint,
+            index_name=self.index_name,
+            dimension=self.embedder.dimension,
+            region=self.region,
+            auth=os.getenv("OPENSEARCH_AUTH", "sigv4"),
+            pool_size=int(os.getenv("OPENSEARCH_POOL_SIZE", "10")),
+            bulk_size=int(os.getenv("OPENSEARCH_BULK_SIZE", "500")),
+            timeout=float(os.getenv("OPENSEARCH_TIMEOUT", "10"))
+        )
+        self.opensearch.ensure_index()
     
     def _initialize_sample_data(self):
         """Initialize vector store with sample content"""
@@ -86,87 +176,345 @@ class VectorStore:
             "Mobile-first design with responsive layouts for all devices."
         ]
         
-        # For local dev, we'll use simple text-based similarity
-        # In production, you'd generate embeddings using Bedrock Titan
-        embeddings = [[0.1] * 384] * len(sample_documents)  # Mock embeddings
-        
-        self.collection.add(
-            embeddings=embeddings,
-            documents=sample_documents,
-            ids=[f"doc_{i}" for i in range(len(sample_documents))]
+        self.upsert_documents(
+            [document_id(text) for text in sample_documents],
+            sample_documents
         )
     
-    def search(self, query: str, top_k: int = 3) -> List[str]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
         """
         Search for relevant content
         
         Args:
             query: Search query
             top_k: Number of results to return
-            
+            filters: Optional metadata filters, e.g. ``{"language": "en",
+                "tenant": "acme"}``; a list value accepts any of its items.
+                Documents without a filtered field match every value.
+        
         Returns:
             List of relevant document texts
         """
-        if self.use_local or self.vector_db_type == "chroma":
-            return self._search_chroma(query, top_k)
+        return self.search_many([query], top_k, filters)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        filters: Union[None, Dict[str, Any], List[Optional[Dict[str, Any]]]] = None
+    ) -> List[List[str]]:
+        """
+        Search for several queries at once
+        
+        Queries are whitespace-normalized, and results are served from the
+        search cache when the same (query, top_k, filters) was searched since
+        the last write. Remaining duplicates are only searched once, and every
+        backend receives all distinct queries sharing the same filters in a
+        single request.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            filters: One filter dict for every query, or a list with one
+                (possibly None) filter dict per query
+        
+        Returns:
+            List of relevant document texts for each query, in input order
+        """
+        if not queries:
+            return []
+        per_query = filters if isinstance(filters, list) else [filters] * len(queries)
+        keys = [(normalize_text(query), _filter_key(f)) for query, f in zip(queries, per_query)]
+        version = self.version
+        
+        results: Dict[Tuple[str, Any], List[str]] = {}
+        pending: Set[Tuple[str, Any]] = set()
+        groups: Dict[Any, Tuple[Optional[Dict[str, Any]], List[str]]] = {}
+        for key, query_filters in zip(keys, per_query):
+            if key in results or key in pending:
+                continue
+            cached = self._cached_search(version, key, top_k)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.add(key)
+                query, filter_key = key
+                groups.setdefault(filter_key, (query_filters, []))[1].append(query)
+        
+        for filter_key, (query_filters, group_queries) in groups.items():
+            try:
+                found = self._search_group(group_queries, top_k, query_filters)
+            except Exception as e:
+                # Failed searches are not cached
+                print(f"Vector search error ({self.backend}): {e}")
+                found = [[] for _ in group_queries]
+            else:
+                for query, documents in zip(group_queries, found):
+                    self._store_search(version, (query, filter_key), top_k, documents)
+            for query, documents in zip(group_queries, found):
+                results[(query, filter_key)] = documents
+        return [list(results[key]) for key in keys]
+    
+    def search_cache_stats(self) -> Dict[str, Any]:
+        """Return search cache counters"""
+        if self.search_cache is None:
+            return {"enabled": False}
+        with self._stats_lock:
+            stats = dict(self._search_stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return {"enabled": True, **stats, "entries": len(self.search_cache), "version": self.version}
+    
+    def _cached_search(self, version: int, key: Tuple[str, Any], top_k: int) -> Optional[List[str]]:
+        if self.search_cache is None:
+            return None
+        documents = self.search_cache.get((version, top_k) + key)
+        with self._stats_lock:
+            self._search_stats["hits" if documents is not None else "misses"] += 1
+        return documents
+    
+    def _store_search(self, version: int, key: Tuple[str, Any], top_k: int, documents: List[str]) -> None:
+        if self.search_cache is not None:
+            self.search_cache.set((version, top_k) + key, documents)
+    
+    def _search_group(
+        self,
+        queries: List[str],
+        top_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[List[str]]:
+        """Search distinct queries that share the same filters"""
+        # Each retriever returns a deeper candidate list so fusion has
+        # something to re-rank
+        candidate_k = max(top_k * 4, 20) if self.hybrid else top_k
+        if self.backend == "numpy":
+            return self._search_numpy(queries, top_k, candidate_k, filters)
+        elif self.backend == "chroma":
+            return self._search_chroma(queries, top_k, candidate_k, filters)
         else:
-            return self._search_opensearch(query, top_k)
+            return self._search_opensearch(queries, top_k, candidate_k, filters)
     
-    def _search_chroma(self, query: str, top_k: int) -> List[str]:
+    def _search_numpy(
+        self,
+        queries: List[str],
+        top_k: int,
+        candidate_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[List[str]]:
+        """Search using the in-process NumPy index"""
+        allowed = self.lexical.allowed_ids(filters)
+        # Only the prefiltered rows are scored
+        rows = None if allowed is None else self.index.positions(allowed)
+        positions = self.index.search(self.embedder.embed(queries), candidate_k, rows)
+        vector_ranked = [[self.index.ids[i] for i in row] for row in positions]
+        return self._fuse(queries, vector_ranked, top_k, candidate_k, allowed)
+    
+    def _search_chroma(
+        self,
+        queries: List[str],
+        top_k: int,
+        candidate_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[List[str]]:
         """Search using ChromaDB"""
-        if not self.collection:
-            # Fallback to mock results
-            return [
-                "Enterprise-grade security with encryption",
-                "24/7 customer support available",
-                "Scalable infrastructure"
-            ]
+        allowed = self.lexical.allowed_ids(filters)
+        if allowed is not None and not allowed:
+            return [[] for _ in queries]
         
-        try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=top_k
-            )
-            
-            if results and results.get("documents"):
-                return results["documents"][0]
-            return []
-        except Exception as e:
-            print(f"ChromaDB search error: {e}")
-            return []
+        # Chroma cannot express "field missing or equal", so filtered
+        # searches over-fetch and keep only allowed ids
+        n_results = candidate_k if allowed is None else candidate_k * 4
+        results = self.collection.query(
+            query_embeddings=self.embedder.embed(queries),
+            n_results=max(1, min(n_results, len(self.lexical) or 1)),
+            include=["documents"]
+        )
+        
+        texts: Dict[str, str] = {}
+        vector_ranked = []
+        for ids, documents in zip(results["ids"], results["documents"]):
+            texts.update(zip(ids, documents))
+            vector_ranked.append([i for i in ids if allowed is None or i in allowed][:candidate_k])
+        return self._fuse(queries, vector_ranked, top_k, candidate_k, allowed, texts)
     
-    def _search_opensearch(self, query: str, top_k: int) -> List[str]:
-        """Search using Amazon OpenSearch Serverless"""
-        # Implementation would use boto3 to call OpenSearch
-        # For now, return mock results
-        return [
-            "Enterprise-grade security with encryption",
-            "24/7 customer support available",
-            "Scalable infrastructure"
-        ]
+    def _search_opensearch(
+        self,
+        queries: List[str],
+        top_k: int,
+        candidate_k: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[List[str]]:
+        """Search using Amazon OpenSearch Serverless (filters and BM25 run server-side)"""
+        rankings = self.opensearch.hybrid_search(
+            self.embedder.embed(queries),
+            queries,
+            candidate_k,
+            filters=filters,
+            lexical=self.hybrid
+        )
+        
+        results = []
+        for vector_hits, lexical_hits in rankings:
+            texts = dict(vector_hits + lexical_hits)
+            ranked = [doc_id for doc_id, _ in vector_hits]
+            if self.hybrid:
+                ranked = reciprocal_rank_fusion(
+                    [ranked, [doc_id for doc_id, _ in lexical_hits]], k=self.rrf_k
+                )
+            results.append([texts[doc_id] for doc_id in ranked[:top_k]])
+        return results
+    
+    def _fuse(
+        self,
+        queries: List[str],
+        vector_ranked: List[List[str]],
+        top_k: int,
+        candidate_k: int,
+        allowed: Optional[Set[str]],
+        texts: Optional[Dict[str, str]] = None
+    ) -> List[List[str]]:
+        """Fuse vector rankings with BM25 over the same candidate set and return texts"""
+        texts = texts or {}
+        results = []
+        for query, ranked in zip(queries, vector_ranked):
+            if self.hybrid:
+                lexical_ranked = self.lexical.search(query, candidate_k, allowed)
+                ranked = reciprocal_rank_fusion([ranked, lexical_ranked], k=self.rrf_k)
+            results.append([
+                texts[doc_id] if doc_id in texts else self.lexical.text(doc_id)
+                for doc_id in ranked[:top_k]
+            ])
+        return results
     
-    def add_documents(self, documents: List[str], embeddings: Optional[List[List[float]]] = None):
+    def add_documents(
+        self,
+        documents: List[str],
+        embeddings: Optional[List[List[float]]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
         """
         Add documents to the vector store
         
+        Documents are identified by a hash of their text, so adding the same
+        text again is a no-op.
+        
         Args:
             documents: List of document texts
-            embeddings: Optional pre-computed embeddings
-        """
-        if not self.collection:
-            return
+            embeddings: Optional pre-computed embeddings (must come from
+                the same model as self.embedder)
+            metadatas: Optional metadata for each document
         
+        Returns:
+            Number of documents that were new to the store
+        """
         try:
-            if embeddings is None:
-                # Generate mock embeddings (in production, use Bedrock Titan)
-                embeddings = [[0.1] * 384] * len(documents)
-            
-            ids = [f"doc_{self.collection.count() + i}" for i in range(len(documents))]
-            self.collection.add(
+            return self.upsert_documents(
+                [document_id(text) for text in documents],
+                documents,
                 embeddings=embeddings,
-                documents=documents,
-                ids=ids
+                metadatas=metadatas
             )
         except Exception as e:
             print(f"Error adding documents: {e}")
+            return 0
+    
+    def upsert_documents(
+        self,
+        ids: List[str],
+        documents: List[str],
+        embeddings: Optional[List[List[float]]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        persist: bool = True
+    ) -> int:
+        """
+        Insert documents whose ids are not in the store yet
+        
+        Ids already present are skipped before embedding, so re-ingesting
+        unchanged content costs one existence check and nothing else.
+        
+        Args:
+            ids: Stable document ids
+            documents: Document texts
+            embeddings: Optional pre-computed embeddings
+            metadatas: Optional metadata for each document
+            persist: Write the NumPy index to disk afterwards; bulk loaders
+                pass False and call flush() once at the end
+        
+        Returns:
+            Number of documents inserted
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        existing = self._existing_ids(ids)
+        rows = []
+        seen = set()
+        for i, doc_id in enumerate(ids):
+            if doc_id not in existing and doc_id not in seen:
+                seen.add(doc_id)
+                rows.append(i)
+        if not rows:
+            return 0
+        
+        new_ids = [ids[i] for i in rows]
+        new_documents = [documents[i] for i in rows]
+        new_metadatas = [metadatas[i] for i in rows]
+        if embeddings is None:
+            new_embeddings = self.embedder.embed(new_documents)
+        else:
+            new_embeddings = [embeddings[i] for i in rows]
+        
+        if self.backend == "numpy":
+            self.index.add(new_ids, new_embeddings, new_documents, new_metadatas)
+            if persist:
+                self.index.save()
+        elif self.backend == "opensearch":
+            self.opensearch.bulk_index(new_ids, new_embeddings, new_documents, new_metadatas)
+        else:
+            self.collection.upsert(
+                ids=new_ids,
+                embeddings=new_embeddings,
+                documents=new_documents,
+                # Chroma rejects empty metadata dicts
+                metadatas=[m or None for m in new_metadatas]
+            )
+        
+        if self.backend != "opensearch":
+            self.lexical.add(new_ids, new_documents, new_metadatas)
+        self._bump_version()
+        return len(new_ids)
+    
+    def _bump_version(self) -> None:
+        """Invalidate cached search results after a write"""
+        with self._stats_lock:
+            self.version += 1
+        if self.search_cache is not None:
+            self.search_cache.clear()
+    
+    def flush(self) -> None:
+        """Persist any buffered index state (only the NumPy backend buffers)"""
+        if self.backend == "numpy":
+            self.index.save()
+    
+    def _existing_ids(self, ids: List[str]) -> Set[str]:
+        """Return which of the given ids are already stored"""
+        if self.backend == "numpy":
+            return {doc_id for doc_id in ids if self.index.contains(doc_id)}
+        if self.backend == "opensearch":
+            return self.opensearch.existing_ids(ids)
+        return set(self.collection.get(ids=ids, include=[])["ids"])
+
+
+def _filter_key(filters: Optional[Dict[str, Any]]) -> Optional[Tuple]:
+    """Hashable form of a filter dict (None when it filters nothing)"""
+    active = {k: v for k, v in (filters or {}).items() if v is not None}
+    if not active:
+        return None
+    return tuple(sorted(
+        (k, tuple(sorted(v)) if isinstance(v, (list, tuple, set)) else v)
+        for k, v in active.items()
+    ))
 
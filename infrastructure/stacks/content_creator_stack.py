@@ -8,6 +8,7 @@ from aws_cdk import (
     aws_s3 as s3,
     aws_dynamodb as dynamodb,
     aws_iam as iam,
+    aws_cognito as cognito,
     Duration,
     RemovalPolicy
 )
@@ -39,10 +40,34 @@ class ContentCreatorStack(Stack):
                 type=dynamodb.AttributeType.STRING
             ),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            # Cached responses carry an expiry so DynamoDB can evict them
+            time_to_live_attribute="expires_at",
             removal_policy=RemovalPolicy.DESTROY  # For dev
         )
+        # Generation history: newest-first listing per user. Only the
+        # summary fields are projected, so listing never reads full records.
+        self.metadata_table.add_global_secondary_index(
+            index_name="history-by-user",
+            partition_key=dynamodb.Attribute(
+                name="history_pk",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="history_sk",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=[
+                "generation_id", "user_id", "created_at", "operation", "title",
+                "content_type", "language", "tone", "model_id", "cached",
+                "fallback", "input_tokens", "output_tokens", "total_ms"
+            ]
+        )
         
-        # Lambda function for content generation
+        # Lambda function for content generation. Async jobs run in the same
+        # function, so a job still running a minute past its timeout was
+        # killed and is reported as failed.
+        function_timeout = Duration.minutes(5)
         self.lambda_function = _lambda.Function(
             self,
             "ContentGeneratorFunction",
@@ -50,14 +75,15 @@ class ContentCreatorStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_12,
             handler="lambda_function.lambda_handler",
             code=_lambda.Code.from_asset("../backend"),
-            timeout=Duration.minutes(5),
+            timeout=function_timeout,
             memory_size=512,
             environment={
                 "AWS_REGION": self.region,
                 "USE_LOCAL_MOCKS": "false",
                 "VECTOR_DB_TYPE": "opensearch",
                 "DOCUMENTS_BUCKET": self.documents_bucket.bucket_name,
-                "METADATA_TABLE": self.metadata_table.table_name
+                "METADATA_TABLE": self.metadata_table.table_name,
+                "JOB_TIMEOUT": str(int(function_timeout.to_seconds()) + 60)
             }
         )
         
@@ -84,6 +110,17 @@ class ContentCreatorStack(Stack):
         # DynamoDB permissions
         self.metadata_table.grant_read_write_data(self.lambda_function)
         
+        # Async jobs run in an asynchronous invocation of this function. The
+        # ARN is built from the name, since grant_invoke on itself would make
+        # the role and the function depend on each other
+        self.lambda_function.add_to_role_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["lambda:InvokeFunction"],
+                resources=[f"arn:aws:lambda:{self.region}:{self.account}:function:content-generator"]
+            )
+        )
+        
         # OpenSearch permissions (if using OpenSearch Serverless)
         self.lambda_function.add_to_role_policy(
             iam.PolicyStatement(
@@ -101,6 +138,13 @@ class ContentCreatorStack(Stack):
             "ContentCreatorApi",
             rest_api_name="Content Creator API",
             description="API for content generation",
+            # Lets the Lambda return gzip/brotli-compressed (base64) JSON. Only
+            # the type the API actually returns is listed: a wildcard would
+            # also make the CORS preflight's mock integration binary and
+            # break OPTIONS. Uncompressed responses stay plain text. The
+            # Lambda only compresses when the client's Accept header starts
+            # with application/json, since API Gateway matches on that header.
+            binary_media_types=["application/json"],
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=apigateway.Cors.ALL_ORIGINS,
                 allow_methods=apigateway.Cors.ALL_METHODS,
@@ -108,16 +152,79 @@ class ContentCreatorStack(Stack):
             )
         )
         
+        # Users of the generation history; history routes require a Cognito
+        # ID token and are keyed on its sub claim
+        self.user_pool = cognito.UserPool(
+            self,
+            "UserPool",
+            user_pool_name="content-creator-users",
+            self_sign_up_enabled=False,
+            sign_in_aliases=cognito.SignInAliases(email=True),
+            removal_policy=RemovalPolicy.DESTROY  # For dev
+        )
+        self.user_pool_client = self.user_pool.add_client(
+            "WebClient",
+            auth_flows=cognito.AuthFlow(user_srp=True)
+        )
+        authorizer = apigateway.CognitoUserPoolsAuthorizer(
+            self,
+            "UserPoolAuthorizer",
+            cognito_user_pools=[self.user_pool]
+        )
+        
         # Lambda integration
         lambda_integration = apigateway.LambdaIntegration(
             self.lambda_function,
             request_templates={"application/json": '{"statusCode": "200"}'}
         )
         
-        # API routes
-        self.api.root.add_resource("api").add_resource("generate").add_method(
+        # API routes. Everything but /health needs a Cognito ID token, so
+        # every generation is recorded under the caller's own history.
+        api_resource = self.api.root.add_resource("api")
+        generate_resource = api_resource.add_resource("generate")
+        generate_resource.add_method(
+            "POST",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        generate_resource.add_resource("batch").add_method(
+            "POST",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        api_resource.add_resource("regenerate").add_method(
             "POST",
-            lambda_integration
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        jobs_resource = api_resource.add_resource("jobs")
+        jobs_resource.add_method(
+            "POST",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        jobs_resource.add_resource("{job_id}").add_method(
+            "GET",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        history_resource = api_resource.add_resource("history")
+        history_resource.add_method(
+            "GET",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        history_resource.add_resource("{generation_id}").add_method(
+            "GET",
+            lambda_integration,
+            authorizer=authorizer,
+            authorization_type=apigateway.AuthorizationType.COGNITO
         )
         
         # Health check endpoint
@@ -137,6 +244,13 @@ class ContentCreatorStack(Stack):
             description="API Gateway endpoint URL"
         )
         
+        cdk.CfnOutput(
+            self,
+            "UserPoolClientId",
+            value=self.user_pool_client.user_pool_client_id,
+            description="Cognito app client for signing in to the history API"
+        )
+        
         cdk.CfnOutput(
             self,
             "DocumentsBucketName",